@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist
+from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist, AlertRule
 
 
 
@@ -23,3 +23,4 @@ admin.site.register(SubscriptionPlan)
 admin.site.register(Payment)
 admin.site.register(UserUsageLog)
 admin.site.register(Watchlist)
+admin.site.register(AlertRule)
@@ -1,5 +1,29 @@
+from django.conf import settings
 from rest_framework import viewsets, routers, serializers
-from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist, AlertRule
+from .dash_apps.indicator_cache import indicator_cache
+from .dash_apps.screener import screener
+from .dash_apps.shared_store import reader_stores
+from .dash_apps.signal_engine import signal_engine
+from .tasks.ingest_health import read_health
+
+
+def query_limit(request, default=None):
+    """``?limit=`` as a positive integer, ``default`` when absent; anything else is a 400"""
+    value = request.query_params.get("limit", "")
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise serializers.ValidationError({"limit": "limit must be a positive integer"})
+    return limit
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -32,6 +56,31 @@ class WatchlistSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class AlertRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlertRule
+        fields = "__all__"
+
+    def get_fields(self):
+        """Only the requesting user's watchlist entries can be chosen"""
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is not None:
+            fields["watchlist"].queryset = Watchlist.objects.filter(user=request.user)
+        return fields
+
+    def validate(self, data):
+        kind = data.get("kind", getattr(self.instance, "kind", None))
+        threshold = data.get("threshold", getattr(self.instance, "threshold", None))
+        upper = data.get("upper", getattr(self.instance, "upper", None))
+        window = data.get("window", getattr(self.instance, "window", 60))
+        if window < 1:
+            raise serializers.ValidationError({"window": "window must be at least 1 candle"})
+        if kind == "rsi_outside" and (upper is None or upper <= threshold):
+            raise serializers.ValidationError({"upper": "rsi_outside needs an upper bound above threshold"})
+        return data
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -57,9 +106,90 @@ class WatchlistViewSet(viewsets.ModelViewSet):
     serializer_class = WatchlistSerializer
 
 
+class AlertRuleViewSet(viewsets.ModelViewSet):
+    """The signed-in user's alert rules"""
+
+    queryset = AlertRule.objects.all()
+    serializer_class = AlertRuleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return AlertRule.objects.filter(watchlist__user=self.request.user)
+
+    def perform_create(self, serializer):
+        if serializer.validated_data["watchlist"].user_id != self.request.user.id:
+            raise PermissionDenied("Alert rules can only watch your own watchlist")
+        serializer.save()
+
+
+class IndicatorCacheStatsViewSet(viewsets.ViewSet):
+    """Hit/miss counters of this process's indicator cache"""
+
+    def list(self, request):
+        return Response(indicator_cache.stats())
+
+
+class IngestHealthViewSet(viewsets.ViewSet):
+    """Connection, lag, gap and queue counters last reported by the ingester process"""
+
+    def list(self, request):
+        report = read_health(getattr(settings, "CANDLE_INGEST_HEALTH_FILE", ""))
+        if report is None:
+            return Response({"detail": "The ingester has not reported yet"}, status=503)
+        return Response(report)
+
+
+class SignalViewSet(viewsets.ViewSet):
+    """Latest precomputed signals per symbol (``?interval=1m``), and recent signal changes"""
+
+    def _synced(self, request):
+        interval = request.query_params.get("interval", "1m")
+        store = reader_stores().get(interval)
+        if store is not None:
+            signal_engine.sync(store, interval)
+        return interval
+
+    def list(self, request):
+        return Response(signal_engine.snapshot(self._synced(request)))
+
+    def retrieve(self, request, pk=None):
+        state = signal_engine.latest(pk.lower(), self._synced(request))
+        if state is None:
+            return Response({"detail": f"No signal for {pk}"}, status=404)
+        return Response(state)
+
+    @action(detail=False)
+    def events(self, request):
+        return Response(signal_engine.recent_events(query_limit(request, 100)))
+
+
+class ScreenerViewSet(viewsets.ViewSet):
+    """Latest price, % change, RSI, EMA distance, ATR and volume of every symbol.
+
+    ``?where=rsi < 30 and price > ema&order=-change&limit=10``
+    """
+
+    def list(self, request):
+        store = reader_stores().get("1m")
+        if store is not None:
+            screener.sync(store)
+        limit = query_limit(request)
+        try:
+            rows = screener.query(request.query_params.get("where", ""), request.query_params.get("order", ""),
+                                  limit)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response(rows)
+
+
 router = routers.DefaultRouter()
 router.register(r"users", UserViewSet)
 router.register(r"plans", SubscriptionPlanViewSet)
 router.register(r"payments", PaymentViewSet)
 router.register(r"usage-logs", UserUsageLogViewSet)
 router.register(r"watchlist", WatchlistViewSet)
+router.register(r"alerts", AlertRuleViewSet)
+router.register(r"indicator-cache", IndicatorCacheStatsViewSet, basename="indicator-cache")
+router.register(r"ingest-health", IngestHealthViewSet, basename="ingest-health")
+router.register(r"signals", SignalViewSet, basename="signals")
+router.register(r"screener", ScreenerViewSet, basename="screener")
@@ -1,26 +1,21 @@
 from django.core.management.base import BaseCommand
 import asyncio, json
-import pandas as pd, websockets
-from dash_apps.indicators import *
+import websockets
+from crypto_app.dash_apps.data_store import CandleBuffer
 
 
-live_candles = pd.DataFrame(columns=['timestamp','open','high','low','close','volume'])
+live_candles = CandleBuffer()
 
 
 async def binance_ws(symbol, interval):
     uri = f"wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}"
-    global live_candles
     async with websockets.connect(uri) as ws:
         while True:
             msg = await ws.recv()
             k = json.loads(msg)['k']
             if k['x']:
-                row = {'timestamp': pd.to_datetime(k['t'], unit='ms'),
-                       'open': float(k['o']), 'high': float(k['h']),
-                       'low': float(k['l']), 'close': float(k['c']),
-                       'volume': float(k['v'])}
-                live_candles = pd.concat([live_candles, pd.DataFrame([row])]).tail(500).reset_index(drop=True)
-            await asyncio.sleep(1)
+                live_candles.append(k['t'], float(k['o']), float(k['h']),
+                                    float(k['l']), float(k['c']), float(k['v']))
 
 class Command(BaseCommand):
     help = "Start Binance websocket feed"
@@ -0,0 +1,91 @@
+import asyncio
+from collections import defaultdict
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
+from .dash_apps.data_store import SYMBOLS
+from .dash_apps.market_events import MarketWatcher
+from .dash_apps.shared_store import reader_stores
+from .tasks.alert_delivery import alert_group
+
+
+"""Channel names of this process's market sockets, by subscribed symbol"""
+subscribers = defaultdict(set)
+_watcher_task = None
+
+
+async def push_market_events(period=1.0):
+    """Poll the 1m candles of the subscribed symbols and send their events to this process's subscribers.
+
+    One poll per process serves every socket, so the work follows market
+    events rather than the number of open dashboards.
+    """
+    layer = get_channel_layer()
+    watcher = MarketWatcher()
+    while True:
+        await asyncio.sleep(period)
+        store = reader_stores().get("1m")
+        if store is None:
+            continue
+        for symbol in [s for s, channels in subscribers.items() if not channels]:
+            del subscribers[symbol]
+            watcher.forget(symbol)
+        try:
+            for event in watcher.poll(store, list(subscribers)):
+                for channel in list(subscribers.get(event["symbol"], ())):
+                    await layer.send(channel, {"type": "market.event", "event": event})
+        except Exception as e:
+            print(f"Failed to push market events: {e!r}")
+
+
+def start_market_push():
+    global _watcher_task
+    if _watcher_task is None or _watcher_task.done():
+        period = getattr(settings, "CANDLE_PUSH_INTERVAL", 1.0)
+        _watcher_task = asyncio.get_running_loop().create_task(push_market_events(period))
+
+
+class MarketConsumer(AsyncJsonWebsocketConsumer):
+    """Candle events of the symbols a client subscribes to, plus the signed-in user's triggered alerts.
+
+    Clients send ``{"action": "subscribe" | "unsubscribe", "symbol": "btcusdt"}``
+    and receive ``{"type": "candle", "symbol", "closed", "timestamp", "close", ...}``
+    when a candle closes or the forming candle changes, and
+    ``{"type": "alerts", "alerts": [...]}``.
+    """
+
+    async def connect(self):
+        self.symbols = set()
+        self.alerts = None
+        await self.accept()
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            self.alerts = alert_group(user.id)
+            await self.channel_layer.group_add(self.alerts, self.channel_name)
+        start_market_push()
+
+    async def disconnect(self, code):
+        for symbol in self.symbols:
+            subscribers[symbol].discard(self.channel_name)
+        if self.alerts is not None:
+            await self.channel_layer.group_discard(self.alerts, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get("action")
+        symbol = str(content.get("symbol", "")).lower()
+        if action not in ("subscribe", "unsubscribe") or symbol not in SYMBOLS:
+            await self.send_json({"type": "error", "detail": f"Unknown action {action!r} or symbol {symbol!r}"})
+            return
+        if action == "subscribe":
+            self.symbols.add(symbol)
+            subscribers[symbol].add(self.channel_name)
+        else:
+            self.symbols.discard(symbol)
+            subscribers[symbol].discard(self.channel_name)
+        await self.send_json({"type": "subscriptions", "symbols": sorted(self.symbols)})
+
+    async def market_event(self, event):
+        await self.send_json(event["event"])
+
+    async def alert_triggered(self, event):
+        await self.send_json({"type": "alerts", "alerts": event["alerts"]})
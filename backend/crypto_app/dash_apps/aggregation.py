@@ -0,0 +1,128 @@
+import numpy as np
+from .data_store import Candles, TIMEFRAMES, candle_stores, interval_ms
+
+
+
+def resample(candles, interval):
+    """Vectorized OHLCV resampling of chronological ``candles`` into ``interval`` buckets.
+
+    Returns a new Candles whose last bucket may still be incomplete.
+    """
+    timestamps = np.asarray(candles.timestamp)
+    if not len(timestamps):
+        return Candles(*(np.asarray(candles[c])[:0] for c in Candles.__slots__))
+
+    step = interval_ms(interval)
+    buckets = timestamps - timestamps % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+
+    return Candles(
+        buckets[starts],
+        np.asarray(candles.open)[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        np.asarray(candles.close)[ends],
+        np.add.reduceat(candles.volume, starts),
+    )
+
+
+class CandleAggregator:
+    """Derives higher timeframes incrementally from committed base candles.
+
+    Each (symbol, timeframe) keeps one open bucket that is updated in O(1) per
+    base candle. The bucket is committed to its timeframe store once its last
+    base candle arrives (or a later bucket starts after a gap) and is published
+    as that store's forming candle in between. Repeated base timestamps are
+    ignored, including those of buckets already committed.
+    """
+
+    def __init__(self, base_interval="1m", timeframes=TIMEFRAMES, stores=candle_stores):
+        self.base_ms = interval_ms(base_interval)
+        self.timeframes = {tf: interval_ms(tf) for tf in timeframes}
+        self.stores = stores
+        self._buckets = {}
+        self._committed = {}
+
+    def add(self, symbol, timestamp, open, high, low, close, volume):
+        for timeframe, step in self.timeframes.items():
+            start = timestamp - timestamp % step
+            key = (symbol, timeframe)
+            if timestamp < self._committed.get(key, timestamp):
+                continue
+            bucket = self._buckets.get(key)
+
+            if bucket is not None and bucket[0] != start:
+                if start > bucket[0]:
+                    self._commit(symbol, timeframe, bucket)
+                    bucket = None
+                else:
+                    continue
+
+            if bucket is None:
+                """[start, open, high, low, close, volume, last base timestamp]"""
+                bucket = self._buckets[key] = [start, open, high, low, close, volume, timestamp]
+            elif timestamp <= bucket[6]:
+                continue
+            else:
+                bucket[2] = max(bucket[2], high)
+                bucket[3] = min(bucket[3], low)
+                bucket[4] = close
+                bucket[5] += volume
+                bucket[6] = timestamp
+
+            if timestamp + self.base_ms >= start + step:
+                self._commit(symbol, timeframe, bucket)
+                del self._buckets[key]
+            else:
+                self.stores[timeframe].update_forming(symbol, *bucket[:6])
+
+    def add_kline(self, kline):
+        self.add(kline.symbol, kline.open_time, kline.open, kline.high,
+                 kline.low, kline.close, kline.volume)
+
+    def _commit(self, symbol, timeframe, bucket):
+        """Append ``bucket`` and remember where it ends, so late repeats cannot start it over"""
+        self.stores[timeframe].append(symbol, *bucket[:6])
+        self._committed[(symbol, timeframe)] = bucket[0] + self.timeframes[timeframe]
+
+    def seed(self, symbol, candles):
+        """Rebuild every timeframe of ``symbol`` from base-interval history.
+
+        Buckets older than a timeframe's last stored candle are left alone, so
+        re-seeding after a backfill never shrinks a longer higher-timeframe history.
+        """
+        if not len(candles):
+            return
+        last_base = int(candles.timestamp[-1])
+        for timeframe, step in self.timeframes.items():
+            frame = resample(candles, timeframe)
+            values = np.column_stack([frame.open, frame.high, frame.low, frame.close, frame.volume])
+            store = self.stores[timeframe]
+            self._buckets.pop((symbol, timeframe), None)
+
+            """Buckets cut off by the start of the history or still open are not committed"""
+            first = int(candles.timestamp[0] != frame.timestamp[0])
+            stop = len(frame.timestamp)
+            is_open = last_base + self.base_ms < int(frame.timestamp[-1]) + step
+            stop -= is_open
+            is_open = is_open and stop >= first
+
+            last = store.buffer(symbol).last_timestamp
+            if last is None:
+                store.load(symbol, frame.timestamp[first:stop], values[first:stop])
+            else:
+                for i in range(first, stop):
+                    if frame.timestamp[i] >= last:
+                        store.append(symbol, int(frame.timestamp[i]), *values[i].tolist())
+            if stop > first:
+                self._committed[(symbol, timeframe)] = int(frame.timestamp[stop - 1]) + step
+
+            if is_open:
+                bucket = [int(frame.timestamp[-1]), *values[-1].tolist(), last_base]
+                self._buckets[(symbol, timeframe)] = bucket
+                store.update_forming(symbol, *bucket[:6])
+
+
+"""Higher-timeframe stage fed by the 1m listener"""
+aggregator = CandleAggregator()
@@ -0,0 +1,269 @@
+from collections import defaultdict, deque
+import math
+import threading
+import numpy as np
+from .data_store import live_candles
+
+
+ABOVE, BELOW = 1, -1
+
+"""Per rule kind: the (metric, direction, level field) indexes it is filed under"""
+KIND_INDEXES = {
+    "price_above": [("price", ABOVE, "threshold")],
+    "price_below": [("price", BELOW, "threshold")],
+    "rsi_above": [("rsi", ABOVE, "threshold")],
+    "rsi_below": [("rsi", BELOW, "threshold")],
+    "rsi_outside": [("rsi", BELOW, "threshold"), ("rsi", ABOVE, "upper")],
+    "change_above": [("change", ABOVE, "threshold")],
+    "change_below": [("change", BELOW, "threshold")],
+}
+KINDS = list(KIND_INDEXES)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+"""How far a metric must move back past a level before its rule can fire again:
+a fraction of the level for price, points for RSI and percentage points for change"""
+REARM_MARGINS = {"price": 0.005, "rsi": 2.0, "change": 0.5}
+
+"""Order of the fields in the rule rows the engine is loaded with"""
+RULE_FIELDS = ("id", "user", "symbol", "kind", "threshold", "upper", "window")
+
+
+class ThresholdIndex:
+    """Sorted levels of one (symbol, metric, window, direction), with the rule, user and kind of each.
+
+    ``crossed`` finds the levels passed by a move with two binary searches, so
+    a tick costs O(log n) plus the alerts it triggers, however many rules the
+    index holds. A rule that fired is disarmed until the metric moves back
+    past its level by ``margin`` (times the level when ``relative``); the
+    disarmed rules are kept sorted by that re-arm level, so ``rearm`` is a
+    binary search too, and ``armed`` masks them out of the hits.
+    """
+
+    def __init__(self, direction, margin=0.0, relative=False):
+        self.direction = direction
+        self.margin = margin
+        self.relative = relative
+        self.levels = np.empty(0)
+        self.rules = np.empty(0, dtype=np.int64)
+        self.users = np.empty(0, dtype=np.int64)
+        self.kinds = np.empty(0, dtype=np.int8)
+        self.armed = np.empty(0, dtype=bool)
+        self.rearm_levels = np.empty(0)
+        self.disarmed = np.empty(0, dtype=np.int64)  # positions, in rearm_levels order
+
+    def __len__(self):
+        return len(self.levels)
+
+    def _reorder(self, keep):
+        """Apply ``keep`` (positions) to every column, carrying the disarmed rules over"""
+        disarmed_rules = self.rules[self.disarmed]
+        self.levels, self.rules = self.levels[keep], self.rules[keep]
+        self.users, self.kinds = self.users[keep], self.kinds[keep]
+        order = np.argsort(self.rules)
+        found = np.isin(disarmed_rules, self.rules)
+        self.rearm_levels = self.rearm_levels[found]
+        self.disarmed = order[np.searchsorted(self.rules, disarmed_rules[found], sorter=order)]
+        self.armed = np.ones(len(self.rules), dtype=bool)
+        self.armed[self.disarmed] = False
+
+    def extend(self, levels, rules, users, kinds):
+        self.levels = np.concatenate([self.levels, np.asarray(levels, dtype=np.float64)])
+        self.rules = np.concatenate([self.rules, np.asarray(rules, dtype=np.int64)])
+        self.users = np.concatenate([self.users, np.asarray(users, dtype=np.int64)])
+        self.kinds = np.concatenate([self.kinds, np.asarray(kinds, dtype=np.int8)])
+        self._reorder(np.argsort(self.levels, kind='stable'))
+
+    def remove(self, rule_ids):
+        """Drop the entries of ``rule_ids``; returns the ids that were present"""
+        found = np.isin(self.rules, rule_ids)
+        if not found.any():
+            return self.rules[:0]
+        removed = self.rules[found]
+        self._reorder(np.flatnonzero(~found))
+        return removed
+
+    def crossed(self, previous, current):
+        """Slice of the levels passed moving from ``previous`` to ``current`` in this index's direction"""
+        if self.direction == ABOVE and current > previous:
+            return slice(self.levels.searchsorted(previous, 'right'), self.levels.searchsorted(current, 'right'))
+        if self.direction == BELOW and current < previous:
+            return slice(self.levels.searchsorted(current, 'left'), self.levels.searchsorted(previous, 'left'))
+        return slice(0, 0)
+
+    def fire(self, hits):
+        """Positions in ``hits`` of the rules still armed, which are disarmed from now on"""
+        positions = hits.start + np.flatnonzero(self.armed[hits])
+        if len(positions):
+            self.armed[positions] = False
+            levels = self.levels[positions]
+            margin = np.abs(levels) * self.margin if self.relative else self.margin
+            rearm_levels = levels - self.direction * margin
+            order = np.argsort(rearm_levels)
+            at = self.rearm_levels.searchsorted(rearm_levels[order])
+            self.rearm_levels = np.insert(self.rearm_levels, at, rearm_levels[order])
+            self.disarmed = np.insert(self.disarmed, at, positions[order])
+        return positions
+
+    def rearm(self, value):
+        """Re-arm the disarmed rules whose re-arm level ``value`` has reached"""
+        if not len(self.disarmed):
+            return
+        if self.direction == ABOVE:
+            cut = self.rearm_levels.searchsorted(value, 'left')
+            if cut < len(self.disarmed):
+                self.armed[self.disarmed[cut:]] = True
+                self.rearm_levels, self.disarmed = self.rearm_levels[:cut], self.disarmed[:cut]
+        else:
+            cut = self.rearm_levels.searchsorted(value, 'right')
+            if cut:
+                self.armed[self.disarmed[:cut]] = True
+                self.rearm_levels, self.disarmed = self.rearm_levels[cut:], self.disarmed[cut:]
+
+
+class AlertEngine:
+    """Per-symbol threshold indexes of every active alert rule, evaluated on each candle update.
+
+    ``on_price`` runs on every tick for price rules and for percent-change
+    rules, which compare the price with the close ``window`` candles back in
+    ``store``. ``on_close`` feeds RSI, which only changes when a candle closes.
+    A rule fires when its metric crosses its level, then stays quiet until
+    the metric has moved back past the level by its REARM_MARGINS margin, so
+    a price hovering around a level alerts once. The first value seen for a
+    metric only sets the baseline. Triggered alerts queue up until
+    ``drain()``.
+    """
+
+    def __init__(self, store=live_candles, max_pending=100000, rearm_margins=REARM_MARGINS):
+        self.store = store
+        self.rearm_margins = rearm_margins
+        self.pending = deque(maxlen=max_pending)
+        self.rule_count = 0
+        self.triggered = 0
+        self._indexes = {}
+        self._windows = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def _grouped(self, rows):
+        groups = defaultdict(lambda: ([], [], [], []))
+        count = 0
+        for rule, user, symbol, kind, threshold, upper, window in rows:
+            count += 1
+            for metric, direction, field in KIND_INDEXES[kind]:
+                level = threshold if field == "threshold" else upper
+                if level is None:
+                    continue
+                levels, rules, users, kinds = groups[(symbol.lower(), metric, window if metric == "change" else 0,
+                                                      direction)]
+                levels.append(level)
+                rules.append(rule)
+                users.append(user)
+                kinds.append(KIND_CODES[kind])
+        return groups, count
+
+    def _file(self, groups):
+        for (symbol, metric, window, direction), columns in groups.items():
+            indexes = self._indexes.setdefault(symbol, {})
+            index = indexes.get((metric, window, direction))
+            if index is None:
+                index = indexes[(metric, window, direction)] = ThresholdIndex(
+                    direction, self.rearm_margins.get(metric, 0.0), metric == "price")
+            index.extend(*columns)
+            if metric == "change":
+                self._windows[symbol] = sorted({w for m, w, _ in indexes if m == "change"})
+
+    def load(self, rows):
+        """Replace every rule with ``rows`` of RULE_FIELDS"""
+        groups, count = self._grouped(rows)
+        with self._lock:
+            self._indexes, self._windows = {}, {}
+            self._file(groups)
+            self.rule_count = count
+
+    def remove(self, rule_ids):
+        rule_ids = np.asarray(list(rule_ids), dtype=np.int64)
+        removed = []
+        with self._lock:
+            for indexes in self._indexes.values():
+                for index in indexes.values():
+                    removed.append(index.remove(rule_ids))
+            self.rule_count -= len(np.unique(np.concatenate(removed))) if removed else 0
+
+    def upsert(self, rows):
+        """Add or replace rules given as RULE_FIELDS rows"""
+        rows = list(rows)
+        self.remove(row[0] for row in rows)
+        groups, count = self._grouped(rows)
+        with self._lock:
+            self._file(groups)
+            self.rule_count += count
+
+    def _observe(self, symbol, indexes, metric, window, value, timestamp):
+        key = (symbol, metric, window)
+        previous = self._last.get(key)
+        self._last[key] = value
+        if previous is None or math.isnan(previous) or math.isnan(value):
+            return
+        for direction in (ABOVE, BELOW):
+            index = indexes.get((metric, window, direction))
+            if index is None:
+                continue
+            index.rearm(value)
+            hits = index.crossed(previous, value)
+            if hits.start == hits.stop:
+                continue
+            hits = index.fire(hits)
+            for rule, user, kind, level in zip(index.rules[hits].tolist(), index.users[hits].tolist(),
+                                               index.kinds[hits].tolist(), index.levels[hits].tolist()):
+                self.pending.append({
+                    "rule": rule,
+                    "user": user,
+                    "symbol": symbol,
+                    "kind": KINDS[kind],
+                    "level": level,
+                    "value": value,
+                    "timestamp": int(timestamp),
+                })
+            self.triggered += len(hits)
+
+    def on_price(self, symbol, price, timestamp):
+        indexes = self._indexes.get(symbol)
+        if not indexes:
+            return
+        with self._lock:
+            self._observe(symbol, indexes, "price", 0, price, timestamp)
+            windows = self._windows.get(symbol)
+            if windows and self.store is not None:
+                view = self.store.view(symbol)
+                closes = view.close if view is not None else ()
+                for window in windows:
+                    if 0 < window <= len(closes):
+                        change = (price / closes[-window] - 1) * 100
+                        self._observe(symbol, indexes, "change", window, change, timestamp)
+
+    def on_close(self, symbol, rsi, timestamp):
+        indexes = self._indexes.get(symbol)
+        if not indexes or rsi is None:
+            return
+        with self._lock:
+            self._observe(symbol, indexes, "rsi", 0, rsi, timestamp)
+
+    def drain(self):
+        """Every alert triggered since the last call, oldest first"""
+        alerts = []
+        while self.pending:
+            alerts.append(self.pending.popleft())
+        return alerts
+
+    def stats(self):
+        return {
+            "rules": self.rule_count,
+            "symbols": len(self._indexes),
+            "levels": sum(len(index) for indexes in self._indexes.values() for index in indexes.values()),
+            "triggered": self.triggered,
+            "pending": len(self.pending),
+        }
+
+
+"""Alert rules of the ingester process, fed by the listener"""
+alert_engine = AlertEngine()
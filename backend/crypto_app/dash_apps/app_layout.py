@@ -1,11 +1,12 @@
 from django_plotly_dash import DjangoDash
 from dash import dcc, html
-from .data_store import SYMBOLS
+from .data_store import SYMBOLS, TIMEFRAMES
 
 
 app = DjangoDash("MainIndicators")
 
 DEFAULT_SYMBOL = "btcusdt"
+DEFAULT_INTERVAL = "1m"
 
 app.layout = html.Div(
     style={'textAlign': 'center'},
@@ -25,6 +26,17 @@ app.layout = html.Div(
                 }
         ),
 
+        dcc.Dropdown(
+            id="interval-selector",
+            options=[{"label": i, "value": i} for i in [DEFAULT_INTERVAL, *TIMEFRAMES]],
+            value=DEFAULT_INTERVAL,
+            clearable=False,
+            style={"width": "150px",
+                   "marginBottom": "20px",
+                   "marginLeft": "20px"
+                }
+        ),
+
         html.Div(
             id="trade-recommendation",
             style={
@@ -36,7 +48,10 @@ app.layout = html.Div(
             }
         ),        
         
-        dcc.Interval(id="main-update", interval=5000, n_intervals=0),
+        # Pushed over /ws/market/; polling only runs while that socket is down
+        dcc.Interval(id="main-update", interval=5000, n_intervals=0, disabled=True),
+        dcc.Store(id="market-event"),
+        dcc.Store(id="market-socket"),
         
         html.Div(id="currency-name", 
             style={"fontSize": "22px", 
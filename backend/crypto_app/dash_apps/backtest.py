@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+import time
+import numpy as np
+from . import kernels
+from .history_store import HistoryStore
+from .signal_engine import BUY, RSI_OVERBOUGHT, RSI_OVERSOLD, SELL, STRONG_BUY, rsi_ema_actions
+
+
+"""Binance spot taker fee and an assumed half-spread plus impact, as fractions of the traded price"""
+DEFAULT_FEE = 0.001
+DEFAULT_SLIPPAGE = 0.0005
+
+"""Recommendation that opens a long position, by name"""
+ENTRIES = {"STRONG BUY": STRONG_BUY, "BUY": BUY}
+
+
+def parameter_grid(rsi_periods=(14,), ema_periods=(14,), oversold=(RSI_OVERSOLD,),
+                   overbought=(RSI_OVERBOUGHT,), entries=("STRONG BUY",)):
+    """Every combination of the given values, as a list of parameter dicts"""
+    return [
+        {"rsi_period": r, "ema_period": e, "oversold": lo, "overbought": hi, "entry": entry}
+        for r, e, lo, hi, entry in product(rsi_periods, ema_periods, oversold, overbought, entries)
+    ]
+
+
+def rule_positions(actions, entry=STRONG_BUY, exit=SELL):
+    """Long-only position held after each close: 1 from an ``entry``-or-better action to a ``exit``-or-worse one"""
+    target = np.where(actions >= entry, 1.0, np.where(actions <= exit, 0.0, np.nan))
+    last = np.where(np.isnan(target), 0, np.arange(len(target)))
+    np.maximum.accumulate(last, out=last)
+    position = target[last]
+    position[np.isnan(position)] = 0.0
+    return position
+
+
+def close_returns(close):
+    """Close-to-close simple returns, 0 for the first candle and around missing closes"""
+    close = kernels.as_float(close)
+    returns = np.zeros(len(close))
+    if len(close) > 1:
+        np.divide(close[1:], close[:-1], out=returns[1:])
+        returns[1:] -= 1
+        returns[np.isnan(returns)] = 0.0
+    return returns
+
+
+def replay(returns, position, fee=DEFAULT_FEE, slippage=DEFAULT_SLIPPAGE):
+    """Equity curve and statistics of holding ``position`` (decided and traded at each close).
+
+    Every change of position pays ``fee + slippage`` on the traded fraction,
+    after that candle's return. A position still open at the end is marked to
+    the last close.
+    """
+    n = len(returns)
+    if not n:
+        return {"pnl": 0.0, "max_drawdown": 0.0, "trades": 0, "hit_rate": float("nan"), "exposure": 0.0,
+                "costs": 0.0}
+    changes = np.diff(position, prepend=0.0)
+    turnover = np.abs(changes)
+    growth = np.ones(n)
+    np.multiply(position[:-1], returns[1:], out=growth[1:])
+    growth[1:] += 1
+    growth *= 1 - turnover * (fee + slippage)
+    equity = np.cumprod(growth, out=growth)
+    max_drawdown = np.min(equity / np.maximum.accumulate(equity)) - 1
+
+    entries, exits = np.flatnonzero(changes > 0), np.flatnonzero(changes < 0)
+    if len(exits) < len(entries):
+        exits = np.append(exits, n - 1)
+    trade_returns = equity[exits] / np.r_[1.0, equity][entries] - 1
+
+    return {
+        "pnl": float(equity[-1] - 1),
+        "max_drawdown": float(max_drawdown),
+        "trades": len(entries),
+        "hit_rate": float((trade_returns > 0).mean()) if len(entries) else float("nan"),
+        "exposure": float(position.mean()),
+        "costs": float(turnover.sum() * (fee + slippage)),
+    }
+
+
+def backtest(close, position, fee=DEFAULT_FEE, slippage=DEFAULT_SLIPPAGE):
+    """``replay`` of ``position`` over a close series"""
+    return replay(close_returns(close), kernels.as_float(position), fee, slippage)
+
+
+def backtest_grid(close, grid, fee=DEFAULT_FEE, slippage=DEFAULT_SLIPPAGE):
+    """Backtest every parameter set on one close series; indicators are computed once per distinct period"""
+    close = kernels.as_float(close)
+    rsi_periods = sorted({params["rsi_period"] for params in grid})
+    ema_periods = sorted({params["ema_period"] for params in grid})
+    rsi = dict(zip(rsi_periods, kernels.rsi_sweep(close, rsi_periods).T))
+    ema = dict(zip(ema_periods, kernels.ewm_mean_sweep(close, ema_periods).T))
+
+    returns = close_returns(close)
+
+    results = []
+    for params in grid:
+        actions = rsi_ema_actions(close, ema[params["ema_period"]], rsi[params["rsi_period"]],
+                                  params["oversold"], params["overbought"])
+        position = rule_positions(actions, ENTRIES[params["entry"]])
+        results.append(dict(params, **replay(returns, position, fee, slippage)))
+    return results
+
+
+def backtest_symbol(root, symbol, interval, grid, start=None, end=None, fee=DEFAULT_FEE, slippage=DEFAULT_SLIPPAGE):
+    """Grid results for one symbol's stored history, each tagged with the symbol and candle count"""
+    candles = HistoryStore(root).read(symbol, interval, start, end)
+    if candles is None or not len(candles):
+        return []
+    results = backtest_grid(candles.close, grid, fee, slippage)
+    for result in results:
+        result["symbol"] = symbol
+        result["candles"] = len(candles)
+    return results
+
+
+def run_backtests(root, symbols, interval, grid, start=None, end=None, fee=DEFAULT_FEE,
+                  slippage=DEFAULT_SLIPPAGE, workers=None):
+    """Backtest ``grid`` on every symbol's history in ``root``, one symbol per process.
+
+    Workers read the memory-mapped history themselves, so only the parameter
+    grid and the result rows cross process boundaries.
+    """
+    started = time.monotonic()
+    results, failed = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(backtest_symbol, root, symbol, interval, grid, start, end, fee, slippage): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                failed[futures[future]] = str(e)
+                print(f"Backtest failed for {futures[future]}: {e}")
+    return {"results": results, "failed": failed, "elapsed": time.monotonic() - started}
@@ -1,12 +1,327 @@
-from collections import defaultdict
+import itertools
+import threading
+import time
+from django.conf import settings
+import numpy as np
 import pandas as pd
 
 
 
-"""Shared across all modules Global dictionary to store candles for each symbol"""
-live_candles = defaultdict(lambda: pd.DataFrame(columns=[
-    'timestamp', 'open', 'high', 'low', 'close', 'volume'
-]))
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+VALUE_COLUMNS = CANDLE_COLUMNS[1:]
+
+"""Number of candles kept in memory per symbol"""
+MAX_CANDLES = getattr(settings, "CANDLE_CAPACITY", 500)
+
+"""OHLCV type of this process's ring buffers. float32 halves their value columns and keeps about 7
+significant digits; shared-memory segments and history files stay float64 either way."""
+VALUE_DTYPES = ('float64', 'float32')
+VALUE_DTYPE = getattr(settings, "CANDLE_VALUE_DTYPE", "float64")
+
+"""Minimum seconds between two publications of a forming candle"""
+FORMING_PUBLISH_INTERVAL = 1.0
+
+"""Numbers the stores created without a name, which unlike id() are never reused"""
+_unnamed_stores = itertools.count(1)
+
+INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def interval_ms(interval):
+    """Length of a Binance kline interval such as '1m' or '4h' in milliseconds"""
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+
+class Candles:
+    """Chronological read-only columns of a CandleBuffer.
+
+    The arrays may share memory with the buffer, so they are only valid until
+    the next append. Call ``to_frame()`` (or copy) for a stable snapshot.
+    """
+
+    __slots__ = CANDLE_COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __getitem__(self, column):
+        return getattr(self, column)
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def index(self):
+        """Open times as datetimes, so indicator functions can take Candles like a DataFrame"""
+        return pd.to_datetime(self.timestamp, unit='ms')
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(self.timestamp, unit='ms'),
+            'open': self.open.copy(),
+            'high': self.high.copy(),
+            'low': self.low.copy(),
+            'close': self.close.copy(),
+            'volume': self.volume.copy(),
+        })
+
+
+class CandleBuffer:
+    """Fixed-capacity ring buffer of candles for one symbol.
+
+    Timestamps are int64 epoch milliseconds, OHLCV values are ``dtype``
+    (float64 or float32), one row per candle of capacity and nothing more:
+    appends are O(1) and never allocate. ``view()`` slices the arrays without
+    copying while the candles are contiguous and copies the two wrapped parts
+    in order once the ring has wrapped around.
+
+    The still-open candle is kept apart from the committed ones: it is updated
+    in place on every tick and copied to readers at most once per
+    ``publish_interval`` seconds.
+    """
+
+    def __init__(self, capacity=MAX_CANDLES, publish_interval=FORMING_PUBLISH_INTERVAL, dtype=VALUE_DTYPE):
+        if np.dtype(dtype).name not in VALUE_DTYPES:
+            raise ValueError(f"Unsupported candle dtype {dtype!r}, expected one of {VALUE_DTYPES}")
+        self.capacity = capacity
+        self.publish_interval = publish_interval
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self.version = 0
+        self.forming_version = 0
+        self.lock = threading.Lock()
+        self._head = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((len(VALUE_COLUMNS), capacity), dtype=self.dtype)
+
+        """[timestamp, open, high, low, close, volume] of the open candle: live and last published"""
+        self._forming = np.zeros(len(CANDLE_COLUMNS), dtype=np.float64)
+        self._published = np.zeros(len(CANDLE_COLUMNS), dtype=np.float64)
+        self._has_forming = False
+        self._has_published = False
+        self._pending = False
+        self._published_at = 0.0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Bytes held by the candle arrays"""
+        return self._timestamps.nbytes + self._values.nbytes + self._forming.nbytes + self._published.nbytes
+
+    @property
+    def last_timestamp(self):
+        if not self.size:
+            return None
+        return int(self._timestamps[self._head - 1])
+
+    def append(self, timestamp, open, high, low, close, volume):
+        """Add a closed candle. A repeated timestamp replaces the last row, older ones are ignored."""
+        with self.lock:
+            last = self.last_timestamp
+            if last is not None and timestamp < last:
+                return False
+
+            i = self._head - 1 if timestamp == last else self._head
+            i %= self.capacity
+            values = self._values
+
+            self._timestamps[i] = timestamp
+            values[0, i] = open
+            values[1, i] = high
+            values[2, i] = low
+            values[3, i] = close
+            values[4, i] = volume
+
+            if timestamp != last:
+                self._head = (i + 1) % self.capacity
+                self.size = min(self.size + 1, self.capacity)
+            self.version += 1
+
+            if self._has_forming and self._forming[0] <= timestamp:
+                self._has_forming = self._has_published = self._pending = False
+                self.forming_version += 1
+            return True
+
+    def update_forming(self, timestamp, open, high, low, close, volume):
+        """Overwrite the open candle in place, publishing it if the throttle allows"""
+        with self.lock:
+            last = self.last_timestamp
+            if last is not None and timestamp <= last:
+                return False
+            forming = self._forming
+            forming[0] = timestamp
+            forming[1] = open
+            forming[2] = high
+            forming[3] = low
+            forming[4] = close
+            forming[5] = volume
+            self._has_forming = self._pending = True
+            self._publish_if_due()
+            return True
+
+    def _publish_if_due(self):
+        now = time.monotonic()
+        if self._pending and now - self._published_at >= self.publish_interval:
+            np.copyto(self._published, self._forming)
+            self._has_published = True
+            self._pending = False
+            self._published_at = now
+            self.forming_version += 1
+
+    def forming(self):
+        """Last published provisional candle as a dict, or None. Never part of ``view()``."""
+        with self.lock:
+            self._publish_if_due()
+            if not self._has_published:
+                return None
+            published = self._published
+            candle = dict(zip(VALUE_COLUMNS, published[1:].tolist()))
+            candle['timestamp'] = int(published[0])
+            return candle
+
+    def load(self, timestamps, values):
+        """Replace the contents with ``timestamps`` (n,) and OHLCV ``values`` (n, 5)."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)[-self.capacity:]
+        values = np.asarray(values, dtype=self.dtype)[-self.capacity:]
+        n = len(timestamps)
+
+        with self.lock:
+            self._timestamps[:n] = timestamps
+            self._values[:, :n] = values.T
+            self._head = n % self.capacity
+            self.size = n
+            self.version += 1
+
+    def view(self):
+        """Chronological candles: views while they are contiguous, a copy once the ring has wrapped."""
+        start = (self._head - self.size) % self.capacity
+        stop = start + self.size
+        arrays = [self._timestamps, *self._values]
+        if stop <= self.capacity:
+            columns = [array[start:stop] for array in arrays]
+        else:
+            columns = [np.concatenate((array[start:], array[:stop - self.capacity])) for array in arrays]
+        for column in columns:
+            column.flags.writeable = False
+        return Candles(*columns)
+
+    def to_frame(self):
+        with self.lock:
+            return self.view().to_frame()
+
+
+class CandleStore:
+    """Per-symbol CandleBuffers, readable like the old ``{symbol: DataFrame}`` dict.
+
+    ``name`` and ``generation`` identify the store in cache keys; unnamed
+    stores get a unique name. A local store's versions never start over, so
+    its generation is always 0, unlike a shared reader's.
+    """
+
+    generation = 0
+
+    def __init__(self, capacity=MAX_CANDLES, publish_interval=FORMING_PUBLISH_INTERVAL, dtype=VALUE_DTYPE,
+                 name=None):
+        self.name = name if name is not None else f"store{next(_unnamed_stores)}"
+        self.capacity = capacity
+        self.publish_interval = publish_interval
+        self.dtype = np.dtype(dtype)
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.get(symbol)
+                if buffer is None:
+                    buffer = self._buffers[symbol] = CandleBuffer(self.capacity, self.publish_interval, self.dtype)
+        return buffer
+
+    def append(self, symbol, timestamp, open, high, low, close, volume):
+        return self.buffer(symbol).append(timestamp, open, high, low, close, volume)
+
+    def set_publish_interval(self, seconds):
+        self.publish_interval = seconds
+        for buffer in list(self._buffers.values()):
+            buffer.publish_interval = seconds
+
+    def update_forming(self, symbol, timestamp, open, high, low, close, volume):
+        return self.buffer(symbol).update_forming(timestamp, open, high, low, close, volume)
+
+    def forming(self, symbol):
+        buffer = self._buffers.get(symbol)
+        return buffer.forming() if buffer is not None else None
+
+    def load(self, symbol, timestamps, values):
+        self.buffer(symbol).load(timestamps, values)
+
+    def load_frame(self, symbol, df):
+        timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        self.load(symbol, timestamps, df[VALUE_COLUMNS].to_numpy(dtype=np.float64))
+
+    def view(self, symbol):
+        buffer = self._buffers.get(symbol)
+        return buffer.view() if buffer is not None else None
+
+    def version(self, symbol):
+        """Bumped on every committed change to ``symbol``'s candles, 0 if unknown"""
+        buffer = self._buffers.get(symbol)
+        return buffer.version if buffer is not None else 0
+
+    def get(self, symbol, default=None):
+        buffer = self._buffers.get(symbol)
+        return buffer.to_frame() if buffer is not None else default
+
+    def __getitem__(self, symbol):
+        return self.get(symbol, pd.DataFrame(columns=CANDLE_COLUMNS))
+
+    def __setitem__(self, symbol, df):
+        self.load_frame(symbol, df)
+
+    def __delitem__(self, symbol):
+        with self._lock:
+            del self._buffers[symbol]
+
+    def __contains__(self, symbol):
+        return symbol in self._buffers
+
+    def __iter__(self):
+        return iter(list(self._buffers))
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def keys(self):
+        return list(self._buffers)
+
+    def footprint(self):
+        """Memory held by the candle arrays, in total and per symbol per 1k candles of capacity"""
+        buffers = list(self._buffers.values())
+        nbytes = sum(buffer.nbytes for buffer in buffers)
+        return {
+            "symbols": len(buffers),
+            "capacity": self.capacity,
+            "dtype": self.dtype.name,
+            "bytes": nbytes,
+            "bytes_per_symbol_per_1k": nbytes / len(buffers) / self.capacity * 1000 if buffers else 0.0,
+        }
+
+
+
+"""Shared across all modules: ring-buffer candle store for each symbol"""
+live_candles = CandleStore(name="1m")
+
+"""Higher timeframes derived from the 1m stream, and the store for each interval"""
+TIMEFRAMES = ['5m', '15m', '1h', '4h']
+candle_stores = {'1m': live_candles, **{tf: CandleStore(name=tf) for tf in TIMEFRAMES}}
 
 
 
@@ -20,4 +335,4 @@ SYMBOLS = [
     'crvusdt', 'oneusdt', 'zecusdt', 'dashusdt', 'yfiusdt', 'compusdt', 'omgusdt',
     'sushiusdt', 'ankrusdt', 'lrcusdt', 'wavesusdt', 'zilusdt', 'balusdt', 'qtumusdt',
     'storjusdt'
-]
\ No newline at end of file
+]
@@ -0,0 +1,201 @@
+from contextlib import contextmanager
+import fcntl
+import os
+import shutil
+import threading
+import numpy as np
+from .data_store import CANDLE_COLUMNS, VALUE_COLUMNS, Candles, candle_stores
+
+
+
+"""One raw little-endian file per column"""
+COLUMN_DTYPES = {'timestamp': np.dtype('<i8'), **{c: np.dtype('<f8') for c in VALUE_COLUMNS}}
+
+
+class HistoryStore:
+    """Columnar candle history on disk, one directory per interval and symbol.
+
+    Reads are memory-mapped, so a time range of a long history is sliced
+    without loading the rest into RAM. Value columns are written before the
+    timestamp column and the row count is the shortest column, so a crash
+    mid-append never exposes a half-written candle. Candles older than the
+    stored ones go through ``merge``, which rewrites the symbol's directory
+    and swaps it in. Writes take an flock per symbol, so the ingester and a
+    backfill can share the files.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, interval, column):
+        return os.path.join(self.root, interval, symbol, f"{column}.bin")
+
+    def _sibling(self, symbol, interval, suffix):
+        """Hidden path next to the symbol's directory, for its lock file and merge swaps"""
+        return os.path.join(self.root, interval, f".{symbol}.{suffix}")
+
+    @contextmanager
+    def _locked(self, symbol, interval):
+        os.makedirs(os.path.join(self.root, interval), exist_ok=True)
+        with self._lock, open(self._sibling(symbol, interval, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            """Put back a directory left aside by a merge that was interrupted mid-swap"""
+            directory = os.path.dirname(self._path(symbol, interval, 'timestamp'))
+            replaced = self._sibling(symbol, interval, 'replaced')
+            if os.path.isdir(replaced):
+                if os.path.isdir(directory):
+                    shutil.rmtree(replaced)
+                else:
+                    os.rename(replaced, directory)
+            os.makedirs(directory, exist_ok=True)
+            yield directory
+
+    def intervals(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def symbols(self, interval):
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if not name.startswith('.'))
+
+    def count(self, symbol, interval):
+        sizes = []
+        for column, dtype in COLUMN_DTYPES.items():
+            path = self._path(symbol, interval, column)
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def first_timestamp(self, symbol, interval):
+        if not self.count(symbol, interval):
+            return None
+        with open(self._path(symbol, interval, 'timestamp'), 'rb') as f:
+            return int(np.frombuffer(f.read(8), dtype=COLUMN_DTYPES['timestamp'])[0])
+
+    def last_timestamp(self, symbol, interval):
+        n = self.count(symbol, interval)
+        if not n:
+            return None
+        with open(self._path(symbol, interval, 'timestamp'), 'rb') as f:
+            f.seek((n - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype=COLUMN_DTYPES['timestamp'])[0])
+
+    def append(self, symbol, interval, timestamps, values):
+        """Append candles newer than the last stored one. Returns the number written."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(VALUE_COLUMNS))
+
+        with self._locked(symbol, interval):
+            return self._append(symbol, interval, timestamps, values)
+
+    def _append(self, symbol, interval, timestamps, values):
+        n = self.count(symbol, interval)
+        last = self.last_timestamp(symbol, interval)
+        if last is not None:
+            newer = timestamps > last
+            timestamps, values = timestamps[newer], values[newer]
+        if not len(timestamps):
+            return 0
+
+        columns = [(c, values[:, i]) for i, c in enumerate(VALUE_COLUMNS)]
+        columns.append(('timestamp', timestamps))
+        for column, data in columns:
+            with open(self._path(symbol, interval, column), 'r+b' if n else 'wb') as f:
+                """Drop any torn tail left by an interrupted append"""
+                f.truncate(n * COLUMN_DTYPES[column].itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(data.astype(COLUMN_DTYPES[column], copy=False).tobytes())
+        return len(timestamps)
+
+    def merge(self, symbol, interval, timestamps, values):
+        """Insert candles at any position, keeping stored ones on equal timestamps. Returns the number written.
+
+        Candles newer than the history are appended. Anything else rewrites
+        the symbol's columns in a staging directory that then takes the place
+        of the current one, so readers that already mapped the old files keep
+        them and new readers see the old or the merged history, or briefly none
+        in between the two renames.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(VALUE_COLUMNS))
+        timestamps, unique = np.unique(timestamps, return_index=True)
+        values = values[unique]
+
+        with self._locked(symbol, interval) as directory:
+            stored = self.read(symbol, interval)
+            if stored is None or not len(timestamps) or timestamps[0] > stored.timestamp[-1]:
+                return self._append(symbol, interval, timestamps, values)
+
+            new = ~np.isin(timestamps, stored.timestamp)
+            if not new.any():
+                return 0
+            merged = np.concatenate([stored.timestamp, timestamps[new]])
+            order = np.argsort(merged, kind='stable')
+            columns = {'timestamp': merged[order]}
+            for i, column in enumerate(VALUE_COLUMNS):
+                columns[column] = np.concatenate([stored[column], values[new, i]])[order]
+
+            staging = self._sibling(symbol, interval, 'merge')
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for column, data in columns.items():
+                with open(os.path.join(staging, f"{column}.bin"), 'wb') as f:
+                    f.write(data.astype(COLUMN_DTYPES[column], copy=False).tobytes())
+            replaced = self._sibling(symbol, interval, 'replaced')
+            os.rename(directory, replaced)
+            os.rename(staging, directory)
+            shutil.rmtree(replaced)
+            return int(new.sum())
+
+    def read(self, symbol, interval, start=None, end=None):
+        """Memory-mapped candles with ``start <= timestamp < end`` (epoch ms), or None"""
+        n = self.count(symbol, interval)
+        if not n:
+            return None
+        columns = {
+            column: np.memmap(self._path(symbol, interval, column), dtype=dtype, mode='r', shape=(n,))
+            for column, dtype in COLUMN_DTYPES.items()
+        }
+        timestamps = columns['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = n if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return Candles(*(columns[c][lo:hi] for c in CANDLE_COLUMNS))
+
+    def tail(self, symbol, interval, limit):
+        n = self.count(symbol, interval)
+        if not n:
+            return None
+        candles = self.read(symbol, interval)
+        return Candles(*(candles[c][max(n - limit, 0):] for c in CANDLE_COLUMNS))
+
+
+def flush_stores(history, stores=candle_stores):
+    """Write every candle committed in the live stores since the last flush. Returns rows written."""
+    written = 0
+    for interval, store in stores.items():
+        for symbol in store.keys():
+            last = history.last_timestamp(symbol, interval)
+            buffer = store.buffer(symbol)
+            with buffer.lock:
+                view = buffer.view()
+                newer = slice(None) if last is None else view.timestamp > last
+                timestamps = view.timestamp[newer].copy()
+                values = np.column_stack([view[c][newer] for c in VALUE_COLUMNS])
+            written += history.append(symbol, interval, timestamps, values)
+    return written
+
+
+def load_from_history(symbols, history, stores=candle_stores):
+    """Warm the live stores from disk. Returns the symbols that had 1m history."""
+    loaded = []
+    for interval, store in stores.items():
+        for symbol in symbols:
+            candles = history.tail(symbol, interval, store.capacity)
+            if candles is None or not len(candles):
+                continue
+            values = np.column_stack([candles[c] for c in VALUE_COLUMNS])
+            store.load(symbol, candles.timestamp, values)
+            if interval == '1m':
+                loaded.append(symbol)
+    return loaded
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import threading
+
+
+class IndicatorCache:
+    """Bounded LRU of indicator results, valid until the symbol's candles change.
+
+    Entries are keyed by (store name, store generation, symbol, interval,
+    function, params), where the name of a shared-memory reader carries its
+    segment prefix and timeframe and the generation changes when a restarted
+    ingester creates the segment anew, and remember the store version they
+    were computed from, so a newly committed
+    candle invalidates them on the next lookup while forming-candle ticks do
+    not. Concurrent misses on the same key compute once, the other callers
+    wait for that result.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    def cached(self, key, version, compute):
+        """``compute()`` unless a result for ``key`` at ``version`` is cached"""
+        with self._lock:
+            found, value = self._lookup(key, version)
+            if found:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                found, value = self._lookup(key, version)
+                if found:
+                    return value
+                self.misses += 1
+            value = compute()
+            with self._lock:
+                self._entries[key] = (version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+                    self.evictions += 1
+        return value
+
+    def frame(self, store, symbol, interval="1m"):
+        """``store.get(symbol)`` as a DataFrame, or None; callers must not modify it"""
+        key = (store.name, store.generation, symbol, interval, "frame", ())
+        return self.cached(key, store.version(symbol), lambda: store.get(symbol))
+
+    def indicator(self, store, symbol, interval, func, *args, **params):
+        """``func(frame, *args, **params)`` on the symbol's candles, or None without candles"""
+        key = (store.name, store.generation, symbol, interval, func, args + tuple(sorted(params.items())))
+
+        def compute():
+            frame = self.frame(store, symbol, interval)
+            return func(frame, *args, **params) if frame is not None and not frame.empty else None
+
+        return self.cached(key, store.version(symbol), compute)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+
+
+"""Results shared by every dashboard callback in this process"""
+indicator_cache = IndicatorCache()
@@ -0,0 +1,209 @@
+from collections import OrderedDict
+import numpy as np
+from . import kernels
+from .indicators import _column, _series
+
+
+"""Operations a plan node can run, by name"""
+OPS = {
+    'rolling_mean': kernels.rolling_mean,
+    'rolling_std': kernels.rolling_std,
+    'rolling_min': kernels.rolling_min,
+    'rolling_max': kernels.rolling_max,
+    'rolling_mean_abs_dev': kernels.rolling_mean_abs_dev,
+    'ewm_mean': kernels.ewm_mean,
+    'diff': kernels.diff,
+    'gains': kernels.gains,
+    'losses': kernels.losses,
+    'nan_cumsum': kernels.nan_cumsum,
+    'true_range': kernels.true_range,
+    'typical_price': kernels.typical_price,
+    'directional_movement': kernels.directional_movement,
+    'item': lambda values, index: values[index],
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'divide': kernels.divide,
+    'band': kernels.band,
+    'rsi_from_averages': kernels.rsi_from_averages,
+    'stochastic_k': kernels.stochastic_k,
+    'cci_from': kernels.cci_from,
+    'directional_index': kernels.directional_index,
+    'dx': kernels.dx,
+}
+
+
+class Plan:
+    """DAG of kernel calls. Identical (op, inputs, params) requests share one node.
+
+    Every node records the ``label`` that was set when it was requested, so
+    ``consumers`` tells which indicators share it.
+    """
+
+    def __init__(self, label=None):
+        self.nodes = OrderedDict()
+        self.consumers = {}
+        self.requested = 0
+        self.label = label
+
+    def node(self, op, *inputs, **params):
+        key = (op, inputs, tuple(sorted(params.items())))
+        self.requested += 1
+        if key not in self.nodes:
+            self.nodes[key] = (op, inputs, params)
+            self.consumers[key] = []
+        if self.label not in self.consumers[key]:
+            self.consumers[key].append(self.label)
+        return key
+
+    def column(self, name):
+        return self.node('column', name=name)
+
+    def run(self, data):
+        values = {}
+        for key, (op, inputs, params) in self.nodes.items():
+            if op == 'column':
+                values[key] = _column(data, params['name'])
+            else:
+                values[key] = OPS[op](*(values[i] for i in inputs), **params)
+        return values
+
+
+def describe(key):
+    op, inputs, params = key
+    if op == 'column':
+        return params[0][1]
+    arguments = [describe(i) for i in inputs] + [f"{name}={value}" for name, value in params]
+    return f"{op}({', '.join(arguments)})"
+
+
+"""Indicator builders: add nodes to a plan and return the output node, or a list of them"""
+
+
+def build_sma(plan, period=14):
+    return plan.node('rolling_mean', plan.column('close'), window=period)
+
+
+def build_ema(plan, period=14):
+    return plan.node('ewm_mean', plan.column('close'), span=period)
+
+
+def build_rsi(plan, period=14):
+    delta = plan.node('diff', plan.column('close'))
+    avg_gain = plan.node('rolling_mean', plan.node('gains', delta), window=period)
+    avg_loss = plan.node('rolling_mean', plan.node('losses', delta), window=period)
+    return plan.node('rsi_from_averages', avg_gain, avg_loss)
+
+
+def build_macd(plan, fast=12, slow=26, signal=9):
+    line = plan.node('sub', build_ema(plan, fast), build_ema(plan, slow))
+    signal_line = plan.node('ewm_mean', line, span=signal)
+    return [line, signal_line, plan.node('sub', line, signal_line)]
+
+
+def build_bollinger_bands(plan, period=20):
+    sma = build_sma(plan, period)
+    std = plan.node('rolling_std', plan.column('close'), window=period)
+    return [plan.node('band', sma, std, width=2), plan.node('band', sma, std, width=-2)]
+
+
+def _true_range(plan):
+    return plan.node('true_range', plan.column('high'), plan.column('low'), plan.column('close'))
+
+
+def _typical_price(plan):
+    return plan.node('typical_price', plan.column('high'), plan.column('low'), plan.column('close'))
+
+
+def build_atr(plan, period=14):
+    return plan.node('rolling_mean', _true_range(plan), window=period)
+
+
+def build_vwap(plan):
+    volume = plan.column('volume')
+    price_volume = plan.node('nan_cumsum', plan.node('mul', _typical_price(plan), volume))
+    return plan.node('divide', price_volume, plan.node('nan_cumsum', volume))
+
+
+def build_stochastic(plan, k_period=14, d_period=3):
+    low_min = plan.node('rolling_min', plan.column('low'), window=k_period)
+    high_max = plan.node('rolling_max', plan.column('high'), window=k_period)
+    k = plan.node('stochastic_k', plan.column('close'), low_min, high_max)
+    return [k, plan.node('rolling_mean', k, window=d_period)]
+
+
+def build_cci(plan, period=20):
+    tp = _typical_price(plan)
+    sma = plan.node('rolling_mean', tp, window=period)
+    mad = plan.node('rolling_mean_abs_dev', tp, window=period)
+    return plan.node('cci_from', tp, sma, mad)
+
+
+def build_adx(plan, period=14):
+    movement = plan.node('directional_movement', plan.column('high'), plan.column('low'))
+    atr = build_atr(plan, period)
+    plus_di = plan.node('directional_index',
+                        plan.node('rolling_mean', plan.node('item', movement, index=0), window=period), atr)
+    minus_di = plan.node('directional_index',
+                         plan.node('rolling_mean', plan.node('item', movement, index=1), window=period), atr)
+    return plan.node('rolling_mean', plan.node('dx', plus_di, minus_di), window=period)
+
+
+BUILDERS = {
+    'sma': build_sma,
+    'ema': build_ema,
+    'rsi': build_rsi,
+    'macd': build_macd,
+    'bollinger': build_bollinger_bands,
+    'atr': build_atr,
+    'vwap': build_vwap,
+    'stochastic': build_stochastic,
+    'cci': build_cci,
+    'adx': build_adx,
+}
+
+
+class IndicatorPipeline:
+    """Computes a set of indicators in one pass over a shared DAG.
+
+    ``requests`` maps output labels to ``(indicator, params)``, e.g.
+    ``{"rsi": ("rsi", {}), "bb": ("bollinger", {"period": 14})}``; a list of
+    indicator names uses the defaults. Intermediates such as the SMA inside
+    Bollinger, the true range of ATR and ADX, MACD's EMAs or the typical price
+    are computed once however many indicators need them. ``run(data)``
+    accepts whatever the compute_* functions accept and returns the same
+    outputs keyed by label.
+    """
+
+    def __init__(self, requests):
+        if not isinstance(requests, dict):
+            requests = {name: (name, {}) for name in requests}
+        self.requests = requests
+        self.plan = Plan()
+        self.outputs = {}
+        for label, (indicator, params) in requests.items():
+            if indicator not in BUILDERS:
+                raise ValueError(f"Unknown indicator {indicator!r}, expected one of {sorted(BUILDERS)}")
+            self.plan.label = label
+            self.outputs[label] = BUILDERS[indicator](self.plan, **params)
+        self.plan.label = None
+
+    def run(self, data):
+        values = self.plan.run(data)
+        results = {}
+        for label, output in self.outputs.items():
+            if isinstance(output, list):
+                results[label] = tuple(_series(values[key], data) for key in output)
+            else:
+                results[label] = _series(values[output], data)
+        return results
+
+    def explain(self):
+        """What the planner computed and which intermediates it shared"""
+        plan = self.plan
+        computed = sum(1 for op, _, _ in plan.nodes.values() if op != 'column')
+        lines = [f"{computed} kernel calls for {plan.requested} requested nodes "
+                 f"({plan.requested - len(plan.nodes)} deduplicated)"]
+        for key, labels in plan.consumers.items():
+            if key[0] != 'column' and len(labels) > 1:
+                lines.append(f"  {describe(key)} shared by {', '.join(labels)}")
+        return "\n".join(lines)
@@ -1,108 +1,162 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import pandas as pd
 import numpy as np
+from . import kernels
 
 
 
+def _column(data, name):
+    return kernels.as_float(data[name])
+
+
+def _series(values, data, name=None):
+    """A Series for one symbol, or a DataFrame with a column per symbol for a CandlePanel"""
+    if values.ndim == 2:
+        return pd.DataFrame(values, index=data.index, columns=data.symbols)
+    return pd.Series(values, index=data.index, name=name)
+
+
 def compute_rsi(data, period=14):
-    
-    delta = data['close'].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    
-    return 100 - (100 / (1 + rs))
+
+    delta = kernels.diff(_column(data, 'close'))
+    avg_gain = kernels.rolling_mean(kernels.gains(delta), period)
+    avg_loss = kernels.rolling_mean(kernels.losses(delta), period)
+
+    return _series(kernels.rsi_from_averages(avg_gain, avg_loss), data, 'close')
 
 
 def compute_sma(data, period=14):
-    return data['close'].rolling(window=period).mean()
+    return _series(kernels.rolling_mean(_column(data, 'close'), period), data, 'close')
 
 
 def compute_ema(data, period=14):
-    return data['close'].ewm(span=period, adjust=False).mean()
+    return _series(kernels.ewm_mean(_column(data, 'close'), period), data, 'close')
 
 
 def compute_macd(data, fast=12, slow=26, signal=9):
-    
-    ema_fast = compute_ema(data, fast)
-    ema_slow = compute_ema(data, slow)
-    
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+
+    close = _column(data, 'close')
+    macd_line = kernels.ewm_mean(close, fast) - kernels.ewm_mean(close, slow)
+    signal_line = kernels.ewm_mean(macd_line, signal)
     histogram = macd_line - signal_line
-    
-    return macd_line, signal_line, histogram
+
+    return _series(macd_line, data, 'close'), _series(signal_line, data, 'close'), _series(histogram, data, 'close')
 
 
 def compute_bollinger_bands(data, period=20):
-    
-    sma = compute_sma(data, period)
-    std = data['close'].rolling(window=period).std()
-    upper = sma + (2 * std)
-    lower = sma - (2 * std)
-    
-    return upper, lower
+
+    close = _column(data, 'close')
+    sma = kernels.rolling_mean(close, period)
+    std = kernels.rolling_std(close, period)
+    upper = kernels.band(sma, std, 2)
+    lower = kernels.band(sma, std, -2)
+
+    return _series(upper, data, 'close'), _series(lower, data, 'close')
 
 
 def compute_atr(data, period=14):
-    
-    high_low = data['high'] - data['low']
-    high_close = (data['high'] - data['close'].shift()).abs()
-    low_close = (data['low'] - data['close'].shift()).abs()
-    
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    
-    return atr
+
+    tr = kernels.true_range(_column(data, 'high'), _column(data, 'low'), _column(data, 'close'))
+    atr = kernels.rolling_mean(tr, period)
+
+    return _series(atr, data)
 
 
 def compute_vwap(data):
-    
-    typical_price = (data['high'] + data['low'] + data['close']) / 3
-    vwap = (typical_price * data['volume']).cumsum() / data['volume'].cumsum()
-    
-    return vwap
+
+    typical_price = kernels.typical_price(_column(data, 'high'), _column(data, 'low'), _column(data, 'close'))
+    volume = _column(data, 'volume')
+    vwap = kernels.divide(kernels.nan_cumsum(typical_price * volume), kernels.nan_cumsum(volume))
+
+    return _series(vwap, data)
 
 
 def compute_stochastic(data, k_period=14, d_period=3):
-    
-    low_min = data['low'].rolling(window=k_period).min()
-    high_max = data['high'].rolling(window=k_period).max()
-    k = 100 * (data['close'] - low_min) / (high_max - low_min)
-    d = k.rolling(window=d_period).mean()
-    
-    return k, d
+
+    low_min = kernels.rolling_min(_column(data, 'low'), k_period)
+    high_max = kernels.rolling_max(_column(data, 'high'), k_period)
+    percent_k = kernels.stochastic_k(_column(data, 'close'), low_min, high_max)
+    percent_d = kernels.rolling_mean(percent_k, d_period)
+
+    return _series(percent_k, data), _series(percent_d, data)
 
 
 def compute_cci(data, period=20):
-    
-    tp = (data['high'] + data['low'] + data['close']) / 3
-    sma = tp.rolling(window=period).mean()
-    mad = tp.rolling(window=period).apply(lambda x: np.fabs(x - x.mean()).mean())
-    cci = (tp - sma) / (0.015 * mad)
-    
-    return cci
+
+    tp = kernels.typical_price(_column(data, 'high'), _column(data, 'low'), _column(data, 'close'))
+    sma = kernels.rolling_mean(tp, period)
+    mad = kernels.rolling_mean_abs_dev(tp, period)
+
+    return _series(kernels.cci_from(tp, sma, mad), data)
 
 
 def compute_adx(data, period=14):
-    
-    plus_dm = data['high'].diff()
-    minus_dm = data['low'].diff().abs()
-    plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
-    minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
-
-    tr = pd.concat([
-        data['high'] - data['low'],
-        (data['high'] - data['close'].shift()).abs(),
-        (data['low'] - data['close'].shift()).abs()
-    ], axis=1).max(axis=1)
-
-    atr = tr.rolling(window=period).mean()
-    plus_di = 100 * (pd.Series(plus_dm).rolling(window=period).mean() / atr)
-    minus_di = 100 * (pd.Series(minus_dm).rolling(window=period).mean() / atr)
-    dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
-    adx = dx.rolling(window=period).mean()
-    
-    return adx
+
+    high, low = _column(data, 'high'), _column(data, 'low')
+    plus_dm, minus_dm = kernels.directional_movement(high, low)
+    tr = kernels.true_range(high, low, _column(data, 'close'))
+
+    atr = kernels.rolling_mean(tr, period)
+    plus_di = kernels.directional_index(kernels.rolling_mean(plus_dm, period), atr)
+    minus_di = kernels.directional_index(kernels.rolling_mean(minus_dm, period), atr)
+    adx = kernels.rolling_mean(kernels.dx(plus_di, minus_di), period)
+
+    return _series(adx, data)
+
+
+"""Sweeps: one indicator over many periods, as a DataFrame with a column per period"""
+
+
+def _periods(periods):
+    periods = [int(p) for p in periods]
+    if not periods or min(periods) < 1:
+        raise ValueError("Sweeps need at least one period, all >= 1")
+    return periods
+
+
+def _sweep_column(data, name):
+    values = _column(data, name)
+    if values.ndim != 1:
+        raise ValueError("Sweeps take one symbol's candles, not a panel")
+    return values
+
+
+def _sweep(kernel, values, periods, workers):
+    """``kernel(values, periods)``, split by period over ``workers`` processes for long histories"""
+    if not workers or workers < 2 or len(periods) < 2:
+        return kernel(values, periods)
+    chunks = [c.tolist() for c in np.array_split(periods, min(workers, len(periods)))]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        parts = list(pool.map(kernel, repeat(values), chunks))
+    if isinstance(parts[0], tuple):
+        return tuple(np.concatenate(outputs, axis=1) for outputs in zip(*parts))
+    return np.concatenate(parts, axis=1)
+
+
+def _matrix(values, data, periods):
+    return pd.DataFrame(values, index=data.index, columns=pd.Index(periods, name='period'))
+
+
+def sweep_sma(data, periods, workers=None):
+    periods = _periods(periods)
+    values = _sweep(kernels.rolling_mean_sweep, _sweep_column(data, 'close'), periods, workers)
+    return _matrix(values, data, periods)
+
+
+def sweep_ema(data, periods, workers=None):
+    periods = _periods(periods)
+    values = _sweep(kernels.ewm_mean_sweep, _sweep_column(data, 'close'), periods, workers)
+    return _matrix(values, data, periods)
+
+
+def sweep_rsi(data, periods, workers=None):
+    periods = _periods(periods)
+    values = _sweep(kernels.rsi_sweep, _sweep_column(data, 'close'), periods, workers)
+    return _matrix(values, data, periods)
+
+
+def sweep_bollinger_bands(data, periods, workers=None):
+    periods = _periods(periods)
+    upper, lower = _sweep(kernels.bollinger_sweep, _sweep_column(data, 'close'), periods, workers)
+    return _matrix(upper, data, periods), _matrix(lower, data, periods)
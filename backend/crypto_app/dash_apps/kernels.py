@@ -0,0 +1,303 @@
+import numpy as np
+import pandas as pd
+
+
+"""NumPy kernels behind indicators.py.
+
+Every kernel takes a 1-D array or a 2-D (time x series) array and works
+along axis 0, with pandas' NaN rules: a rolling window is NaN until it holds
+``window`` values and whenever one of them is NaN (or inf, for sums).
+
+Rolling sums are differences of prefix sums, O(n) whatever the window. The
+prefix sums restart at every block of output rows so their rounding error
+stays that of a few thousand additions, and a window of zeros is still
+exactly zero. Rolling min and max are reduced with one in-place ufunc pass
+per window offset over contiguous shifted slices, which beats both strided
+window views and Python-level ``rolling.apply`` for indicator-sized windows.
+"""
+
+
+def as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+"""Output rows per block, so a block and its window stay in cache across the passes"""
+BLOCK_ROWS = 4096
+
+
+def _blocks(n, rows=BLOCK_ROWS):
+    for start in range(0, n, rows):
+        yield start, min(start + rows, n)
+
+
+def _rolling(x, window, ufunc):
+    """``ufunc``-reduce every full window into a NaN-padded array shaped like ``x``"""
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or len(x) < window:
+        return out
+    for start, stop in _blocks(len(x) - window + 1):
+        acc = out[window - 1 + start:window - 1 + stop]
+        acc[...] = x[start:stop]
+        for j in range(1, window):
+            ufunc(acc, x[start + j:stop + j], out=acc)
+    return out
+
+
+def rolling_sum(x, window):
+    """Sum of every full window from blockwise prefix sums, NaN where the window holds NaN or inf"""
+    x = as_float(x)
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or len(x) < window:
+        return out
+    missing = ~np.isfinite(x)
+    gaps = missing.any()
+    values = np.where(missing, 0.0, x) if gaps else x
+    for start, stop in _blocks(len(x) - window + 1):
+        acc = out[window - 1 + start:window - 1 + stop]
+        prefix = np.cumsum(values[start:stop + window - 1], axis=0)
+        acc[...] = prefix[window - 1:]
+        acc[1:] -= prefix[:stop - start - 1]
+        if not gaps:
+            continue
+        prefix = np.cumsum(missing[start:stop + window - 1], axis=0)
+        counts = prefix[window - 1:].copy()
+        counts[1:] -= prefix[:stop - start - 1]
+        acc[counts > 0] = np.nan
+    return out
+
+
+def rolling_mean(x, window):
+    out = rolling_sum(x, window)
+    out /= window
+    return out
+
+
+def rolling_min(x, window):
+    return _rolling(as_float(x), window, np.minimum)
+
+
+def rolling_max(x, window):
+    return _rolling(as_float(x), window, np.maximum)
+
+
+def rolling_std(x, window):
+    """Sample standard deviation (ddof=1) on pandas' compiled online variance, which is already O(n)"""
+    x = as_float(x)
+    out = pd.DataFrame(x.reshape(len(x), -1)).rolling(window).std().to_numpy()
+    return out.reshape(x.shape)
+
+
+def rolling_mean_abs_dev(x, window):
+    """Mean absolute deviation from each window's mean, without a Python call per window"""
+    x = as_float(x)
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or len(x) < window:
+        return out
+    mean = rolling_mean(x, window)
+    deviation = np.empty((min(BLOCK_ROWS, len(x)),) + x.shape[1:])
+    for start, stop in _blocks(len(x) - window + 1):
+        block_mean = mean[window - 1 + start:window - 1 + stop]
+        acc = out[window - 1 + start:window - 1 + stop]
+        dev = deviation[:stop - start]
+        acc[...] = 0.0
+        for j in range(window):
+            np.subtract(x[start + j:stop + j], block_mean, out=dev)
+            np.abs(dev, out=dev)
+            acc += dev
+    out /= window
+    return out
+
+
+def ewm_mean(x, span):
+    """``ewm(span=span, adjust=False).mean()``, column-wise on pandas' compiled recursion"""
+    x = as_float(x)
+    frame = pd.DataFrame(x.reshape(len(x), -1))
+    out = frame.ewm(span=span, adjust=False).mean().to_numpy()
+    return out.reshape(x.shape)
+
+
+def shift(x, periods=1):
+    out = np.full(x.shape, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def diff(x):
+    x = as_float(x)
+    out = np.empty(x.shape)
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    return out
+
+
+def nan_cumsum(x):
+    """Cumulative sum that skips NaNs but keeps them in place, as ``Series.cumsum()``"""
+    x = as_float(x)
+    missing = np.isnan(x)
+    out = np.cumsum(np.where(missing, 0.0, x), axis=0)
+    out[missing] = np.nan
+    return out
+
+
+def true_range(high, low, close):
+    """max(high - low, |high - prev close|, |low - prev close|), ignoring the missing first prev close"""
+    high, low = as_float(high), as_float(low)
+    prev_close = shift(as_float(close))
+    tr = high - low
+    gap = np.abs(high - prev_close)
+    np.fmax(tr, gap, out=tr)
+    np.subtract(low, prev_close, out=gap)
+    np.abs(gap, out=gap)
+    np.fmax(tr, gap, out=tr)
+    return tr
+
+
+def typical_price(high, low, close):
+    tp = as_float(high) + as_float(low)
+    tp += as_float(close)
+    tp /= 3
+    return tp
+
+
+def divide(a, b):
+    """Elementwise a / b with IEEE results (inf, NaN) and no warnings, like pandas"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(a, b)
+
+
+def gains(delta):
+    return np.maximum(delta, 0)
+
+
+def losses(delta):
+    return -np.minimum(delta, 0)
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    return 100 - divide(100, 1 + divide(avg_gain, avg_loss))
+
+
+def band(mean, std, width):
+    return mean + width * std
+
+
+def stochastic_k(close, low_min, high_max):
+    return 100 * divide(as_float(close) - low_min, high_max - low_min)
+
+
+def cci_from(tp, sma, mad):
+    return divide(tp - sma, 0.015 * mad)
+
+
+def directional_movement(high, low):
+    """(+DM, -DM) as compute_adx defines them: a rise in high vs the absolute change in low"""
+    plus_dm = diff(high)
+    minus_dm = np.abs(diff(low))
+    plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
+    minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
+    return plus_dm, minus_dm
+
+
+def directional_index(dm_mean, atr):
+    return 100 * divide(dm_mean, atr)
+
+
+def dx(plus_di, minus_di):
+    return divide(np.abs(plus_di - minus_di), plus_di + minus_di) * 100
+
+
+"""Period sweeps: one call returns a (time x period) matrix, one column per window.
+
+Window sums come from prefix sums shared by every period, so a sweep costs
+one cumulative-sum pass plus one subtraction per period instead of a full
+rolling pass each. Prefix sums restart every block, which keeps their
+magnitude, and so their rounding, local to the rows being computed.
+"""
+
+
+"""Shorter blocks for sums of squares, whose rounding grows with the price drift inside a block"""
+SQUARES_BLOCK_ROWS = 1024
+
+
+def _prefix(values, dtype=np.float64):
+    out = np.zeros(len(values) + 1, dtype=dtype)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_sums(x, windows, squares=False):
+    """Rolling sums of 1-D ``x`` (and of its squares, centred per block) for every window"""
+    n = len(x)
+    sums = np.full((n, len(windows)), np.nan, order='F')
+    sq_sums = np.full((n, len(windows)), np.nan, order='F') if squares else None
+    if n == 0 or not windows:
+        return sums, sq_sums
+    longest = max(windows)
+    for start, stop in _blocks(n, SQUARES_BLOCK_ROWS if squares else BLOCK_ROWS):
+        lo = max(0, start - longest + 1)
+        chunk = x[lo:stop]
+        missing = np.isnan(chunk)
+        filled = np.where(missing, 0.0, chunk)
+        if squares and not missing.all():
+            """Variance ignores a shift, so centre on the block mean before squaring"""
+            filled[~missing] -= chunk[~missing].mean()
+        nans = _prefix(missing, dtype=np.int64)
+        prefix = _prefix(filled)
+        sq_prefix = _prefix(filled * filled) if squares else None
+        for k, window in enumerate(windows):
+            first = max(start, window - 1)
+            if first >= stop:
+                continue
+            end, stop_end = first + 1 - lo, stop + 1 - lo
+            gap = nans[end:stop_end] != nans[end - window:stop_end - window]
+            column = prefix[end:stop_end] - prefix[end - window:stop_end - window]
+            column[gap] = np.nan
+            sums[first:stop, k] = column
+            if squares:
+                column = sq_prefix[end:stop_end] - sq_prefix[end - window:stop_end - window]
+                column[gap] = np.nan
+                sq_sums[first:stop, k] = column
+    return sums, sq_sums
+
+
+def rolling_mean_sweep(x, windows):
+    sums, _ = _window_sums(as_float(x), windows)
+    return sums / np.asarray(windows, dtype=np.float64)
+
+
+def rolling_std_sweep(x, windows):
+    """Sample standard deviation (ddof=1) per window, from block-centred sums and sums of squares"""
+    sums, sq_sums = _window_sums(as_float(x), windows, squares=True)
+    w = np.asarray(windows, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (sq_sums - sums * sums / w) / (w - 1)
+    np.maximum(variance, 0, out=variance, where=~np.isnan(variance))
+    return np.sqrt(variance)
+
+
+def ewm_mean_sweep(x, spans):
+    """One EMA column per span.
+
+    The recursion is sequential in time, so each span runs pandas' compiled
+    recursion into its column of the shared matrix; use a process pool in
+    indicators.py to spread long histories over cores.
+    """
+    x = as_float(x)
+    out = np.empty((len(x), len(spans)), order='F')
+    for k, span in enumerate(spans):
+        out[:, k] = ewm_mean(x, span)
+    return out
+
+
+def rsi_sweep(close, periods):
+    delta = diff(close)
+    return rsi_from_averages(rolling_mean_sweep(gains(delta), periods),
+                             rolling_mean_sweep(losses(delta), periods))
+
+
+def bollinger_sweep(close, periods):
+    close = as_float(close)
+    sma = rolling_mean_sweep(close, periods)
+    std = rolling_std_sweep(close, periods)
+    return band(sma, std, 2), band(sma, std, -2)
@@ -1,19 +1,14 @@
 from dash import dcc, html, Input, Output
 import plotly.graph_objs as go
-from ..tasks.binance_listener import start_ws_thread
 import pandas as pd
-from .indicators import compute_rsi, compute_ema
 from .chart_prices import rsi_price, ema_vs_price_chart
 from .candlestick import candlestick_with_volume_and_ema
-from .data_store import live_candles
+from .shared_store import reader_stores
+from .indicator_cache import indicator_cache
+from .signal_engine import SIGNAL_INDICATORS, signal_engine
 from .app_layout import app
 
 
-
-# Start the Binance WebSocket data fetcher in a background thread
-start_ws_thread()
-
-
 @app.callback(
     [
         Output("trade-recommendation", "children"),
@@ -24,10 +19,18 @@ start_ws_thread()
         Output("current-price", "children"),
         Output("current-rsi", "children"),
     ],
-    [Input("main-update", "n_intervals"), Input("symbol-selector", "value")],
+    [
+        Input("main-update", "n_intervals"),
+        Input("market-event", "data"),
+        Input("symbol-selector", "value"),
+        Input("interval-selector", "value"),
+    ],
 )
-def update_main_dashboard(n, symbol):
-    df = live_candles.get(symbol, pd.DataFrame()).copy()
+def update_main_dashboard(n, event, symbol, interval="1m"):
+    stores = reader_stores()
+    candles = stores.get(interval, stores.get("1m"))
+    df = indicator_cache.frame(candles, symbol, interval) if candles is not None else None
+    df = df.copy() if df is not None else pd.DataFrame()
 
     if df.empty or len(df) < 5:
         return (
@@ -46,35 +49,21 @@ def update_main_dashboard(n, symbol):
     """Convert timestamps to string for Plotly compatibility"""
     df["timestamp"] = df["timestamp"].astype(str)
 
-    ema = compute_ema(df)
-    rsi = compute_rsi(df)
+    """Cached per committed candle, so every viewer of a symbol shares one computation"""
+    results = indicator_cache.indicator(candles, symbol, interval, SIGNAL_INDICATORS.run)
+    ema, rsi = results["ema"], results["rsi"]
 
     latest_price = df["close"].iloc[-1]
-    latest_ema = ema.iloc[-1]
     latest_rsi = rsi.iloc[-1]
 
-
-    if latest_rsi < 30:
-        if latest_price > latest_ema:
-            signal = "🔽 STRONG BUY — RSI is Oversold and Price is Above EMA. Strong upward signal."
-            color = "#ff4444"  # Red 
-        else:
-            signal = "🔽 BUY — RSI is Oversold but Price is Below EMA. Possible rebound ahead."
-            color = "#dc3545"  # Red
-    elif latest_rsi > 70:
-        if latest_price < latest_ema:
-            signal = "🔼 STRONG SELL — RSI is Overbought and Price is Below EMA. Strong downward signal."
-            color = "#00C851"  # Green
-        else:
-            signal = "🔼 SELL — RSI is Overbought but Price is Above EMA. May start to drop."
-            color = "#28a745"  # Green
+    """Signals are evaluated once per closed candle, and only for the symbol on display"""
+    signal_engine.sync(candles, interval, [symbol])
+    state = signal_engine.latest(symbol, interval)
+    recommendation = state["signals"].get("rsi_ema") if state else None
+    if recommendation is None:
+        signal_div = html.Div("Waiting for enough data...", style={"color": "#999"})
     else:
-        signal = "⏸ HOLD — No Clear Signal. Market is neutral; best to wait."
-        color = "#e5c461"  # Yellow
-
-
-    """Signal div with dynamic styling"""
-    signal_div = html.Div(signal, style={"color": color})
+        signal_div = html.Div(recommendation["message"], style={"color": recommendation["color"]})
 
     candle_fig = candlestick_with_volume_and_ema(df=df, symbol=symbol, ema=ema)
 
@@ -82,10 +71,60 @@ def update_main_dashboard(n, symbol):
 
     rsi_fig = rsi_price(df, rsi)
 
-    """Display current price and RSI value"""
+    """Display current price and RSI value, the price from the forming candle when there is one"""
+    forming = candles.forming(symbol)
     currency_name_text = f"Currency: {symbol.upper()}"
-    current_price_text = f"Price: {latest_price} USDT"
+    current_price_text = f"Price: {forming['close'] if forming else latest_price} USDT"
     current_rsi_text = f"RSI: {latest_rsi:.2f}"
 
     return signal_div, dcc.Graph(figure=candle_fig), ema_fig, rsi_fig, currency_name_text, current_price_text, current_rsi_text
 
+
+"""Keep one market socket per page, subscribed to the selected symbol.
+
+Closed candles re-run update_main_dashboard through ``market-event``; forming
+candle updates only rewrite the price in the browser. While the socket is
+down the ``main-update`` interval polls instead.
+"""
+app.clientside_callback(
+    """
+    function(symbol) {
+        const state = window.marketSocket = window.marketSocket || {symbol: null, socket: null};
+        const send = (action, s) => state.socket.send(JSON.stringify({action: action, symbol: s}));
+        if (!state.socket) {
+            const connect = () => {
+                const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+                const socket = state.socket = new WebSocket(`${scheme}://${window.location.host}/ws/market/`);
+                socket.onopen = () => {
+                    dash_clientside.set_props("main-update", {disabled: true});
+                    if (state.symbol) send("subscribe", state.symbol);
+                };
+                socket.onmessage = (message) => {
+                    const event = JSON.parse(message.data);
+                    if (event.type !== "candle" || event.symbol !== state.symbol) return;
+                    if (event.closed) {
+                        dash_clientside.set_props("market-event", {data: event});
+                    } else {
+                        dash_clientside.set_props("current-price", {children: `Price: ${event.close} USDT`});
+                    }
+                };
+                socket.onclose = () => {
+                    dash_clientside.set_props("main-update", {disabled: false});
+                    setTimeout(connect, 5000);
+                };
+            };
+            connect();
+        }
+        if (state.symbol !== symbol) {
+            if (state.socket.readyState === WebSocket.OPEN) {
+                if (state.symbol) send("unsubscribe", state.symbol);
+                send("subscribe", symbol);
+            }
+            state.symbol = symbol;
+        }
+        return symbol;
+    }
+    """,
+    Output("market-socket", "data"),
+    Input("symbol-selector", "value"),
+)
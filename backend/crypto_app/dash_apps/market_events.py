@@ -0,0 +1,40 @@
+class MarketWatcher:
+    """Turns candle store changes into one event per symbol: a closed candle, or a new forming candle.
+
+    ``poll`` compares each symbol's committed candle version (with the store's
+    generation, as a restarted ingester's versions start over) and published
+    forming candle with the previous call, so it costs O(symbols) however many
+    clients are listening. The first poll of a symbol only sets the baseline.
+    """
+
+    def __init__(self):
+        self._seen = {}
+
+    def poll(self, store, symbols):
+        events = []
+        for symbol in symbols:
+            version, forming = (store.generation, store.version(symbol)), store.forming(symbol)
+            previous = self._seen.get(symbol)
+            self._seen[symbol] = (version, forming)
+            if previous is None or previous == (version, forming):
+                continue
+
+            if version != previous[0]:
+                view = store.view(symbol)
+                if view is None or not len(view):
+                    continue
+                candle = {
+                    'timestamp': int(view.timestamp[-1]),
+                    'open': float(view.open[-1]),
+                    'high': float(view.high[-1]),
+                    'low': float(view.low[-1]),
+                    'close': float(view.close[-1]),
+                    'volume': float(view.volume[-1]),
+                }
+                events.append(dict(candle, type="candle", symbol=symbol, closed=True, forming=forming))
+            elif forming is not None:
+                events.append(dict(forming, type="candle", symbol=symbol, closed=False))
+        return events
+
+    def forget(self, symbol):
+        self._seen.pop(symbol, None)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from .data_store import VALUE_COLUMNS
+
+
+class CandlePanel:
+    """Many symbols' candles aligned on one time axis, one 2-D (time x symbol) array per column.
+
+    ``panel['close']`` works like ``df['close']``, so the indicator functions
+    in indicators.py take a panel directly and compute every symbol in one
+    vectorized pass, returning DataFrames with a column per symbol. Symbols
+    missing a candle at some timestamp hold NaN there.
+    """
+
+    def __init__(self, timestamps, symbols, columns):
+        self.timestamps = timestamps
+        self.symbols = list(symbols)
+        self.columns = columns
+
+    @property
+    def index(self):
+        return pd.to_datetime(self.timestamps, unit='ms')
+
+    def __getitem__(self, column):
+        if column == 'timestamp':
+            return self.timestamps
+        return self.columns[column]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def shape(self):
+        return len(self.timestamps), len(self.symbols)
+
+
+def build_panel(store, symbols=None, limit=None):
+    """Align the candles of ``symbols`` (default: every symbol in ``store``) into a CandlePanel.
+
+    ``store`` is anything with ``view(symbol)`` returning Candles: a CandleStore
+    or a shared-memory reader. Only the last ``limit`` timestamps are kept.
+    """
+    symbols = list(store.keys()) if symbols is None else list(symbols)
+    views = {}
+    for symbol in symbols:
+        view = store.view(symbol)
+        if view is not None and len(view):
+            views[symbol] = view
+
+    if views:
+        timestamps = np.unique(np.concatenate([np.asarray(v.timestamp) for v in views.values()]))
+    else:
+        timestamps = np.empty(0, dtype=np.int64)
+    if limit is not None:
+        timestamps = timestamps[-limit:]
+
+    columns = {c: np.full((len(timestamps), len(symbols)), np.nan) for c in VALUE_COLUMNS}
+    for j, symbol in enumerate(symbols):
+        view = views.get(symbol)
+        if view is None:
+            continue
+        ts = np.asarray(view.timestamp)
+        keep = ts >= timestamps[0] if len(timestamps) else slice(0)
+        rows = np.searchsorted(timestamps, ts[keep])
+        for c in VALUE_COLUMNS:
+            columns[c][rows, j] = np.asarray(view[c])[keep]
+
+    return CandlePanel(timestamps, symbols, columns)
@@ -0,0 +1,216 @@
+from functools import lru_cache
+import math
+import operator
+import re
+import threading
+import numpy as np
+from .streaming_indicators import Atr, Ema, IndicatorEngine, Rsi
+
+
+"""Streaming indicators behind the screener columns, with the dashboard's default periods"""
+SCREENER_INDICATORS = {
+    'ema': Ema,
+    'rsi': Rsi,
+    'atr': Atr,
+}
+
+"""Columns of the snapshot table; 'change' and 'volume' cover the last CHANGE_WINDOW closed candles"""
+COLUMNS = ("price", "change", "rsi", "ema", "ema_distance", "atr", "atr_pct", "volume", "timestamp")
+CHANGE_WINDOW = 60
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+TOKEN = re.compile(r"\s*(?:(-?\d+(?:\.\d*)?|-?\.\d+)|([a-z_]+)|(<=|>=|==|!=|<|>|=))")
+
+
+def _tokens(text):
+    position, tokens = 0, []
+    text = text.strip().lower()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected {text[position:position + 10]!r} in query")
+        number, word, op = match.groups()
+        tokens.append(float(number) if number is not None else word or op)
+        position = match.end()
+    return tokens
+
+
+def _operand(token):
+    if isinstance(token, float):
+        return token
+    if token in COLUMNS:
+        return token
+    raise ValueError(f"Unknown column {token!r}, expected one of {', '.join(COLUMNS)}")
+
+
+@lru_cache(maxsize=256)
+def parse_query(text):
+    """Parse e.g. ``"rsi < 30 and price > ema"`` into OR-ed groups of AND-ed (left, op, right) conditions.
+
+    Operands are column names or numbers; ``and`` binds tighter than ``or``.
+    Raises ValueError on anything else.
+    """
+    tokens = _tokens(text)
+    groups, conditions = [], []
+    i = 0
+    while i < len(tokens):
+        if i + 3 > len(tokens) or tokens[i + 1] not in OPERATORS:
+            raise ValueError(f"Expected '<column> <operator> <value>' in {text!r}")
+        conditions.append((_operand(tokens[i]), tokens[i + 1], _operand(tokens[i + 2])))
+        i += 3
+        if i < len(tokens):
+            if tokens[i] == "or":
+                groups.append(tuple(conditions))
+                conditions = []
+            elif tokens[i] != "and":
+                raise ValueError(f"Expected 'and' or 'or' after a condition in {text!r}")
+            i += 1
+            if i == len(tokens):
+                raise ValueError(f"Query {text!r} ends with {tokens[-1]!r}")
+    if conditions:
+        groups.append(tuple(conditions))
+    return tuple(groups)
+
+
+class Screener:
+    """One row of latest values per symbol, for filtering and sorting every symbol at once.
+
+    ``sync(store)`` feeds only the candles closed since the previous call into
+    per-symbol streaming indicators and rewrites those symbols' rows, so a
+    query is a few vectorized comparisons over the table and never recomputes
+    an indicator.
+    """
+
+    def __init__(self, indicators=SCREENER_INDICATORS, change_window=CHANGE_WINDOW):
+        self.engine = IndicatorEngine(indicators)
+        self.change_window = change_window
+        self.symbols = []
+        self.table = np.full((0, len(COLUMNS)), np.nan)
+        self._rows = {}
+        self._last = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _advance(self, symbol, view):
+        """Feed the candles of ``view`` after the last one seen, or rebuild after a gap"""
+        timestamps = view.timestamp
+        last = self._last.get(symbol)
+        if last is None or last < timestamps[0]:
+            values = self.engine.rebuild(symbol, view)
+        else:
+            values = self.engine.latest(symbol)
+            for i in range(int(np.searchsorted(timestamps, last, 'right')), len(timestamps)):
+                values = self.engine.update(symbol, int(timestamps[i]), view.open[i], view.high[i], view.low[i],
+                                            view.close[i], view.volume[i])
+        self._last[symbol] = int(timestamps[-1])
+        return values
+
+    def update(self, symbol, view, values):
+        """Rewrite the row of ``symbol`` from its candles and latest indicator values"""
+        close = float(view.close[-1])
+        window = min(self.change_window, len(view) - 1)
+        reference = float(view.close[-1 - window]) if window else math.nan
+        ema, atr = values.get('ema', math.nan), values.get('atr', math.nan)
+        row = (
+            close,
+            (close / reference - 1) * 100,
+            values.get('rsi', math.nan),
+            ema,
+            (close / ema - 1) * 100 if ema else math.nan,
+            atr,
+            atr / close * 100 if close else math.nan,
+            float(view.volume[-window or -1:].sum()),
+            float(view.timestamp[-1]),
+        )
+        with self._lock:
+            i = self._rows.get(symbol)
+            if i is None:
+                i = self._rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                if i == len(self.table):
+                    grown = np.full((max(16, 2 * i), len(COLUMNS)), np.nan)
+                    grown[:i] = self.table
+                    self.table = grown
+            self.table[i] = row
+
+    def forget(self, symbol):
+        """Drop the row and indicator state of ``symbol``"""
+        with self._sync_lock, self._lock:
+            i = self._rows.pop(symbol, None)
+            if i is not None:
+                last = len(self.symbols) - 1
+                if i != last:
+                    self.symbols[i] = self.symbols[last]
+                    self.table[i] = self.table[last]
+                    self._rows[self.symbols[i]] = i
+                self.symbols.pop()
+                self.table[last] = np.nan
+            self._last.pop(symbol, None)
+            self._versions.pop(symbol, None)
+            self.engine.forget(symbol)
+
+    def sync(self, store, symbols=None):
+        """Refresh the rows of the symbols of ``store`` with new committed candles"""
+        with self._sync_lock:
+            for symbol in (store.keys() if symbols is None else symbols):
+                version = store.version(symbol)
+                seen = self._versions.get(symbol)
+                if not version or seen == (store.generation, version):
+                    continue
+                if seen is not None and seen[0] != store.generation:
+                    """A restarted ingester's candles may differ from the ones replayed so far"""
+                    self._last.pop(symbol, None)
+                view = store.view(symbol)
+                self._versions[symbol] = (store.generation, version)
+                if view is None or not len(view):
+                    continue
+                self.update(symbol, view, self._advance(symbol, view))
+
+    def query(self, where="", order_by="", limit=None):
+        """Rows matching ``where`` (see parse_query), sorted by ``order_by`` ('-column' for descending)"""
+        groups = parse_query(where) if where.strip() else ()
+        descending = order_by.startswith("-")
+        order_by = order_by.lstrip("-")
+        if order_by and order_by not in COLUMNS:
+            raise ValueError(f"Unknown column {order_by!r}, expected one of {', '.join(COLUMNS)}")
+
+        with self._lock:
+            symbols = list(self.symbols)
+            table = self.table[:len(symbols)].copy()
+        columns = dict(zip(COLUMNS, table.T))
+
+        rows = np.arange(len(symbols))
+        if groups:
+            mask = np.zeros(len(symbols), dtype=bool)
+            for conditions in groups:
+                matched = np.ones(len(symbols), dtype=bool)
+                for left, op, right in conditions:
+                    matched &= OPERATORS[op](columns.get(left, left), columns.get(right, right))
+                mask |= matched
+            rows = rows[mask]
+        if order_by:
+            keys = columns[order_by][rows]
+            rows = rows[np.argsort(-keys if descending else keys, kind='stable')]
+        if limit is not None:
+            rows = rows[:limit]
+
+        results = []
+        for i, values in zip(rows.tolist(), table[rows].tolist()):
+            row = {"symbol": symbols[i]}
+            row.update((name, None if math.isnan(v) else v) for name, v in zip(COLUMNS, values))
+            row["timestamp"] = int(values[-1])
+            results.append(row)
+        return results
+
+
+"""Snapshot of the 1m candles of every symbol, synced from the store on demand"""
+screener = Screener()
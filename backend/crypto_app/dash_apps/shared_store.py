@@ -0,0 +1,316 @@
+from multiprocessing import resource_tracker, shared_memory
+import secrets
+import threading
+import time
+from django.conf import settings
+import numpy as np
+import pandas as pd
+from .data_store import CANDLE_COLUMNS, TIMEFRAMES, VALUE_COLUMNS, Candles, MAX_CANDLES, candle_stores
+
+
+
+MAGIC = 0x47524F4F54  # "GROOT"
+HEADER_WORDS = 5      # magic, symbol count, capacity, retired, generation
+SYMBOL_BYTES = 16
+CONTROL_WORDS = 2     # sequence number (odd while publishing), active slot
+SLOT_HEADER_WORDS = 3 + len(CANDLE_COLUMNS)  # size, has forming, candle version, forming candle
+READ_RETRIES = 1000
+
+
+"""Segments created by this process, whose resource tracker entry must be kept"""
+_created = set()
+
+
+def _slot_words(capacity):
+    return SLOT_HEADER_WORDS + capacity * len(CANDLE_COLUMNS)
+
+
+def segment_size(symbol_count, capacity):
+    symbols = symbol_count * SYMBOL_BYTES
+    per_symbol = CONTROL_WORDS + 2 * _slot_words(capacity)
+    return 8 * HEADER_WORDS + symbols + 8 * symbol_count * per_symbol
+
+
+class SharedCandleSegment:
+    """Columnar candle windows in one shared-memory segment, one writer and many reader processes.
+
+    Every symbol has two slots. The writer fills the inactive slot with the
+    whole chronological window, then flips ``active``. The symbol's sequence
+    number works as a seqlock: it is bumped to an odd value before the write
+    and to the next even value after it. A reader's copy of a view is only
+    consistent if the sequence number was even when the view was taken and
+    has not changed since (``is_current``).
+
+    Versions start over in every new segment, so each one gets a random
+    ``generation`` that tells it apart from the segments of earlier writers.
+    """
+
+    def __init__(self, name, symbols=None, capacity=MAX_CANDLES, create=False):
+        if create:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                """Tell readers still mapping a crashed writer's segment to re-attach"""
+                if stale.size >= 8 * HEADER_WORDS:
+                    np.ndarray(HEADER_WORDS, dtype=np.int64, buffer=stale.buf)[3] = 1
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            size = segment_size(len(symbols), capacity)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _created.add(self.shm._name)
+            header = np.ndarray(HEADER_WORDS, dtype=np.int64, buffer=self.shm.buf)
+            header[:] = [MAGIC, len(symbols), capacity, 0, secrets.randbits(63)]
+            table = np.ndarray(len(symbols), dtype=f"S{SYMBOL_BYTES}", buffer=self.shm.buf, offset=8 * HEADER_WORDS)
+            table[:] = [s.encode() for s in symbols]
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            """Readers must not unlink the writer's segment when they exit"""
+            if self.shm._name not in _created:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            header = np.ndarray(HEADER_WORDS, dtype=np.int64, buffer=self.shm.buf)
+            if header[0] != MAGIC:
+                raise ValueError(f"Shared memory segment {name!r} is not a candle store")
+
+        self.name = name
+        self.owner = create
+        self._header = header
+        count, self.capacity = int(header[1]), int(header[2])
+        self.generation = int(header[4])
+        table = np.ndarray(count, dtype=f"S{SYMBOL_BYTES}", buffer=self.shm.buf, offset=8 * HEADER_WORDS)
+        self.symbols = [s.decode() for s in table]
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+
+        offset = 8 * HEADER_WORDS + count * SYMBOL_BYTES
+        per_symbol = CONTROL_WORDS + 2 * _slot_words(self.capacity)
+        words = np.ndarray(count * per_symbol, dtype=np.int64, buffer=self.shm.buf, offset=offset)
+        blocks = words.reshape(count, per_symbol)
+        self._control = blocks[:, :CONTROL_WORDS]
+        slots = blocks[:, CONTROL_WORDS:].reshape(count, 2, _slot_words(self.capacity))
+        self._sizes = slots[:, :, 0]
+        self._has_forming = slots[:, :, 1]
+        self._candle_versions = slots[:, :, 2]
+        self._forming = slots[:, :, 3:SLOT_HEADER_WORDS].view(np.float64)
+        columns = slots[:, :, SLOT_HEADER_WORDS:].reshape(count, 2, len(CANDLE_COLUMNS), self.capacity)
+        self._timestamps = columns[:, :, 0]
+        self._values = columns[:, :, 1:].view(np.float64)
+
+    @property
+    def retired(self):
+        """True once the writer has closed or replaced this segment"""
+        return bool(self._header[3])
+
+    def close(self):
+        if self.owner:
+            self._header[3] = 1
+        self._header = self._control = self._sizes = self._has_forming = self._forming = None
+        self._candle_versions = None
+        self._timestamps = self._values = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _created.discard(self.shm._name)
+
+    # Writer
+
+    def publish(self, symbol, buffer):
+        """Copy ``buffer``'s committed window and published forming candle into the inactive slot"""
+        i = self._index[symbol]
+        slot = 1 - int(self._control[i, 1])
+        forming = buffer.forming()
+        self._control[i, 0] += 1
+        with buffer.lock:
+            view = buffer.view()
+            n = len(view)
+            self._candle_versions[i, slot] = buffer.version
+            self._timestamps[i, slot, :n] = view.timestamp
+            for c, column in enumerate(VALUE_COLUMNS):
+                self._values[i, slot, c, :n] = view[column]
+        self._sizes[i, slot] = n
+        self._has_forming[i, slot] = forming is not None
+        if forming is not None:
+            self._forming[i, slot] = [forming[c] for c in CANDLE_COLUMNS]
+        self._control[i, 1] = slot
+        self._control[i, 0] += 1
+
+    # Readers
+
+    def version(self, symbol):
+        i = self._index.get(symbol)
+        return int(self._control[i, 0]) if i is not None else 0
+
+    def candle_version(self, symbol):
+        """The writer's CandleBuffer.version for ``symbol``: changes with committed candles only"""
+        i = self._index.get(symbol)
+        if i is None or not self._control[i, 0]:
+            return 0
+        return int(self._candle_versions[i, int(self._control[i, 1])])
+
+    def view(self, symbol):
+        """Zero-copy (Candles, sequence number) for ``symbol``, or (None, 0).
+
+        The arrays may be overwritten at any time: copy them, then check
+        ``is_current`` before using the copy.
+        """
+        i = self._index.get(symbol)
+        if i is None or not self._control[i, 0]:
+            return None, 0
+        seq = int(self._control[i, 0])
+        slot = int(self._control[i, 1])
+        n = int(self._sizes[i, slot])
+        columns = [self._timestamps[i, slot, :n]]
+        columns.extend(self._values[i, slot, c, :n] for c in range(len(VALUE_COLUMNS)))
+        return Candles(*columns), seq
+
+    def is_current(self, symbol, seq):
+        """True if no publish of ``symbol`` was running at ``seq`` or has started since"""
+        return seq % 2 == 0 and self.version(symbol) == seq
+
+    def forming(self, symbol):
+        """(forming candle dict or None, sequence number), subject to ``is_current`` like ``view``"""
+        i = self._index.get(symbol)
+        if i is None:
+            return None, 0
+        seq = int(self._control[i, 0])
+        slot = int(self._control[i, 1])
+        if not self._has_forming[i, slot]:
+            return None, seq
+        values = self._forming[i, slot].tolist()
+        candle = dict(zip(VALUE_COLUMNS, values[1:]))
+        candle['timestamp'] = int(values[0])
+        return candle, seq
+
+
+class SharedCandleReader:
+    """CandleStore-compatible read API over a SharedCandleSegment.
+
+    Every read copies the segment and retries if the writer published in the
+    meantime, so callers never hold arrays that can change under them.
+    """
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.name = segment.name
+        self.generation = segment.generation
+        self.capacity = segment.capacity
+
+    def _read(self, symbol, read):
+        for _ in range(READ_RETRIES):
+            value, seq = read(symbol)
+            if not seq or self.segment.is_current(symbol, seq):
+                return value
+            time.sleep(0)
+        print(f"Gave up reading {symbol} from {self.segment.name}: the writer kept publishing")
+        return None
+
+    def view(self, symbol):
+        """Consistent copy of ``symbol``'s Candles, or None"""
+        def read(symbol):
+            candles, seq = self.segment.view(symbol)
+            if candles is None:
+                return None, seq
+            return Candles(*(np.array(candles[c]) for c in CANDLE_COLUMNS)), seq
+        return self._read(symbol, read)
+
+    def version(self, symbol):
+        return self.segment.candle_version(symbol)
+
+    def forming(self, symbol):
+        return self._read(symbol, self.segment.forming)
+
+    def get(self, symbol, default=None):
+        """Stable DataFrame copy"""
+        candles = self.view(symbol)
+        return candles.to_frame() if candles is not None else default
+
+    def __getitem__(self, symbol):
+        return self.get(symbol, pd.DataFrame(columns=CANDLE_COLUMNS))
+
+    def __contains__(self, symbol):
+        return self.segment.version(symbol) > 0
+
+    def keys(self):
+        return [s for s in self.segment.symbols if s in self]
+
+
+def segment_name(prefix, interval):
+    return f"{prefix}_{interval}"
+
+
+class SharedStorePublisher:
+    """Mirrors local CandleStores into shared memory whenever a symbol's candles change"""
+
+    def __init__(self, prefix, stores, symbols):
+        self.stores = stores
+        self.symbols = list(symbols)
+        self.segments = {
+            interval: SharedCandleSegment(segment_name(prefix, interval), symbols, store.capacity, create=True)
+            for interval, store in stores.items()
+        }
+        self._published = {}
+
+    def publish(self, symbol):
+        for interval, store in self.stores.items():
+            if symbol not in store:
+                continue
+            buffer = store.buffer(symbol)
+            key = (interval, symbol)
+            state = (buffer.version, buffer.forming_version)
+            if self._published.get(key) != state:
+                self.segments[interval].publish(symbol, buffer)
+                self._published[key] = state
+
+    def publish_all(self, symbols=None):
+        for symbol in self.symbols if symbols is None else symbols:
+            self.publish(symbol)
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+
+
+_attached = {}
+_attach_lock = threading.Lock()
+
+
+def shared_readers(prefix, intervals):
+    """Readers for the ingester's segments, attached on first use.
+
+    Intervals whose segment does not exist yet (ingester not started) are
+    left out, and readers of a retired segment are re-attached to the one a
+    restarted ingester has created.
+    """
+    readers = {}
+    with _attach_lock:
+        for interval in intervals:
+            key = (prefix, interval)
+            reader = _attached.get(key)
+            if reader is not None and reader.segment.retired:
+                del _attached[key]
+                try:
+                    reader.segment.close()
+                except BufferError:
+                    """A view is still in use, the mapping goes away with it"""
+                    pass
+                reader = None
+            if reader is None:
+                try:
+                    reader = _attached[key] = SharedCandleReader(SharedCandleSegment(segment_name(prefix, interval)))
+                except (FileNotFoundError, ValueError):
+                    continue
+            readers[interval] = reader
+    return readers
+
+
+def attach_readers(prefix, intervals):
+    """CandleStore-like readers for every interval a publisher has created"""
+    return {
+        interval: SharedCandleReader(SharedCandleSegment(segment_name(prefix, interval)))
+        for interval in intervals
+    }
+
+
+def reader_stores():
+    """Candles published by the run_ingester process, or this process's stores without shared memory"""
+    prefix = getattr(settings, "CANDLE_SHARED_MEMORY_PREFIX", "")
+    return shared_readers(prefix, ["1m", *TIMEFRAMES]) if prefix else candle_stores
@@ -0,0 +1,203 @@
+from collections import deque
+import math
+import threading
+import numpy as np
+from .indicator_cache import indicator_cache
+from .indicator_pipeline import IndicatorPipeline
+
+
+"""Indicators the rules read, computed in one pass and shared with the dashboard charts"""
+SIGNAL_INDICATORS = IndicatorPipeline(["ema", "rsi", "macd", "bollinger"])
+
+
+def _known(*values):
+    return all(v is not None and not math.isnan(v) for v in values)
+
+
+def signal(action, message, color):
+    return {"action": action, "message": message, "color": color}
+
+
+"""RSI zones of the recommendation rule"""
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+
+"""Recommendation codes, ordered so that higher means more bullish"""
+STRONG_SELL, SELL, HOLD, BUY, STRONG_BUY = -2, -1, 0, 1, 2
+
+RSI_EMA_SIGNALS = {
+    STRONG_BUY: signal("STRONG BUY", "🔽 STRONG BUY — RSI is Oversold and Price is Above EMA. Strong upward signal.",
+                       "#ff4444"),
+    BUY: signal("BUY", "🔽 BUY — RSI is Oversold but Price is Below EMA. Possible rebound ahead.", "#dc3545"),
+    HOLD: signal("HOLD", "⏸ HOLD — No Clear Signal. Market is neutral; best to wait.", "#e5c461"),
+    SELL: signal("SELL", "🔼 SELL — RSI is Overbought but Price is Above EMA. May start to drop.", "#28a745"),
+    STRONG_SELL: signal("STRONG SELL",
+                        "🔼 STRONG SELL — RSI is Overbought and Price is Below EMA. Strong downward signal.",
+                        "#00C851"),
+}
+
+
+def rsi_ema_actions(price, ema, rsi, oversold=RSI_OVERSOLD, overbought=RSI_OVERBOUGHT):
+    """Recommendation code of every element: RSI zones, confirmed or not by price vs EMA.
+
+    Works on scalars and on whole arrays, so live signals and backtests share
+    one definition. Elements with a NaN RSI are HOLD.
+    """
+    price, ema, rsi = np.asarray(price), np.asarray(ema), np.asarray(rsi)
+    oversold_zone, overbought_zone = rsi < oversold, rsi > overbought
+    return np.select(
+        [oversold_zone & (price > ema), oversold_zone, overbought_zone & (price < ema), overbought_zone],
+        [STRONG_BUY, BUY, STRONG_SELL, SELL],
+        HOLD,
+    )
+
+
+"""Rules map the latest values ('close' plus the SIGNAL_INDICATORS outputs) to a signal, or None"""
+
+
+def rsi_ema_rule(values):
+    """The dashboard's recommendation"""
+    price, ema, rsi = values.get('close'), values.get('ema'), values.get('rsi')
+    if not _known(price, ema, rsi):
+        return None
+    return dict(RSI_EMA_SIGNALS[int(rsi_ema_actions(price, ema, rsi))])
+
+
+def macd_rule(values):
+    macd = values.get('macd')
+    if macd is None or not _known(macd[2]):
+        return None
+    if macd[2] > 0:
+        return signal("BULLISH", "MACD is above its signal line.", "#28a745")
+    return signal("BEARISH", "MACD is below its signal line.", "#dc3545")
+
+
+def bollinger_rule(values):
+    price, bands = values.get('close'), values.get('bollinger')
+    if bands is None or not _known(price, *bands):
+        return None
+    upper, lower = bands
+    if price > upper:
+        return signal("ABOVE BAND", "Price closed above the upper Bollinger band.", "#28a745")
+    if price < lower:
+        return signal("BELOW BAND", "Price closed below the lower Bollinger band.", "#dc3545")
+    return signal("INSIDE BAND", "Price is inside the Bollinger bands.", "#e5c461")
+
+
+DEFAULT_RULES = {
+    'rsi_ema': rsi_ema_rule,
+    'macd': macd_rule,
+    'bollinger': bollinger_rule,
+}
+
+
+def latest_values(results, close):
+    """Last row of SIGNAL_INDICATORS outputs as floats (tuples for multi-line indicators), plus 'close'"""
+    values = {'close': float(close)}
+    for name, output in results.items():
+        if isinstance(output, tuple):
+            values[name] = tuple(float(line.iloc[-1]) for line in output)
+        else:
+            values[name] = float(output.iloc[-1])
+    return values
+
+
+class SignalEngine:
+    """Latest signal of every rule per (interval, symbol), evaluated once per closed candle.
+
+    The ingester calls ``evaluate`` on every candle close with its streaming
+    indicator values. Other processes call ``sync(store)``, which evaluates
+    only the symbols whose committed candles changed since the last call, so
+    the dashboard and API read precomputed state. Listeners receive an event
+    dict whenever a rule's action changes; the first evaluation of a symbol
+    sets the baseline and emits nothing.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, max_events=1000):
+        self.rules = dict(rules)
+        self.listeners = []
+        self.events = deque(maxlen=max_events)
+        self._state = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def add_rule(self, name, rule):
+        self.rules[name] = rule
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def evaluate(self, symbol, timestamp, values, interval="1m"):
+        """Apply every rule to ``values`` (which must include 'close') and return the new state"""
+        signals = {}
+        for name, rule in list(self.rules.items()):
+            result = rule(values)
+            if result is not None:
+                signals[name] = result
+        state = {
+            "symbol": symbol,
+            "interval": interval,
+            "timestamp": int(timestamp),
+            "price": values['close'],
+            "signals": signals,
+        }
+
+        events = []
+        with self._lock:
+            previous = self._state.get((interval, symbol))
+            self._state[(interval, symbol)] = state
+            if previous is not None:
+                for name, current in signals.items():
+                    before = previous["signals"].get(name)
+                    if before is not None and before["action"] != current["action"]:
+                        events.append({
+                            "symbol": symbol,
+                            "interval": interval,
+                            "rule": name,
+                            "previous": before["action"],
+                            "action": current["action"],
+                            "message": current["message"],
+                            "timestamp": state["timestamp"],
+                            "price": state["price"],
+                        })
+            self.events.extend(events)
+
+        for event in events:
+            for listener in list(self.listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"Signal listener failed for {symbol}: {e}")
+        return state
+
+    def sync(self, store, interval="1m", symbols=None):
+        """Evaluate the symbols of ``store`` (a CandleStore or shared reader) with new committed candles"""
+        with self._sync_lock:
+            for symbol in (store.keys() if symbols is None else symbols):
+                version = store.version(symbol)
+                if not version or self._versions.get((interval, symbol)) == (store.generation, version):
+                    continue
+                frame = indicator_cache.frame(store, symbol, interval)
+                results = indicator_cache.indicator(store, symbol, interval, SIGNAL_INDICATORS.run)
+                self._versions[(interval, symbol)] = (store.generation, version)
+                if frame is None or results is None:
+                    continue
+                timestamp = frame['timestamp'].iloc[-1].value // 1_000_000
+                self.evaluate(symbol, timestamp, latest_values(results, frame['close'].iloc[-1]), interval)
+
+    def latest(self, symbol, interval="1m"):
+        """Latest state of ``symbol``, or None before its first evaluation"""
+        return self._state.get((interval, symbol))
+
+    def snapshot(self, interval="1m"):
+        with self._lock:
+            return [state for (i, _), state in self._state.items() if i == interval]
+
+    def recent_events(self, limit=100):
+        with self._lock:
+            return list(self.events)[-limit:]
+
+
+"""Signals of this process: fed by the listener in the ingester, synced from shared memory elsewhere"""
+signal_engine = SignalEngine()
@@ -0,0 +1,377 @@
+from abc import ABC, abstractmethod
+from collections import deque
+import math
+import threading
+
+
+"""Stateful counterparts of the functions in indicators.py.
+
+Every indicator takes one closed candle per ``update(open, high, low, close,
+volume)`` call, returns its latest value(s) and matches the batch function's
+last row, including the NaN warm-up. ``rebuild(candles)`` resets the state
+from any history exposing ``candles['close']``-style columns (Candles or a
+DataFrame).
+"""
+
+NAN = float('nan')
+
+
+def _div(a, b):
+    """IEEE division like pandas: x/0 is +-inf, 0/0 and NaN operands are NaN"""
+    if b == 0 or b != b:
+        return NAN if a == 0 or a != a or b != b else math.copysign(math.inf, a) * math.copysign(1, b)
+    return a / b
+
+
+class RollingMean:
+    """Mean of the last ``period`` values, NaN while the window is short or holds a NaN or inf, as pandas"""
+
+    REFRESH = 1024
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.nans = 0
+        self._updates = 0
+
+    def update(self, x):
+        self.window.append(x)
+        if not math.isfinite(x):
+            self.nans += 1
+        else:
+            self.total += x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            if not math.isfinite(old):
+                self.nans -= 1
+            else:
+                self.total -= old
+
+        """Re-add the window now and then so rounding errors do not accumulate"""
+        self._updates += 1
+        if self._updates % self.REFRESH == 0:
+            self.total = sum(v for v in self.window if math.isfinite(v))
+
+        if len(self.window) < self.period or self.nans:
+            return NAN
+        return self.total / self.period
+
+
+class RollingStd:
+    """Sample standard deviation (ddof=1) of the last ``period`` values, sliding Welford update.
+
+    Like RollingMean, NaN and inf values are left out of the sums and make the
+    result NaN until they leave the window.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nans = 0
+
+    def _add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        self.count -= 1
+        if not self.count:
+            self.mean = self.m2 = 0.0
+            return
+        mean = self.mean - (x - self.mean) / self.count
+        self.m2 -= (x - self.mean) * (x - mean)
+        self.mean = mean
+
+    def update(self, x):
+        self.window.append(x)
+        if not math.isfinite(x):
+            self.nans += 1
+        else:
+            self._add(x)
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            if not math.isfinite(old):
+                self.nans -= 1
+            else:
+                self._remove(old)
+        if len(self.window) < self.period or self.nans:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.period - 1))
+
+
+class RollingExtreme:
+    """Rolling min (or max) over ``period`` values with a monotonic deque, amortized O(1)"""
+
+    def __init__(self, period, maximum=False):
+        self.period = period
+        self.maximum = maximum
+        self.candidates = deque()
+        self.count = 0
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        while self.candidates and (self.candidates[-1][1] <= x if self.maximum else self.candidates[-1][1] >= x):
+            self.candidates.pop()
+        self.candidates.append((i, x))
+        if self.candidates[0][0] <= i - self.period:
+            self.candidates.popleft()
+        return self.candidates[0][1] if self.count >= self.period else NAN
+
+
+class Ewm:
+    """``ewm(span=period, adjust=False).mean()``: starts at the first non-NaN value"""
+
+    def __init__(self, period):
+        self.alpha = 2 / (period + 1)
+        self.value = NAN
+
+    def update(self, x):
+        if x != x:
+            return self.value
+        self.value = x if self.value != self.value else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class StreamingIndicator(ABC):
+    @abstractmethod
+    def update(self, open, high, low, close, volume):
+        """Feed one closed candle. Returns the latest value(s)."""
+
+    def reset(self):
+        self.__init__(**self.params)
+
+    def rebuild(self, candles):
+        """Replay ``candles`` from scratch. Returns the latest value."""
+        self.reset()
+        value = NAN
+        columns = [candles[c] for c in ('open', 'high', 'low', 'close', 'volume')]
+        for row in zip(*(list(c) for c in columns)):
+            value = self.update(*row)
+        return value
+
+
+class Ema(StreamingIndicator):
+    def __init__(self, period=14):
+        self.params = {'period': period}
+        self.ewm = Ewm(period)
+
+    def update(self, open, high, low, close, volume):
+        return self.ewm.update(close)
+
+
+class Sma(StreamingIndicator):
+    def __init__(self, period=14):
+        self.params = {'period': period}
+        self.mean = RollingMean(period)
+
+    def update(self, open, high, low, close, volume):
+        return self.mean.update(close)
+
+
+class Rsi(StreamingIndicator):
+    """Simple-average RSI, as compute_rsi"""
+
+    def __init__(self, period=14):
+        self.params = {'period': period}
+        self.gain = RollingMean(period)
+        self.loss = RollingMean(period)
+        self.prev = NAN
+
+    def update(self, open, high, low, close, volume):
+        delta = close - self.prev
+        self.prev = close
+        avg_gain = self.gain.update(max(delta, 0.0) if delta == delta else NAN)
+        avg_loss = self.loss.update(max(-delta, 0.0) if delta == delta else NAN)
+        return 100 - _div(100, 1 + _div(avg_gain, avg_loss))
+
+
+class Macd(StreamingIndicator):
+    """(macd line, signal line, histogram)"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.params = {'fast': fast, 'slow': slow, 'signal': signal}
+        self.fast = Ewm(fast)
+        self.slow = Ewm(slow)
+        self.signal = Ewm(signal)
+
+    def update(self, open, high, low, close, volume):
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line)
+        return line, signal, line - signal
+
+
+class Bollinger(StreamingIndicator):
+    """(upper band, lower band) at two standard deviations"""
+
+    def __init__(self, period=20):
+        self.params = {'period': period}
+        self.mean = RollingMean(period)
+        self.std = RollingStd(period)
+
+    def update(self, open, high, low, close, volume):
+        sma = self.mean.update(close)
+        std = self.std.update(close)
+        return sma + 2 * std, sma - 2 * std
+
+
+class TrueRange:
+    """High-low range widened by gaps from the previous close; the first candle is just high - low"""
+
+    def __init__(self):
+        self.prev_close = NAN
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self.prev_close == self.prev_close:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        return tr
+
+
+class Atr(StreamingIndicator):
+    def __init__(self, period=14):
+        self.params = {'period': period}
+        self.tr = TrueRange()
+        self.mean = RollingMean(period)
+
+    def update(self, open, high, low, close, volume):
+        return self.mean.update(self.tr.update(high, low, close))
+
+
+class Vwap(StreamingIndicator):
+    """Cumulative VWAP since the first candle replayed"""
+
+    def __init__(self):
+        self.params = {}
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def update(self, open, high, low, close, volume):
+        self.price_volume += (high + low + close) / 3 * volume
+        self.volume += volume
+        return _div(self.price_volume, self.volume)
+
+
+class Stochastic(StreamingIndicator):
+    """(%K, %D)"""
+
+    def __init__(self, k_period=14, d_period=3):
+        self.params = {'k_period': k_period, 'd_period': d_period}
+        self.low = RollingExtreme(k_period)
+        self.high = RollingExtreme(k_period, maximum=True)
+        self.d = RollingMean(d_period)
+
+    def update(self, open, high, low, close, volume):
+        low_min = self.low.update(low)
+        high_max = self.high.update(high)
+        k = 100 * _div(close - low_min, high_max - low_min)
+        return k, self.d.update(k)
+
+
+class Cci(StreamingIndicator):
+    """The mean deviation needs the whole window, so this is O(period), not O(history)"""
+
+    def __init__(self, period=20):
+        self.params = {'period': period}
+        self.mean = RollingMean(period)
+
+    def update(self, open, high, low, close, volume):
+        tp = (high + low + close) / 3
+        sma = self.mean.update(tp)
+        if sma != sma:
+            return NAN
+        mad = sum(abs(x - sma) for x in self.mean.window) / self.mean.period
+        return _div(tp - sma, 0.015 * mad)
+
+
+class Adx(StreamingIndicator):
+    """Mirrors compute_adx, including its directional-movement definitions"""
+
+    def __init__(self, period=14):
+        self.params = {'period': period}
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.tr = TrueRange()
+        self.atr = RollingMean(period)
+        self.plus = RollingMean(period)
+        self.minus = RollingMean(period)
+        self.adx = RollingMean(period)
+
+    def update(self, open, high, low, close, volume):
+        up = high - self.prev_high
+        down = abs(low - self.prev_low)
+        self.prev_high, self.prev_low = high, low
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > plus_dm and down > 0 else 0.0
+
+        atr = self.atr.update(self.tr.update(high, low, close))
+        plus_di = 100 * _div(self.plus.update(plus_dm), atr)
+        minus_di = 100 * _div(self.minus.update(minus_dm), atr)
+        dx = _div(abs(plus_di - minus_di), plus_di + minus_di) * 100
+        return self.adx.update(dx)
+
+
+"""Indicators kept up to date for every symbol by the ingester"""
+DEFAULT_INDICATORS = {
+    'ema': Ema,
+    'sma': Sma,
+    'rsi': Rsi,
+    'macd': Macd,
+    'bollinger': Bollinger,
+    'atr': Atr,
+    'vwap': Vwap,
+    'stochastic': Stochastic,
+    'cci': Cci,
+    'adx': Adx,
+}
+
+
+class IndicatorEngine:
+    """Per-symbol streaming indicators, fed one closed candle at a time"""
+
+    def __init__(self, indicators=DEFAULT_INDICATORS):
+        self.indicators = indicators
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, symbol, candles):
+        state = {name: factory() for name, factory in self.indicators.items()}
+        values = {name: indicator.rebuild(candles) for name, indicator in state.items()}
+        last = int(candles['timestamp'][-1]) if len(candles) else None
+        with self._lock:
+            self._state[symbol] = [state, values, last]
+        return values
+
+    def update(self, symbol, timestamp, open, high, low, close, volume):
+        """Feed one closed candle; repeated or older timestamps are ignored. Returns the latest values."""
+        entry = self._state.get(symbol)
+        if entry is None:
+            entry = self._state[symbol] = [{name: factory() for name, factory in self.indicators.items()}, {}, None]
+        state, values, last = entry
+        if last is not None and timestamp <= last:
+            return values
+        values = {name: indicator.update(open, high, low, close, volume) for name, indicator in state.items()}
+        with self._lock:
+            entry[1] = values
+            entry[2] = timestamp
+        return values
+
+    def latest(self, symbol):
+        """Latest values by indicator name, or an empty dict"""
+        entry = self._state.get(symbol)
+        return entry[1] if entry is not None else {}
+
+    def forget(self, symbol):
+        with self._lock:
+            self._state.pop(symbol, None)
+
+
+"""Streaming indicators of the 1m candles, maintained by the listener"""
+indicator_engine = IndicatorEngine()
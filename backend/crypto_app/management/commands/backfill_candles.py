@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from crypto_app.dash_apps.data_store import SYMBOLS
+from crypto_app.dash_apps.history_store import HistoryStore
+from crypto_app.tasks.backfill_history import backfill_history
+
+
+def parse_date(value):
+    """YYYY-MM-DD or full ISO timestamp, UTC unless an offset is given"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Download historical klines into the candle history store, before and after the candles it holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=str, default="", help="Start date (UTC), e.g. 2024-01-01")
+        parser.add_argument("--end", type=str, default="", help="End date (UTC), now by default")
+        parser.add_argument("--days", type=int, default=30, help="Days before --end when --start is not given")
+        parser.add_argument("--symbols", type=str, default="",
+                            help="Comma-separated symbols, all dashboard symbols by default")
+        parser.add_argument("--intervals", type=str, default="1m", help="Comma-separated intervals")
+        parser.add_argument("--workers", type=int, default=settings.CANDLE_BOOTSTRAP_WORKERS)
+        parser.add_argument("--weight-budget", type=int, default=settings.CANDLE_BACKFILL_WEIGHT_BUDGET,
+                            help="Request weight per minute to stay under (Binance allows 6000 per IP)")
+
+    def handle(self, *args, **options):
+        if not settings.CANDLE_HISTORY_DIR:
+            raise CommandError("CANDLE_HISTORY_DIR is not set")
+        end = parse_date(options["end"]) if options["end"] else datetime.now(timezone.utc)
+        start = parse_date(options["start"]) if options["start"] else end - timedelta(days=options["days"])
+        if start >= end:
+            raise CommandError("--start must be before --end")
+
+        symbols = [s.strip().lower() for s in options["symbols"].split(",") if s.strip()] or SYMBOLS
+        intervals = [i.strip() for i in options["intervals"].split(",") if i.strip()]
+        self.stdout.write(f"Backfilling {len(symbols)} symbols x {intervals} from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} UTC")
+
+        report = backfill_history(
+            symbols, intervals, int(start.timestamp() * 1000), int(end.timestamp() * 1000),
+            HistoryStore(settings.CANDLE_HISTORY_DIR), max_workers=options["workers"],
+            base_url=settings.BINANCE_REST_URL, weight_limit=options["weight_budget"],
+        )
+
+        total = sum(report["written"].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {total} candles with {report['requests']} requests in {report['elapsed']:.1f}s "
+            f"({report['throttled']} throttled, {len(report['failed'])} failed)"
+        ))
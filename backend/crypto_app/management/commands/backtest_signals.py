@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import pandas as pd
+from crypto_app.dash_apps.backtest import DEFAULT_FEE, DEFAULT_SLIPPAGE, ENTRIES, parameter_grid, run_backtests
+from crypto_app.dash_apps.history_store import HistoryStore
+from crypto_app.management.commands.backfill_candles import parse_date
+
+
+def numbers(value, cast=int):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+class Command(BaseCommand):
+    help = "Backtest the dashboard's RSI/EMA recommendation over stored candle history for a parameter grid"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=str, default="",
+                            help="Comma-separated symbols, every symbol with history by default")
+        parser.add_argument("--interval", type=str, default="1m")
+        parser.add_argument("--start", type=str, default="", help="Start date (UTC), all history by default")
+        parser.add_argument("--end", type=str, default="", help="End date (UTC)")
+        parser.add_argument("--days", type=int, default=None, help="Only the last N days before --end")
+        parser.add_argument("--rsi-periods", type=str, default="7,14,21")
+        parser.add_argument("--ema-periods", type=str, default="9,14,21,50")
+        parser.add_argument("--oversold", type=str, default="20,25,30")
+        parser.add_argument("--overbought", type=str, default="70,75,80")
+        parser.add_argument("--entries", type=str, default="STRONG BUY",
+                            help=f"Comma-separated recommendations that open a long: {', '.join(ENTRIES)}")
+        parser.add_argument("--fee", type=float, default=DEFAULT_FEE, help="Fee per trade, as a fraction")
+        parser.add_argument("--slippage", type=float, default=DEFAULT_SLIPPAGE, help="Slippage per trade, as a fraction")
+        parser.add_argument("--workers", type=int, default=None, help="Processes, one per CPU by default")
+        parser.add_argument("--top", type=int, default=10, help="Parameter sets to show")
+        parser.add_argument("--csv", type=str, default="", help="Write every (symbol, parameters) row to this file")
+
+    def handle(self, *args, **options):
+        if not settings.CANDLE_HISTORY_DIR:
+            raise CommandError("CANDLE_HISTORY_DIR is not set")
+        history = HistoryStore(settings.CANDLE_HISTORY_DIR)
+        interval = options["interval"]
+        symbols = [s.strip().lower() for s in options["symbols"].split(",") if s.strip()] or history.symbols(interval)
+        if not symbols:
+            raise CommandError(f"No {interval} history in {settings.CANDLE_HISTORY_DIR}, run backfill_candles first")
+
+        entries = [e.strip().upper() for e in options["entries"].split(",") if e.strip()]
+        unknown = [e for e in entries if e not in ENTRIES]
+        if unknown:
+            raise CommandError(f"Unknown entries {unknown}, expected {list(ENTRIES)}")
+        grid = parameter_grid(numbers(options["rsi_periods"]), numbers(options["ema_periods"]),
+                              numbers(options["oversold"], float), numbers(options["overbought"], float), entries)
+
+        end = parse_date(options["end"]) if options["end"] else None
+        start = parse_date(options["start"]) if options["start"] else None
+        if options["days"] and start is None:
+            start = (end or datetime.now(timezone.utc)) - timedelta(days=options["days"])
+        start_ms = int(start.timestamp() * 1000) if start else None
+        end_ms = int(end.timestamp() * 1000) if end else None
+
+        self.stdout.write(f"Backtesting {len(grid)} parameter sets on {len(symbols)} symbols ({interval})")
+        report = run_backtests(settings.CANDLE_HISTORY_DIR, symbols, interval, grid, start_ms, end_ms,
+                               options["fee"], options["slippage"], options["workers"])
+        if not report["results"]:
+            raise CommandError("No candles in the selected range")
+
+        rows = pd.DataFrame(report["results"])
+        if options["csv"]:
+            rows.to_csv(options["csv"], index=False)
+        candles = rows.drop_duplicates("symbol")["candles"].sum()
+        self.stdout.write(f"{candles:,} candles x {len(grid)} parameter sets in {report['elapsed']:.1f}s "
+                          f"({len(report['failed'])} symbols failed)")
+
+        parameters = ["rsi_period", "ema_period", "oversold", "overbought", "entry"]
+        summary = rows.groupby(parameters).agg(
+            pnl=("pnl", "mean"), max_drawdown=("max_drawdown", "mean"),
+            hit_rate=("hit_rate", "mean"), trades=("trades", "sum"),
+        ).sort_values("pnl", ascending=False).head(options["top"])
+        self.stdout.write("Mean over symbols, best first:")
+        self.stdout.write(summary.to_string(float_format=lambda v: f"{v:.4f}"))
+        self.stdout.write(self.style.SUCCESS("Done"))
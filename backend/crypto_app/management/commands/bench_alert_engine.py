@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand
+import numpy as np
+from crypto_app.dash_apps.alert_engine import KINDS, AlertEngine
+from crypto_app.dash_apps.data_store import CandleStore
+
+
+def random_rules(count, symbols, seed=0):
+    """``count`` rule rows of every kind, with levels spread around a price of 100 and an RSI of 50"""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(len(KINDS), size=count)
+    symbol_ids = rng.integers(len(symbols), size=count)
+    prices = 100 * (1 + rng.normal(0, 0.02, count))
+    rsi = rng.uniform(10, 90, count)
+    changes = rng.normal(0, 2, count)
+    windows = rng.choice([5, 15, 60], size=count)
+    for i in range(count):
+        kind = KINDS[kinds[i]]
+        if kind.startswith("price"):
+            threshold, upper = prices[i], None
+        elif kind == "rsi_outside":
+            threshold, upper = min(rsi[i], 100 - rsi[i]), max(rsi[i], 100 - rsi[i])
+        elif kind.startswith("rsi"):
+            threshold, upper = rsi[i], None
+        else:
+            threshold, upper = changes[i], None
+        yield i, i % 10000, symbols[symbol_ids[i]], kind, float(threshold), upper, int(windows[i])
+
+
+class Command(BaseCommand):
+    help = "Measure alert engine throughput in ticks per second for a synthetic rule set"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rules", type=int, default=1000000)
+        parser.add_argument("--symbols", type=int, default=50)
+        parser.add_argument("--ticks", type=int, default=200000)
+
+    def handle(self, *args, **options):
+        symbols = [f"sym{i}usdt" for i in range(options["symbols"])]
+        rng = np.random.default_rng(1)
+        store = CandleStore()
+        for symbol in symbols:
+            for i, close in enumerate(100 * np.exp(np.cumsum(rng.normal(0, 0.001, 100)))):
+                store.append(symbol, i * 60000, close, close, close, close, 1)
+
+        engine = AlertEngine(store)
+        started = time.perf_counter()
+        engine.load(random_rules(options["rules"], symbols))
+        self.stdout.write(f"Loaded {engine.rule_count:,} rules on {len(symbols)} symbols "
+                          f"in {time.perf_counter() - started:.1f}s")
+
+        ticks = options["ticks"]
+        tick_symbols = [symbols[i] for i in rng.integers(len(symbols), size=ticks)]
+        prices = {symbol: store.view(symbol).close[-1] for symbol in symbols}
+        steps = np.exp(rng.normal(0, 0.0002, ticks)).tolist()
+        rsi = {symbol: 50.0 for symbol in symbols}
+
+        alerts = 0
+        started = time.perf_counter()
+        for i, symbol in enumerate(tick_symbols):
+            prices[symbol] *= steps[i]
+            engine.on_price(symbol, prices[symbol], i)
+            if i % 60 == 0:
+                rsi[symbol] = min(100.0, max(0.0, rsi[symbol] + (steps[i] - 1) * 10000))
+                engine.on_close(symbol, rsi[symbol], i)
+            if i % 1000 == 0:
+                alerts += len(engine.drain())
+        elapsed = time.perf_counter() - started
+        alerts += len(engine.drain())
+
+        self.stdout.write(f"{ticks:,} ticks in {elapsed:.2f}s: {ticks / elapsed:,.0f} ticks/s, "
+                          f"{alerts:,} alerts ({alerts / ticks:.2f} per tick)")
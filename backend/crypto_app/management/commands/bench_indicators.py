@@ -0,0 +1,154 @@
+import time
+from django.core.management.base import BaseCommand
+import numpy as np
+import pandas as pd
+from crypto_app.dash_apps import indicators
+from crypto_app.dash_apps.data_store import CandleStore, VALUE_COLUMNS
+from crypto_app.dash_apps.panel import build_panel
+
+
+"""The original pandas implementations, kept as the baseline"""
+
+
+def legacy_rsi(data, period=14):
+    delta = data['close'].diff()
+    avg_gain = delta.clip(lower=0).rolling(window=period).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(window=period).mean()
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def legacy_bollinger_bands(data, period=20):
+    sma = data['close'].rolling(window=period).mean()
+    std = data['close'].rolling(window=period).std()
+    return sma + (2 * std), sma - (2 * std)
+
+
+def legacy_true_range(data):
+    return pd.concat([
+        data['high'] - data['low'],
+        (data['high'] - data['close'].shift()).abs(),
+        (data['low'] - data['close'].shift()).abs()
+    ], axis=1).max(axis=1)
+
+
+def legacy_atr(data, period=14):
+    return legacy_true_range(data).rolling(window=period).mean()
+
+
+def legacy_stochastic(data, k_period=14, d_period=3):
+    low_min = data['low'].rolling(window=k_period).min()
+    high_max = data['high'].rolling(window=k_period).max()
+    k = 100 * (data['close'] - low_min) / (high_max - low_min)
+    return k, k.rolling(window=d_period).mean()
+
+
+def legacy_cci(data, period=20):
+    tp = (data['high'] + data['low'] + data['close']) / 3
+    sma = tp.rolling(window=period).mean()
+    mad = tp.rolling(window=period).apply(lambda x: np.fabs(x - x.mean()).mean())
+    return (tp - sma) / (0.015 * mad)
+
+
+def legacy_adx(data, period=14):
+    plus_dm = data['high'].diff()
+    minus_dm = data['low'].diff().abs()
+    plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
+    minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
+    atr = legacy_true_range(data).rolling(window=period).mean()
+    plus_di = 100 * (pd.Series(plus_dm).rolling(window=period).mean() / atr)
+    minus_di = 100 * (pd.Series(minus_dm).rolling(window=period).mean() / atr)
+    dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+    return dx.rolling(window=period).mean()
+
+
+BENCHMARKS = [
+    ("rsi", legacy_rsi, indicators.compute_rsi),
+    ("bollinger", legacy_bollinger_bands, indicators.compute_bollinger_bands),
+    ("atr", legacy_atr, indicators.compute_atr),
+    ("stochastic", legacy_stochastic, indicators.compute_stochastic),
+    ("cci", legacy_cci, indicators.compute_cci),
+    ("adx", legacy_adx, indicators.compute_adx),
+]
+
+
+SWEEPS = [
+    ("sma", indicators.compute_sma, indicators.sweep_sma),
+    ("ema", indicators.compute_ema, indicators.sweep_ema),
+    ("rsi", indicators.compute_rsi, indicators.sweep_rsi),
+    ("bollinger", indicators.compute_bollinger_bands, indicators.sweep_bollinger_bands),
+]
+
+
+def random_walk_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    open = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': np.arange(rows, dtype=np.int64) * 60000,
+        'open': open,
+        'high': np.maximum(open, close) * (1 + rng.uniform(0, 0.001, rows)),
+        'low': np.minimum(open, close) * (1 - rng.uniform(0, 0.001, rows)),
+        'close': close,
+        'volume': rng.uniform(1, 100, rows),
+    })
+
+
+def best_time(func, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Compare the NumPy indicator kernels with the original pandas implementations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=str, default="500,50000,5000000", help="Comma-separated row counts")
+        parser.add_argument("--panel-symbols", type=int, default=50,
+                            help="Symbols for the per-symbol loop vs one panel pass comparison")
+        parser.add_argument("--legacy-apply-limit", type=int, default=50000,
+                            help="Skip the rolling.apply baseline (legacy CCI) above this many rows")
+        parser.add_argument("--sweep-rows", type=int, default=100000, help="Rows for the period sweep comparison")
+        parser.add_argument("--sweep-periods", type=int, default=40, help="Periods per sweep (5, 10, 15, ...)")
+        parser.add_argument("--sweep-workers", type=int, default=None, help="Also time sweeps over this many processes")
+
+    def handle(self, *args, **options):
+        for rows in [int(n) for n in options["sizes"].split(",")]:
+            data = random_walk_frame(rows)
+            repeat = 5 if rows <= 50000 else 1
+            self.stdout.write(f"{rows:,} rows")
+            for name, legacy, current in BENCHMARKS:
+                new = best_time(current, data, repeat)
+                if legacy is legacy_cci and rows > options["legacy_apply_limit"]:
+                    self.stdout.write(f"  {name:12s} {'skipped':>10s}   {new * 1000:10.2f} ms")
+                    continue
+                old = best_time(legacy, data, repeat)
+                self.stdout.write(f"  {name:12s} {old * 1000:10.2f} ms {new * 1000:10.2f} ms  {old / new:8.1f}x")
+
+        symbols = options["panel_symbols"]
+        store = CandleStore()
+        for i in range(symbols):
+            frame = random_walk_frame(store.capacity, seed=i)
+            store.load(f"sym{i}", frame['timestamp'].to_numpy(), frame[VALUE_COLUMNS].to_numpy())
+        frames = {symbol: store.get(symbol) for symbol in store.keys()}
+        self.stdout.write(f"{symbols} symbols x {store.capacity} candles, per-symbol loop vs one panel pass")
+        for name, legacy, current in BENCHMARKS:
+            old = best_time(lambda frames: [legacy(f) for f in frames.values()], frames, 3)
+            new = best_time(lambda store: current(build_panel(store)), store, 3)
+            self.stdout.write(f"  {name:12s} {old * 1000:10.2f} ms {new * 1000:10.2f} ms  {old / new:8.1f}x")
+
+        data = random_walk_frame(options["sweep_rows"])
+        periods = [5 * (i + 1) for i in range(options["sweep_periods"])]
+        workers = options["sweep_workers"]
+        self.stdout.write(f"{len(data):,} rows x {len(periods)} periods, loop over periods vs one sweep")
+        for name, single, sweep in SWEEPS:
+            old = best_time(lambda data: [single(data, p) for p in periods], data, 3)
+            new = best_time(lambda data: sweep(data, periods), data, 3)
+            line = f"  {name:12s} {old * 1000:10.2f} ms {new * 1000:10.2f} ms  {old / new:8.1f}x"
+            if workers:
+                pooled = best_time(lambda data: sweep(data, periods, workers=workers), data, 1)
+                line += f"  {pooled * 1000:10.2f} ms on {workers} processes"
+            self.stdout.write(line)
@@ -0,0 +1,51 @@
+import json
+import random
+from django.core.management.base import BaseCommand
+import pandas as pd
+from crypto_app.tasks.exchange_simulator import WS_FRAME, read_log
+from crypto_app.tasks.kline_decoder import benchmark, decode_kline, fast_loads, sample_frame
+
+
+def legacy_decode(frame):
+    """The original listener path: nested dicts, pd.to_datetime and float() per candle"""
+    k = json.loads(frame)['data']['k']
+    return {
+        'timestamp': pd.to_datetime(k['t'], unit='ms'),
+        'open': float(k['o']),
+        'high': float(k['h']),
+        'low': float(k['l']),
+        'close': float(k['c']),
+        'volume': float(k['v']),
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure kline decoding throughput in messages per second"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--frames", type=str, default="",
+                            help="Feed log (.gz) or a file of recorded frames, one raw frame per line")
+        parser.add_argument("--count", type=int, default=50000,
+                            help="Number of synthetic frames when no file is given")
+
+    def handle(self, *args, **options):
+        if options["frames"].endswith(".gz"):
+            frames = [payload for kind, _, payload in read_log(options["frames"]) if kind == WS_FRAME]
+        elif options["frames"]:
+            with open(options["frames"]) as f:
+                frames = [line.rstrip("\n") for line in f if line.strip()]
+        else:
+            frames = [
+                sample_frame(f"SYM{i % 500}USDT", 60000 * i, random.uniform(0.01, 60000), i % 4 == 0)
+                for i in range(options["count"])
+            ]
+
+        parser_name = "orjson" if fast_loads else "json"
+        results = [
+            (f"decode_kline ({parser_name})", benchmark(frames)),
+            ("decode_kline (json)", benchmark(frames, lambda f: decode_kline(f, json.loads))),
+            ("legacy dict + pd.to_datetime", benchmark(frames[:5000], legacy_decode, repeat=1)),
+        ]
+        self.stdout.write(f"{len(frames)} frames")
+        for name, rate in results:
+            self.stdout.write(f"{name:32s} {rate:>12,.0f} msg/s")
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+import numpy as np
+from crypto_app.dash_apps.data_store import VALUE_COLUMNS, VALUE_DTYPES, CandleStore
+from crypto_app.dash_apps.shared_store import segment_size
+from crypto_app.management.commands.bench_indicators import random_walk_frame
+
+
+def filled_store(symbols, capacity, dtype):
+    store = CandleStore(capacity=capacity, dtype=dtype)
+    for i in range(symbols):
+        frame = random_walk_frame(capacity, seed=i)
+        store.load(f"sym{i}", frame['timestamp'].to_numpy(), frame[VALUE_COLUMNS].to_numpy())
+    return store
+
+
+class Command(BaseCommand):
+    help = "Report candle memory per symbol per 1k candles for each storage mode, to size nodes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=int, default=50)
+        parser.add_argument("--capacity", type=int, default=settings.CANDLE_CAPACITY, help="Candles per symbol")
+        parser.add_argument("--budget-mb", type=float, default=None,
+                            help="Also show how many candles per symbol fit in this much memory")
+
+    def handle(self, *args, **options):
+        symbols, capacity = options["symbols"], options["capacity"]
+        self.stdout.write(f"{symbols} symbols x {capacity:,} candles, configured dtype {settings.CANDLE_VALUE_DTYPE}")
+
+        store = filled_store(symbols, capacity, "float64")
+        frames = [store.get(symbol) for symbol in store.keys()]
+        frame_bytes = sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+        rows = [("DataFrame per symbol", frame_bytes, frame_bytes / symbols / capacity * 1000)]
+        for dtype in VALUE_DTYPES:
+            footprint = filled_store(symbols, capacity, dtype).footprint()
+            rows.append((f"ring buffer {dtype}", footprint["bytes"], footprint["bytes_per_symbol_per_1k"]))
+        shared = segment_size(symbols, capacity)
+        rows.append(("shared segment float64", shared, shared / symbols / capacity * 1000))
+
+        self.stdout.write(f"  {'representation':22s} {'total':>12s} {'per symbol per 1k':>20s}")
+        for name, total, per_1k in rows:
+            self.stdout.write(f"  {name:22s} {total / 2**20:9.2f} MiB {per_1k / 1024:16.1f} KiB")
+
+        compact = store.view(store.keys()[0])
+        error = np.max(np.abs(compact.close.astype(np.float32) / compact.close - 1)) if len(compact) else 0.0
+        self.stdout.write(f"  float32 worst relative rounding of close: {error:.1e}")
+
+        if options["budget_mb"]:
+            budget = options["budget_mb"] * 2**20
+            for name, _, per_1k in rows:
+                fits = int(budget / symbols / per_1k * 1000)
+                self.stdout.write(self.style.SUCCESS(
+                    f"  {name}: {fits:,} candles per symbol for {symbols} symbols in {options['budget_mb']:g} MiB"))
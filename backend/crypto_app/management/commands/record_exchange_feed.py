@@ -0,0 +1,24 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crypto_app.dash_apps.data_store import SYMBOLS
+from crypto_app.tasks.exchange_simulator import record_feed
+
+
+class Command(BaseCommand):
+    help = "Record kline REST responses and websocket frames to a feed log for replay"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="Output file (gzip'd feed log)")
+        parser.add_argument("--duration", type=float, default=300.0, help="Seconds of stream to record")
+        parser.add_argument("--interval", type=str, default="1m")
+        parser.add_argument("--symbols", type=str, default="",
+                            help="Comma-separated symbols, all dashboard symbols by default")
+
+    def handle(self, *args, **options):
+        symbols = [s.strip().lower() for s in options["symbols"].split(",") if s.strip()] or SYMBOLS
+        frames = asyncio.run(record_feed(
+            options["path"], symbols, options["interval"], options["duration"],
+            ws_url=settings.BINANCE_WS_URL, rest_url=settings.BINANCE_REST_URL,
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Recorded {frames} frames for {len(symbols)} symbols to {options['path']}"))
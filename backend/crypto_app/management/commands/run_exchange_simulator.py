@@ -0,0 +1,35 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from crypto_app.tasks.exchange_simulator import ExchangeSimulator
+
+
+class Command(BaseCommand):
+    help = "Serve a local Binance websocket + klines REST stand-in, synthetic or replayed from a feed log"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=9443)
+        parser.add_argument("--symbols", type=int, default=50,
+                            help="Number of synthetic symbols (ignored with --replay)")
+        parser.add_argument("--speed", type=float, default=1.0,
+                            help="Time scale, from 1 (real time) to 1000")
+        parser.add_argument("--replay", type=str, default="",
+                            help="Feed log written by record_exchange_feed")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        speed = min(max(options["speed"], 1.0), 1000.0)
+        simulator = ExchangeSimulator(
+            symbols=options["symbols"], speed=speed, replay=options["replay"] or None, seed=options["seed"]
+        )
+
+        def ready(port):
+            url = f"{options['host']}:{port}"
+            self.stdout.write(f"Simulator listening at {speed:g}x")
+            self.stdout.write(f"  BINANCE_WS_URL=ws://{url}")
+            self.stdout.write(f"  BINANCE_REST_URL=http://{url}")
+
+        try:
+            asyncio.run(simulator.serve(options["host"], options["port"], ready))
+        except KeyboardInterrupt:
+            self.stdout.write(f"Sent {simulator.frames_sent} frames")
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from crypto_app.dash_apps.data_store import SYMBOLS
+from crypto_app.tasks.binance_listener import start_ws
+from crypto_app.tasks.ingester_lock import IngesterLock
+
+
+class Command(BaseCommand):
+    help = "Run the Binance market data ingester, the single writer of the shared candle stores"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=str, default="",
+                            help="Comma-separated symbols, all dashboard symbols by default")
+        parser.add_argument("--interval", type=str, default="1m")
+        parser.add_argument("--standby", action="store_true",
+                            help="Wait for the running ingester to exit and take over, instead of failing")
+
+    def handle(self, *args, **options):
+        symbols = [s.strip().lower() for s in options["symbols"].split(",") if s.strip()] or SYMBOLS
+        lock = IngesterLock(settings.CANDLE_INGEST_LOCK_FILE)
+
+        if not lock.acquire():
+            if not options["standby"]:
+                raise CommandError(f"Another ingester (pid {lock.holder()}) holds {lock.path}")
+            self.stdout.write(f"Standing by, ingester pid {lock.holder()} holds {lock.path}")
+            lock.acquire(blocking=True)
+
+        self.stdout.write(self.style.SUCCESS(f"Ingesting {len(symbols)} symbols as pid {lock.holder()}"))
+        try:
+            start_ws(symbols, options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Ingester stopped")
+        finally:
+            lock.release()
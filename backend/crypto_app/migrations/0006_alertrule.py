@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:16
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crypto_app", "0005_user_subscription_user_subscription_end_date_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("price_above", "Price crosses above threshold"),
+                            ("price_below", "Price crosses below threshold"),
+                            ("rsi_above", "RSI rises above threshold"),
+                            ("rsi_below", "RSI falls below threshold"),
+                            ("rsi_outside", "RSI leaves the threshold..upper band"),
+                            (
+                                "change_above",
+                                "Change over window candles rises above threshold %",
+                            ),
+                            (
+                                "change_below",
+                                "Change over window candles falls below threshold %",
+                            ),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("threshold", models.FloatField()),
+                ("upper", models.FloatField(blank=True, null=True)),
+                (
+                    "window",
+                    models.PositiveIntegerField(
+                        default=60,
+                        validators=[django.core.validators.MinValueValidator(1)],
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "watchlist",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alerts",
+                        to="crypto_app.watchlist",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.utils import timezone
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MinValueValidator
 
 
 class User(AbstractUser):
@@ -59,3 +60,29 @@ class Watchlist(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.symbol}"
+
+
+class AlertRule(models.Model):
+    """A user's alert on one of their watchlist symbols, evaluated by the ingester's alert engine"""
+
+    KIND_CHOICES = [
+        ("price_above", "Price crosses above threshold"),
+        ("price_below", "Price crosses below threshold"),
+        ("rsi_above", "RSI rises above threshold"),
+        ("rsi_below", "RSI falls below threshold"),
+        ("rsi_outside", "RSI leaves the threshold..upper band"),
+        ("change_above", "Change over window candles rises above threshold %"),
+        ("change_below", "Change over window candles falls below threshold %"),
+    ]
+
+    watchlist = models.ForeignKey("Watchlist", on_delete=models.CASCADE, related_name="alerts")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    threshold = models.FloatField()
+    upper = models.FloatField(null=True, blank=True)
+    window = models.PositiveIntegerField(default=60, validators=[MinValueValidator(1)])
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.watchlist} {self.kind} {self.threshold}"
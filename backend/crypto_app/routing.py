@@ -0,0 +1,7 @@
+from django.urls import path
+from .consumers import MarketConsumer
+
+
+websocket_urlpatterns = [
+    path("ws/market/", MarketConsumer.as_asgi()),
+]
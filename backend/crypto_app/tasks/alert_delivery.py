@@ -0,0 +1,70 @@
+import asyncio
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from crypto_app.models import AlertRule
+
+
+"""AlertRule fields in the order of alert_engine.RULE_FIELDS"""
+ROW_FIELDS = ("id", "watchlist__user_id", "watchlist__symbol", "kind", "threshold", "upper", "window")
+
+
+def alert_group(user_id):
+    """Channel layer group of one user's alert sockets"""
+    return f"alerts_{user_id}"
+
+
+def load_rules(engine):
+    """Load every active rule into ``engine``; returns the newest updated_at seen"""
+    rules = AlertRule.objects.filter(is_active=True)
+    engine.load(rules.values_list(*ROW_FIELDS).iterator(chunk_size=10000))
+    return AlertRule.objects.order_by("-updated_at").values_list("updated_at", flat=True).first()
+
+
+def refresh_rules(engine, since):
+    """Apply the rules created, edited or deactivated after ``since``.
+
+    Deleted rows leave no trace to poll, so a mismatch between the active
+    count and the engine's triggers a full reload.
+    """
+    if since is None:
+        return load_rules(engine)
+    changed = list(AlertRule.objects.filter(updated_at__gt=since).order_by("updated_at")
+                   .values_list(*ROW_FIELDS, "is_active", "updated_at"))
+    if changed:
+        engine.remove(row[0] for row in changed if not row[-2])
+        engine.upsert(row[:-2] for row in changed if row[-2])
+        since = changed[-1][-1]
+    if AlertRule.objects.filter(is_active=True).count() != engine.rule_count:
+        return load_rules(engine)
+    return since
+
+
+async def refresh_alert_rules(engine, period=10.0):
+    """Keep ``engine`` in step with the AlertRule table, polling every ``period`` seconds.
+
+    Database errors, including on the first load, are logged and retried on
+    the next poll, so they never stop the ingester.
+    """
+    since = None
+    while True:
+        try:
+            since = await sync_to_async(refresh_rules)(engine, since)
+        except Exception as e:
+            print(f"Failed to refresh alert rules: {e!r}")
+        await asyncio.sleep(period)
+
+
+async def deliver_alerts(engine, period=0.25):
+    """Send the alerts ``engine`` triggered to each user's group as one "alert.triggered" message per user"""
+    from channels.layers import get_channel_layer
+    layer = get_channel_layer()
+    while True:
+        await asyncio.sleep(period)
+        by_user = defaultdict(list)
+        for alert in engine.drain():
+            by_user[alert["user"]].append(alert)
+        for user, alerts in by_user.items():
+            try:
+                await layer.group_send(alert_group(user), {"type": "alert.triggered", "alerts": alerts})
+            except Exception as e:
+                print(f"Failed to deliver {len(alerts)} alerts to user {user}: {e!r}")
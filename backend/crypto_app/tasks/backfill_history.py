@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import numpy as np
+from crypto_app.dash_apps.data_store import interval_ms
+from .fetch_initial_candles import (
+    BINANCE_REST_URL, MAX_KLINES_PER_REQUEST, RequestBudget, create_session, fetch_klines,
+)
+
+
+def _pages(symbol, interval, start_ms, end_ms, session, base_url, budget):
+    """Closed klines in ``[start_ms, end_ms]``, one REST page of (timestamps, values) at a time"""
+    step = interval_ms(interval)
+    cursor = start_ms
+    while cursor <= end_ms:
+        page_ts, page_values = fetch_klines(symbol, interval, MAX_KLINES_PER_REQUEST, session, base_url,
+                                            start_time=cursor, end_time=end_ms, closed_only=True, budget=budget)
+        if not len(page_ts):
+            return
+        yield page_ts, page_values
+        if len(page_ts) < MAX_KLINES_PER_REQUEST:
+            return
+        cursor = int(page_ts[-1]) + step
+
+
+def backfill_range(symbol, interval, start_ms, end_ms, history, session=None, base_url=BINANCE_REST_URL,
+                   budget=None, pages_per_write=10):
+    """Download closed klines in ``[start_ms, end_ms]`` into ``history``. Returns the candles written.
+
+    Candles before the stored ones are downloaded first and merged in with one
+    rewrite. The rest resumes after the last stored candle, so an interrupted
+    run picks up where it stopped, and is appended ``pages_per_write`` pages
+    at a time.
+    """
+    step = interval_ms(interval)
+    first = history.first_timestamp(symbol, interval)
+    written = 0
+
+    if first is not None and start_ms < first:
+        pages = list(_pages(symbol, interval, start_ms, min(end_ms, first - step), session, base_url, budget))
+        if pages:
+            written += history.merge(symbol, interval, np.concatenate([ts for ts, _ in pages]),
+                                     np.concatenate([values for _, values in pages]))
+
+    last = history.last_timestamp(symbol, interval)
+    timestamps, values = [], []
+
+    def flush():
+        nonlocal written
+        if timestamps:
+            written += history.append(symbol, interval, np.concatenate(timestamps), np.concatenate(values))
+            timestamps.clear()
+            values.clear()
+
+    start = start_ms if last is None else max(start_ms, last + step)
+    for page_ts, page_values in _pages(symbol, interval, start, end_ms, session, base_url, budget):
+        timestamps.append(page_ts)
+        values.append(page_values)
+        if len(timestamps) >= pages_per_write:
+            flush()
+    flush()
+    return written
+
+
+def backfill_history(symbols, intervals, start_ms, end_ms, history, max_workers=10,
+                     base_url=BINANCE_REST_URL, weight_limit=None):
+    """Backfill every (symbol, interval) concurrently within one shared request-weight budget.
+
+    Returns ``{"written": {(symbol, interval): candles}, "failed": {...}, "requests": n, "elapsed": seconds}``.
+    """
+    started = time.perf_counter()
+    budget = RequestBudget(weight_limit) if weight_limit else RequestBudget()
+    written, failed = {}, {}
+
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(backfill_range, symbol, interval, start_ms, end_ms, history, session, base_url, budget):
+                (symbol, interval)
+            for interval in intervals
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                written[key] = future.result()
+                print(f"Backfilled {key[0].upper()} {key[1]}: {written[key]} candles")
+            except Exception as e:
+                failed[key] = str(e)
+                print(f"Failed to backfill {key[0].upper()} {key[1]}: {e}")
+
+    return {
+        "written": written,
+        "failed": failed,
+        "requests": budget.requests,
+        "throttled": budget.throttled,
+        "elapsed": time.perf_counter() - started,
+    }
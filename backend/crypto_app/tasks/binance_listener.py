@@ -1,91 +1,320 @@
 import asyncio
-import json
-import pandas as pd
+import os
+import random
+import time
 import websockets
-import threading
-from crypto_app.dash_apps.data_store import SYMBOLS, live_candles
-from .fetch_initial_candles import fetch_initial_candles
+from django.conf import settings
+from crypto_app.dash_apps.aggregation import aggregator
+from crypto_app.dash_apps.alert_engine import alert_engine
+from crypto_app.dash_apps.data_store import SYMBOLS, candle_stores, live_candles
+from crypto_app.dash_apps.history_store import HistoryStore, flush_stores, load_from_history
+from crypto_app.dash_apps.shared_store import SharedStorePublisher
+from crypto_app.dash_apps.signal_engine import signal_engine
+from crypto_app.dash_apps.streaming_indicators import indicator_engine
+from .alert_delivery import deliver_alerts, refresh_alert_rules
+from .fetch_initial_candles import BINANCE_REST_URL, backfill_gaps, fetch_all_initial_candles
+from .frame_queue import FrameQueue, new_queue_stats
+from .ingest_health import write_health
+from .kline_decoder import apply_kline, decode_kline
 
 
+def new_stats():
+    """Health counters for one websocket connection"""
+    return {
+        "symbols": 0,
+        "connects": 0,
+        "reconnects": 0,
+        "disconnects": 0,
+        "stale_timeouts": 0,
+        "errors": 0,
+        "messages": 0,
+        "message_rate": 0.0,
+        "lag_ms": 0.0,
+        "last_message_at": None,
+        "gaps_backfilled": 0,
+        "candles_backfilled": 0,
+        "last_gap": 0,
+        "max_gap": 0,
+    }
 
-def start_ws(symbols=SYMBOLS, interval="1m"):
-    async def listen():
-        stream_names = [f"{s}@kline_{interval}" for s in symbols]
-        streams = "/".join(stream_names)
-        uri = f"wss://stream.binance.com:9443/stream?streams={streams}"
-        # uri = f"wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}"
-        # uri = f"wss://stream.binance.com:9443/ws/{streams}"
-
-        async with websockets.connect(uri) as websocket:
-            while True:
-                msg = await websocket.recv()
-                data = json.loads(msg)
-                k = data['data']['k']
-                symbol = data['data']['s'].lower()
-
-                
-                # Candle closed
-                if k['x']:  
-                    candle = {
-                        'timestamp': pd.to_datetime(k['t'], unit='ms'),
-                        'open': float(k['o']),
-                        'high': float(k['h']),
-                        'low': float(k['l']),
-                        'close': float(k['c']),
-                        'volume': float(k['v']),
-                    }
-
-                    df = live_candles[symbol]
-                    new_df = pd.DataFrame([candle])
-                    df = pd.concat([df, new_df], ignore_index=True).tail(500).reset_index(drop=True)
-                    live_candles[symbol] = df
-
-
-    """Fetch initial historical data first"""
-    for sym in symbols:
-        fetch_initial_candles(sym)
 
+"""Per-shard ingestion counters, readable from other threads"""
+shard_stats = {}
 
-    """Start async loop"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(listen())
+"""Depth and backpressure counters of the receive -> process queue"""
+queue_stats = new_queue_stats()
+
+SUMMED_STATS = (
+    "symbols", "connects", "reconnects", "disconnects", "stale_timeouts", "errors",
+    "messages", "message_rate", "gaps_backfilled", "candles_backfilled",
+)
+
+
+def ingest_summary():
+    """Counters summed over all shards, plus the worst lag and gap"""
+    shards = list(shard_stats.values())
+    summary = {key: sum(stats[key] for stats in shards) for key in SUMMED_STATS}
+    summary["shards"] = len(shards)
+    summary["lag_ms"] = max((stats["lag_ms"] for stats in shards), default=0.0)
+    summary["max_gap"] = max((stats["max_gap"] for stats in shards), default=0)
+    summary.update(queue_stats)
+    return summary
+
+
+def health_report():
+    """What the ingester publishes about itself for the web processes: the summary and every shard's counters"""
+    return {
+        "pid": os.getpid(),
+        "summary": ingest_summary(),
+        "shards": [dict(stats, shard=shard) for shard, stats in sorted(shard_stats.items())],
+    }
+
+
+async def report_health(path=None, period=30.0):
+    """Log the ingest summary every ``period`` seconds, and write the health report to ``path`` if set"""
+    while True:
+        await asyncio.sleep(period)
+        report = health_report()
+        summary = report["summary"]
+        print(f"Ingest: {summary['message_rate']:.1f} msg/s on {summary['shards']} shards, "
+              f"lag {summary['lag_ms']:.0f} ms, {summary['reconnects']} reconnects, "
+              f"{summary['gaps_backfilled']} gaps backfilled ({summary['candles_backfilled']} candles), "
+              f"queue {summary['queue_depth']}/{summary['queue_capacity']}, {summary['queue_dropped']} dropped")
+        if path:
+            try:
+                write_health(path, report)
+            except OSError as e:
+                print(f"Failed to write ingest health to {path}: {e!r}")
+
+
+def shard_symbols(symbols, shard_size):
+    return [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)]
+
+
+def stream_url(symbols, interval, base_url):
+    streams = "/".join(f"{s}@kline_{interval}" for s in symbols)
+    return f"{base_url}/stream?streams={streams}"
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def record_gaps(gaps, stats):
+    missed = sum(gaps.values())
+    stats["last_gap"] = max(gaps.values(), default=0)
+    stats["max_gap"] = max(stats["max_gap"], stats["last_gap"])
+    stats["candles_backfilled"] += missed
+    if missed:
+        stats["gaps_backfilled"] += 1
+
+
+def handle_message(msg):
+    kline = decode_kline(msg)
+    apply_kline(kline, live_candles)
+    alert_engine.on_price(kline.symbol, kline.close, kline.event_time)
+    if kline.closed:
+        aggregator.add_kline(kline)
+        values = indicator_engine.update(kline.symbol, kline.open_time, kline.open, kline.high,
+                                         kline.low, kline.close, kline.volume)
+        signal_engine.evaluate(kline.symbol, kline.open_time, dict(values, close=kline.close))
+        alert_engine.on_close(kline.symbol, values.get("rsi"), kline.open_time)
+    return kline
+
+
+def seed_timeframes(symbols):
+    """Derive the higher timeframes, streaming indicators and signals from the 1m history already in the store"""
+    for symbol in symbols:
+        view = live_candles.view(symbol)
+        if view is not None:
+            aggregator.seed(symbol, view)
+            values = indicator_engine.rebuild(symbol, view)
+            if len(view):
+                signal_engine.evaluate(symbol, view.timestamp[-1], dict(values, close=float(view.close[-1])))
 
 
-def start_ws_thread():
-    thread = threading.Thread(target=start_ws, daemon=True)
-    thread.start()
+def shard_backfill(shard, interval, stats, workers=10, rest_url=BINANCE_REST_URL, history=None, publisher=None,
+                   store=live_candles, seed=seed_timeframes):
+    """``on_connect`` hook of one shard: fill the candles missed while disconnected, before reading the stream again"""
+    async def backfill():
+        loop = asyncio.get_running_loop()
+        gaps = await loop.run_in_executor(None, backfill_gaps, shard, interval, workers, rest_url, store, history)
+        record_gaps(gaps, stats)
+        seed([symbol for symbol, missed in gaps.items() if missed])
+        if publisher is not None:
+            publisher.publish_all(shard)
+    return backfill
 
 
-"""Call this from somewhere safe, or use Celery later"""
-threading.Thread(target=start_ws).start()
+async def supervise(uri, on_message, on_connect=None, stats=None,
+                    stale_after=30.0, backoff_base=1.0, backoff_cap=60.0):
+    """Keep a websocket connection alive forever.
 
+    Reconnects with jittered exponential backoff after any failure, and treats
+    ``stale_after`` seconds without a message as a dead connection (keepalive
+    pings only prove the socket is open, not that data is flowing).
+    ``on_connect`` is awaited after each (re)connect, before messages are read.
+    """
+    stats = stats if stats is not None else new_stats()
+    attempt = 0
+    while True:
+        try:
+            async with websockets.connect(uri) as websocket:
+                stats["connects"] += 1
+                if stats["connects"] > 1:
+                    stats["reconnects"] += 1
+                if on_connect is not None:
+                    await on_connect()
 
+                while True:
+                    msg = await asyncio.wait_for(websocket.recv(), timeout=stale_after)
+                    attempt = 0
+                    stats["messages"] += 1
+                    stats["last_message_at"] = time.time()
+                    on_message(msg)
 
+        except asyncio.TimeoutError:
+            stats["stale_timeouts"] += 1
+            print(f"No message for {stale_after}s on {uri[:80]}, reconnecting")
+        except (websockets.ConnectionClosed, OSError) as e:
+            stats["disconnects"] += 1
+            print(f"Websocket disconnected: {e}")
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Websocket ingestion error: {e!r}")
 
-# def start_ws(symbol="btcusdt", interval="1m"):
-#     async def listen():
-#         uri = f"wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}"
-#         global live_candles
+        delay = backoff_delay(attempt, backoff_base, backoff_cap)
+        attempt += 1
+        await asyncio.sleep(delay)
 
-#         async with websockets.connect(uri) as websocket:
-#             while True:
-#                 msg = await websocket.recv()
-#                 data = json.loads(msg)
-#                 k = data['k']
-#                 if k['x']:
-#                     candle = {
-#                         'timestamp': pd.to_datetime(k['t'], unit='ms'),
-#                         'open': float(k['o']),
-#                         'high': float(k['h']),
-#                         'low': float(k['l']),
-#                         'close': float(k['c']),
-#                         'volume': float(k['v']),
-#                     }
-#                     new_df = pd.DataFrame([candle])
-#                     live_candles = pd.concat([live_candles, new_df], ignore_index=True).tail(500).reset_index(drop=True)
 
-#     loop = asyncio.new_event_loop()
-#     asyncio.set_event_loop(loop)
-#     loop.run_until_complete(listen())
+def shard_receivers(symbols, interval, shard_size, queue, ws_url, make_on_connect=None, **options):
+    """One ``supervise`` coroutine per ``shard_size`` symbols, putting its frames on ``queue`` tagged with its shard.
 
+    Registers each shard's counters in ``shard_stats``; ``options`` go to ``supervise``.
+    """
+    receivers = []
+    for i, shard in enumerate(shard_symbols(list(symbols), shard_size)):
+        stats = shard_stats[i] = new_stats()
+        stats["symbols"] = len(shard)
+        receivers.append(supervise(
+            stream_url(shard, interval, ws_url),
+            lambda msg, i=i: queue.put_nowait(i, msg),
+            on_connect=make_on_connect(shard, stats) if make_on_connect is not None else None,
+            stats=stats,
+            **options,
+        ))
+    return receivers
+
+
+async def consume(queue, publisher=None, batch_size=500):
+    """Single ordered ingestion pipeline fed by every shard.
+
+    Drains the queue in batches and yields to the event loop after each one,
+    so the receivers keep reading sockets while a backlog is worked off.
+    """
+    while True:
+        for shard, msg in await queue.get(batch_size):
+            stats = shard_stats[shard]
+            try:
+                kline = handle_message(msg)
+                if publisher is not None:
+                    publisher.publish(kline.symbol)
+                stats["lag_ms"] = time.time() * 1000 - kline.event_time
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"Failed to process message from shard {shard}: {e!r}")
+        await asyncio.sleep(0)
+
+
+async def measure_rates(period=5.0):
+    """Refresh each shard's messages-per-second every ``period`` seconds"""
+    seen = {}
+    while True:
+        await asyncio.sleep(period)
+        for shard, stats in shard_stats.items():
+            stats["message_rate"] = (stats["messages"] - seen.get(shard, 0)) / period
+            seen[shard] = stats["messages"]
+
+
+async def flush_history(history, period=60.0):
+    """Persist the committed candles of every store in batches, off the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(period)
+        try:
+            await loop.run_in_executor(None, flush_stores, history)
+        except Exception as e:
+            print(f"Failed to flush candle history: {e!r}")
+
+
+def start_ws(symbols=SYMBOLS, interval="1m"):
+    workers = getattr(settings, "CANDLE_BOOTSTRAP_WORKERS", 10)
+    rest_url = getattr(settings, "BINANCE_REST_URL", BINANCE_REST_URL)
+    ws_url = settings.BINANCE_WS_URL
+    shard_size = getattr(settings, "CANDLE_STREAM_SHARD_SIZE", 25)
+
+    async def listen():
+        queue = FrameQueue(
+            getattr(settings, "CANDLE_INGEST_QUEUE_SIZE", 10000),
+            getattr(settings, "CANDLE_INGEST_OVERFLOW", "coalesce"),
+            queue_stats,
+        )
+        tasks = [
+            consume(queue, publisher),
+            measure_rates(),
+            report_health(getattr(settings, "CANDLE_INGEST_HEALTH_FILE", None),
+                          getattr(settings, "CANDLE_INGEST_HEALTH_INTERVAL", 30.0)),
+        ]
+        if history is not None:
+            tasks.append(flush_history(history, getattr(settings, "CANDLE_HISTORY_FLUSH_INTERVAL", 60.0)))
+        alert_refresh = getattr(settings, "CANDLE_ALERT_REFRESH_INTERVAL", 10.0)
+        if alert_refresh:
+            tasks.append(refresh_alert_rules(alert_engine, alert_refresh))
+            tasks.append(deliver_alerts(alert_engine, getattr(settings, "CANDLE_ALERT_DELIVERY_INTERVAL", 0.25)))
+            if not getattr(settings, "CHANNEL_REDIS_URL", None):
+                print("CHANNEL_REDIS_URL is not set: alerts will not reach the web server's sockets")
+
+        tasks.extend(shard_receivers(
+            symbols, interval, shard_size, queue, ws_url,
+            lambda shard, stats: shard_backfill(shard, interval, stats, workers, rest_url, history, publisher),
+            stale_after=getattr(settings, "CANDLE_STREAM_STALE_AFTER", 30.0),
+            backoff_base=getattr(settings, "CANDLE_RECONNECT_BACKOFF_BASE", 1.0),
+            backoff_cap=getattr(settings, "CANDLE_RECONNECT_BACKOFF_CAP", 60.0),
+        ))
+
+        await asyncio.gather(*tasks)
+
+
+    live_candles.set_publish_interval(getattr(settings, "CANDLE_FORMING_PUBLISH_INTERVAL", 1.0))
+
+    """Warm start from the on-disk history, then fetch over REST only what it lacks"""
+    history_dir = getattr(settings, "CANDLE_HISTORY_DIR", None)
+    history = HistoryStore(history_dir) if history_dir else None
+    warm = load_from_history(symbols, history) if history is not None else []
+    cold = [s for s in symbols if s not in warm]
+
+    if warm:
+        backfill_gaps(warm, interval, workers, rest_url, live_candles, history)
+    if cold:
+        fetch_all_initial_candles(cold, interval, max_workers=workers, base_url=rest_url)
+    seed_timeframes(symbols)
+
+    """Mirror the stores into shared memory for web worker processes"""
+    shared_prefix = getattr(settings, "CANDLE_SHARED_MEMORY_PREFIX", "")
+    publisher = SharedStorePublisher(shared_prefix, candle_stores, symbols) if shared_prefix else None
+    if publisher is not None:
+        publisher.publish_all()
+
+
+    """Start async loop"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(listen())
+    finally:
+        if history is not None:
+            flush_stores(history)
+        if publisher is not None:
+            publisher.close()
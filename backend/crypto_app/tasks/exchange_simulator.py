@@ -0,0 +1,248 @@
+import asyncio
+from collections import defaultdict
+import gzip
+import json
+import math
+import random
+import struct
+import time
+from urllib.parse import parse_qs, urlparse
+import requests
+import websockets
+from websockets.asyncio.server import broadcast, serve
+from crypto_app.dash_apps.data_store import SYMBOLS, interval_ms
+from .fetch_initial_candles import BINANCE_REST_URL, KLINES_PATH
+from .kline_decoder import encode_frame, loads
+
+
+"""Feed log records: kind, seconds since the start of the recording, payload length"""
+RECORD_HEADER = struct.Struct("<cdI")
+WS_FRAME = b"W"
+REST_KLINES = b"R"
+
+
+class FeedRecorder:
+    """Writes raw websocket frames and kline REST responses to a gzip'd binary log"""
+
+    def __init__(self, path):
+        self._file = gzip.open(path, "wb")
+        self._started = time.monotonic()
+
+    def write(self, kind, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._file.write(RECORD_HEADER.pack(kind, time.monotonic() - self._started, len(payload)))
+        self._file.write(payload)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_log(path):
+    """Yield (kind, offset seconds, payload bytes) from a feed log"""
+    with gzip.open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            kind, offset, length = RECORD_HEADER.unpack(header)
+            yield kind, offset, f.read(length)
+
+
+async def record_feed(path, symbols=SYMBOLS, interval="1m", duration=60.0, limit=100,
+                      ws_url="wss://stream.binance.com:9443", rest_url=BINANCE_REST_URL):
+    """Record each symbol's klines over REST, then ``duration`` seconds of the combined stream"""
+    with FeedRecorder(path) as recorder:
+        now_ms = time.time() * 1000
+        for symbol in symbols:
+            params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+            response = requests.get(rest_url + KLINES_PATH, params=params, timeout=10)
+            response.raise_for_status()
+            klines = [k for k in response.json() if k[6] < now_ms]
+            recorder.write(REST_KLINES, json.dumps({"symbol": symbol.upper(), "interval": interval, "klines": klines}))
+
+        streams = "/".join(f"{s}@kline_{interval}" for s in symbols)
+        frames = 0
+        async with websockets.connect(f"{ws_url}/stream?streams={streams}") as websocket:
+            deadline = time.monotonic() + duration
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    msg = await asyncio.wait_for(websocket.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                recorder.write(WS_FRAME, msg)
+                frames += 1
+        return frames
+
+
+def simulated_symbols(count):
+    """The first ``count`` real symbols, padded with made-up ones"""
+    return [*SYMBOLS[:count], *(f"sim{i}usdt" for i in range(max(count - len(SYMBOLS), 0)))]
+
+
+class RandomWalkMarket:
+    """Synthetic 1m klines for many symbols on a simulated clock"""
+
+    def __init__(self, symbols, start_ms, history=500, interval="1m", seed=None):
+        self.step = interval_ms(interval)
+        self.interval = interval
+        self.random = random.Random(seed)
+        self.closed = {}
+        self.forming = {}
+        start = start_ms - start_ms % self.step
+        for symbol in symbols:
+            price = self.random.uniform(0.1, 50000)
+            rows = []
+            for i in range(history):
+                rows.append(self._candle(start - (history - i) * self.step, price))
+                price = rows[-1][4]
+            self.closed[symbol.upper()] = rows
+            self.forming[symbol.upper()] = [start, price, price, price, price, 0.0]
+
+    def _candle(self, open_time, price):
+        close = price * math.exp(self.random.gauss(0, 0.002))
+        high = max(price, close) * (1 + abs(self.random.gauss(0, 0.0005)))
+        low = min(price, close) * (1 - abs(self.random.gauss(0, 0.0005)))
+        return [open_time, price, high, low, close, self.random.uniform(1, 100)]
+
+    def advance(self, now_ms, dt_seconds):
+        """Move every symbol to ``now_ms``; yields (symbol, candle, closed)"""
+        scale = 0.002 * math.sqrt(max(dt_seconds, 1e-6) / 60)
+        for symbol, candle in self.forming.items():
+            while now_ms >= candle[0] + self.step:
+                self.closed[symbol].append(candle)
+                yield symbol, candle, True
+                price = candle[4]
+                candle = self.forming[symbol] = [candle[0] + self.step, price, price, price, price, 0.0]
+            close = candle[4] * math.exp(self.random.gauss(0, scale))
+            candle[2] = max(candle[2], close)
+            candle[3] = min(candle[3], close)
+            candle[4] = close
+            candle[5] += self.random.uniform(0, 2)
+            yield symbol, candle, False
+
+    def klines(self, symbol, start=None, end=None, limit=500):
+        """REST rows like Binance's, closed candles only"""
+        rows = self.closed.get(symbol, [])
+        if start is not None:
+            rows = [r for r in rows if r[0] >= start]
+        if end is not None:
+            rows = [r for r in rows if r[0] <= end]
+        rows = rows[:limit] if start is not None else rows[-limit:]
+        return [
+            [r[0], f"{r[1]:.8f}", f"{r[2]:.8f}", f"{r[3]:.8f}", f"{r[4]:.8f}", f"{r[5]:.8f}",
+             r[0] + self.step - 1, "0", 100, "0", "0", "0"]
+            for r in rows
+        ]
+
+
+class ExchangeSimulator:
+    """Local websocket + REST stand-in for the Binance endpoints used by the listener.
+
+    Serves ``/stream?streams=...`` and ``/api/v3/klines`` on one port, either
+    replaying a feed log or synthesizing random-walk klines. ``speed`` scales
+    time: 60 means one simulated minute per real second. A replay starts when
+    the first client subscribes.
+    """
+
+    def __init__(self, symbols=50, speed=1.0, replay=None, history=500, tick=0.25, seed=None):
+        self.speed = speed
+        self.replay = replay
+        self.tick = tick
+        self.frames_sent = 0
+        self._subscribers = defaultdict(set)
+        self._subscribed = asyncio.Event()
+        self._rest = {}
+        self.market = None
+        if replay is None:
+            """Start a year back so simulated candles stay in the past at high speeds"""
+            self._sim_start = time.time() * 1000 - 365 * 86_400_000
+            self.market = RandomWalkMarket(simulated_symbols(symbols), self._sim_start, history, seed=seed)
+        else:
+            for kind, _, payload in read_log(replay):
+                if kind == REST_KLINES:
+                    record = loads(payload)
+                    self._rest[record["symbol"]] = record["klines"]
+
+    def _klines(self, query):
+        symbol = query.get("symbol", [""])[0].upper()
+        limit = min(int(query.get("limit", ["500"])[0]), 1000)
+        start = int(query["startTime"][0]) if "startTime" in query else None
+        end = int(query["endTime"][0]) if "endTime" in query else None
+        if self.market is not None:
+            return self.market.klines(symbol, start, end, limit)
+        rows = [r for r in self._rest.get(symbol, []) if (start is None or r[0] >= start) and (end is None or r[0] <= end)]
+        return rows[:limit] if start is not None else rows[-limit:]
+
+    def _process_request(self, connection, request):
+        url = urlparse(request.path)
+        if url.path == KLINES_PATH:
+            response = connection.respond(200, json.dumps(self._klines(parse_qs(url.query))))
+            response.headers["Content-Type"] = "application/json"
+            return response
+        if url.path != "/stream":
+            return connection.respond(404, "Not found\n")
+        return None
+
+    async def _handler(self, websocket):
+        query = parse_qs(urlparse(websocket.request.path).query)
+        streams = query.get("streams", [""])[0].split("/")
+        for stream in streams:
+            self._subscribers[stream].add(websocket)
+        self._subscribed.set()
+        try:
+            await websocket.wait_closed()
+        finally:
+            for stream in streams:
+                self._subscribers[stream].discard(websocket)
+
+    def _send(self, stream, frame):
+        subscribers = self._subscribers.get(stream)
+        if subscribers:
+            broadcast(subscribers, frame)
+            self.frames_sent += len(subscribers)
+
+    async def _synthesize(self):
+        interval = self.market.interval
+        started = time.monotonic()
+        last = started
+        while True:
+            await asyncio.sleep(max(self.tick / self.speed, 0.005))
+            now = time.monotonic()
+            sim_now = self._sim_start + (now - started) * 1000 * self.speed
+            event_time = int(time.time() * 1000)
+            for symbol, candle, closed in self.market.advance(sim_now, (now - last) * self.speed):
+                stream = f"{symbol.lower()}@kline_{interval}"
+                if self._subscribers.get(stream):
+                    self._send(stream, encode_frame(symbol, *candle, closed, event_time=event_time,
+                                                           interval=interval, close_time=candle[0] + self.market.step - 1))
+            last = now
+
+    async def _replay(self):
+        await self._subscribed.wait()
+        started = time.monotonic()
+        for kind, offset, payload in read_log(self.replay):
+            if kind != WS_FRAME:
+                continue
+            delay = offset / self.speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._send(loads(payload)["stream"], payload.decode())
+
+    async def serve(self, host="127.0.0.1", port=0, ready=None):
+        """Run until cancelled. ``ready`` is called with the bound port once listening."""
+        async with serve(self._handler, host, port, process_request=self._process_request) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            if ready is not None:
+                ready(self.port)
+            if self.market is not None:
+                await self._synthesize()
+            else:
+                await self._replay()
+                await asyncio.Future()
@@ -1,29 +1,196 @@
-from crypto_app.dash_apps.data_store import live_candles
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from crypto_app.dash_apps.data_store import interval_ms, live_candles
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 
 
-def fetch_initial_candles(symbol, interval="1m", limit=100):
-    url = f"https://api.binance.com/api/v3/klines"
+BINANCE_REST_URL = "https://api.binance.com"
+KLINES_PATH = "/api/v3/klines"
+MAX_KLINES_PER_REQUEST = 1000
+
+"""Request weight of one klines call with limit <= 1000, and the per-IP limit per minute"""
+KLINES_WEIGHT = 2
+WEIGHT_LIMIT_1M = 6000
+
+
+def create_session(pool_size=10):
+    """HTTP session whose keep-alive pool can serve ``pool_size`` concurrent requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RequestBudget:
+    """Shared request-weight budget for one minute window, safe to use from many threads.
+
+    The exchange reports the weight already used by this IP in the
+    ``X-MBX-USED-WEIGHT-1M`` header, which also counts other processes, so
+    the local tally is raised to it after every response. A 429/418 pauses
+    everyone for ``Retry-After`` seconds.
+    """
+
+    def __init__(self, limit=WEIGHT_LIMIT_1M):
+        self.limit = limit
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._window = None
+        self._used = 0
+        self._paused_until = 0.0
+
+    def _reserve(self, weight, now):
+        """Take ``weight`` from the current window; returns 0, or the seconds to wait first"""
+        with self._lock:
+            window = int(now // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._used + weight > self.limit:
+                return (window + 1) * 60 - now
+            self._used += weight
+            self.requests += 1
+            return 0
+
+    def acquire(self, weight=KLINES_WEIGHT):
+        while (wait := self._reserve(weight, time.time())) > 0:
+            time.sleep(wait)
+
+    def update(self, response):
+        with self._lock:
+            used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+            if used is not None and self._window == int(time.time() // 60):
+                self._used = max(self._used, int(used))
+            if response.status_code in (418, 429):
+                self.throttled += 1
+                retry_after = float(response.headers.get("Retry-After", 60))
+                self._paused_until = max(self._paused_until, time.time() + retry_after)
+
+
+def fetch_klines(symbol, interval="1m", limit=100, session=None, base_url=BINANCE_REST_URL,
+                 start_time=None, closed_only=False, end_time=None, budget=None):
+    """Download klines and return (int64 open times, float64 OHLCV rows)"""
     params = {
         "symbol": symbol.upper(),
         "interval": interval,
         "limit": limit
     }
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    if end_time is not None:
+        params["endTime"] = int(end_time)
+    while True:
+        if budget is not None:
+            budget.acquire()
+        response = (session or requests).get(base_url + KLINES_PATH, params=params, timeout=10)
+        if budget is None:
+            break
+        budget.update(response)
+        if response.status_code not in (418, 429):
+            break
+    response.raise_for_status()
+    klines = response.json()
+
+    """Kline rows are [open_time, open, high, low, close, volume, close_time, ...]"""
+    if closed_only:
+        now_ms = time.time() * 1000
+        klines = [k for k in klines if k[6] < now_ms]
+    rows = np.array([k[:6] for k in klines], dtype=np.float64).reshape(-1, 6)
+    return rows[:, 0].astype(np.int64), rows[:, 1:]
+
+
+def fetch_initial_candles(symbol, interval="1m", limit=100, session=None, base_url=BINANCE_REST_URL):
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        klines = response.json()
-        data = [{
-            "timestamp": pd.to_datetime(k[0], unit='ms'),
-            "open": float(k[1]),
-            "high": float(k[2]),
-            "low": float(k[3]),
-            "close": float(k[4]),
-            "volume": float(k[5])
-        } for k in klines]
-
-        live_candles[symbol] = pd.DataFrame(data)
+        timestamps, values = fetch_klines(symbol, interval, limit, session, base_url, closed_only=True)
+        live_candles.load(symbol, timestamps, values)
+        return True
 
     except Exception as e:
-        print(f"Failed to fetch initial candles for {symbol.upper()}: {e}")
\ No newline at end of file
+        print(f"Failed to fetch initial candles for {symbol.upper()}: {e}")
+        return False
+
+
+def fetch_all_initial_candles(symbols, interval="1m", limit=100, max_workers=10,
+                              base_url=BINANCE_REST_URL, store=live_candles):
+    """Bootstrap every symbol concurrently over one pooled keep-alive session.
+
+    A failing symbol is reported in ``failed`` and does not abort the batch.
+    Returns ``{"loaded": [...], "failed": {symbol: error}, "elapsed": seconds}``.
+    """
+    started = time.perf_counter()
+    loaded, failed = [], {}
+
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_klines, symbol, interval, limit, session, base_url, closed_only=True): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                timestamps, values = future.result()
+                store.load(symbol, timestamps, values)
+                loaded.append(symbol)
+            except Exception as e:
+                failed[symbol] = str(e)
+                print(f"Failed to fetch initial candles for {symbol.upper()}: {e}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Warm-up: loaded {len(loaded)}/{len(futures)} symbols in {elapsed:.2f}s")
+    return {"loaded": loaded, "failed": failed, "elapsed": elapsed}
+
+
+def backfill_gap(symbol, interval="1m", session=None, base_url=BINANCE_REST_URL, store=live_candles,
+                 history=None):
+    """Fetch the closed klines missed since the last stored candle. Returns the number of new candles.
+
+    Pages are also appended to ``history`` when given, so a gap longer than
+    the in-memory window still ends up contiguous on disk.
+    """
+    buffer = store.buffer(symbol)
+    last = buffer.last_timestamp
+    if last is None:
+        timestamps, values = fetch_klines(symbol, interval, store.capacity, session, base_url,
+                                          closed_only=True)
+        store.load(symbol, timestamps, values)
+        return len(timestamps)
+
+    step = interval_ms(interval)
+    missed = 0
+    start = last
+    while True:
+        """Start at the last stored candle so a partially seen one is refreshed too"""
+        timestamps, values = fetch_klines(symbol, interval, MAX_KLINES_PER_REQUEST, session,
+                                          base_url, start_time=start, closed_only=True)
+        if history is not None:
+            history.append(symbol, interval, timestamps, values)
+        for timestamp, row in zip(timestamps, values):
+            if timestamp > last:
+                missed += 1
+            buffer.append(int(timestamp), *row)
+        if len(timestamps) < MAX_KLINES_PER_REQUEST:
+            return missed
+        start = int(timestamps[-1]) + step
+
+
+def backfill_gaps(symbols, interval="1m", max_workers=10, base_url=BINANCE_REST_URL, store=live_candles,
+                  history=None):
+    """Backfill every symbol concurrently. Returns ``{symbol: missed candles}`` for the symbols that succeeded."""
+    gaps = {}
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(backfill_gap, symbol, interval, session, base_url, store, history): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                gaps[symbol] = future.result()
+            except Exception as e:
+                print(f"Failed to backfill candles for {symbol.upper()}: {e}")
+    return gaps
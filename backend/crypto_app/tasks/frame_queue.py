@@ -0,0 +1,149 @@
+import asyncio
+from collections import deque
+import time
+
+
+OVERFLOW_POLICIES = ("coalesce", "drop_oldest")
+
+
+def new_queue_stats():
+    """Backpressure counters for one FrameQueue"""
+    return {
+        "queue_depth": 0,
+        "queue_max_depth": 0,
+        "queue_capacity": 0,
+        "queue_dropped": 0,
+        "queue_dropped_closed": 0,
+        "queue_coalesced": 0,
+        "queue_wait_ms": 0.0,
+    }
+
+
+def frame_key(msg):
+    """(stream, closed) read straight from a raw combined-stream frame, without parsing it"""
+    if isinstance(msg, bytes):
+        msg = msg.decode()
+    start = msg.find('"stream":"')
+    if start < 0:
+        return None, True
+    start += 10
+    return msg[start:msg.find('"', start)], '"x":true' in msg
+
+
+class FrameQueue:
+    """Bounded asyncio queue between the websocket receivers and the ingestion consumer.
+
+    ``put_nowait`` never blocks a receiver. With the ``coalesce`` policy an
+    open-kline frame replaces the still-queued open-kline frame of the same
+    stream (the forming candle is last-write-wins anyway); closed klines are
+    never coalesced. When the queue is full the oldest frame is dropped; under
+    ``coalesce`` that is the oldest open-kline frame, and a closed kline (which
+    costs a REST backfill) only goes when nothing else is queued.
+
+    Open-kline frames are also kept in their own deque, so finding the one to
+    drop is O(1). Dropped frames stay in the main deque marked dead until the
+    consumer skips them, or until there are more of them than ``maxsize``.
+    """
+
+    def __init__(self, maxsize=10000, policy="coalesce", stats=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stats = stats if stats is not None else new_queue_stats()
+        self.stats["queue_capacity"] = maxsize
+        self._items = deque()
+        self._open = deque()
+        self._pending = {}
+        self._size = 0
+        self._dead = 0
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return self._size
+
+    def put_nowait(self, shard, msg):
+        stream, closed = frame_key(msg)
+        if self.policy == "coalesce":
+            if closed:
+                self._pending.pop(stream, None)
+            else:
+                item = self._pending.get(stream)
+                if item is not None:
+                    """[shard, frame, enqueued at, stream, closed, queued]"""
+                    item[1] = msg
+                    self.stats["queue_coalesced"] += 1
+                    return
+
+        if self._size >= self.maxsize:
+            dropped = self._evict()
+            self._remove(dropped)
+            self._dead += 1
+            self.stats["queue_dropped"] += 1
+            self.stats["queue_dropped_closed"] += dropped[4]
+            if self._dead > self.maxsize:
+                self._items = deque(item for item in self._items if item[5])
+                self._dead = 0
+
+        item = [shard, msg, time.monotonic(), stream, closed, True]
+        self._items.append(item)
+        self._size += 1
+        if self.policy == "coalesce" and not closed:
+            self._open.append(item)
+            if stream is not None:
+                self._pending[stream] = item
+        self._update_depth()
+        self._ready.set()
+
+    def get_batch(self, limit=500):
+        """Up to ``limit`` queued (shard, frame) pairs, oldest first"""
+        batch = []
+        self._skip_dead()
+        if self._items:
+            """How long the oldest frame waited, i.e. how far processing trails receiving"""
+            self.stats["queue_wait_ms"] = (time.monotonic() - self._items[0][2]) * 1000
+        while self._items and len(batch) < limit:
+            item = self._items.popleft()
+            if not item[5]:
+                self._dead -= 1
+                continue
+            self._remove(item)
+            batch.append((item[0], item[1]))
+        self._skip_dead()
+        while self._open and not self._open[0][5]:
+            self._open.popleft()
+        if not self._size:
+            self._ready.clear()
+        self._update_depth()
+        return batch
+
+    async def get(self, limit=500):
+        """Wait for frames, then return them as get_batch does"""
+        while not self._size:
+            await self._ready.wait()
+        return self.get_batch(limit)
+
+    def _skip_dead(self):
+        while self._items and not self._items[0][5]:
+            self._items.popleft()
+            self._dead -= 1
+
+    def _evict(self):
+        """Oldest open-kline frame under ``coalesce``, else the oldest frame"""
+        while self._open:
+            item = self._open.popleft()
+            if item[5]:
+                return item
+        self._skip_dead()
+        return self._items[0]
+
+    def _remove(self, item):
+        item[5] = False
+        self._size -= 1
+        if item[3] is not None and self._pending.get(item[3]) is item:
+            del self._pending[item[3]]
+
+    def _update_depth(self):
+        depth = self._size
+        self.stats["queue_depth"] = depth
+        self.stats["queue_max_depth"] = max(self.stats["queue_max_depth"], depth)
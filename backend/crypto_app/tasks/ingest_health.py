@@ -0,0 +1,22 @@
+import json
+import os
+import time
+
+
+def write_health(path, report):
+    """Replace ``path`` with ``report`` as JSON, stamped with the time it was written"""
+    partial = f"{path}.tmp"
+    with open(partial, "w") as f:
+        json.dump(dict(report, updated_at=time.time()), f)
+    os.replace(partial, path)
+
+
+def read_health(path):
+    """Last report written to ``path`` with its ``age`` in seconds, or None"""
+    try:
+        with open(path) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    report["age"] = time.time() - report.get("updated_at", 0)
+    return report
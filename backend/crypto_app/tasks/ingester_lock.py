@@ -0,0 +1,59 @@
+import fcntl
+import os
+import time
+
+
+class IngesterLock:
+    """Host-wide exclusive lock so exactly one market data ingester runs.
+
+    Uses ``flock`` on a lock file, so the kernel releases it when the holder
+    exits or crashes and a standby can take over. The holder's pid is kept in
+    the file for diagnostics. Put the file on storage shared by every host
+    (e.g. NFS with flock support) to elect one ingester per deployment.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self, blocking=False, poll=1.0):
+        """Take the lock. Without ``blocking`` returns False at once if another process holds it."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not blocking:
+                    os.close(fd)
+                    return False
+                time.sleep(poll)
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        os.ftruncate(self._fd, 0)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def holder(self):
+        """Pid written by the current holder, or None"""
+        try:
+            with open(self.path) as f:
+                pid = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return int(pid) if pid.isdigit() else None
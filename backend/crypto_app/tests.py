@@ -1,6 +1,51 @@
-from django.test import TestCase
-from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from .models import User, SubscriptionPlan, Payment, UserUsageLog, Watchlist, AlertRule
+from .dash_apps.aggregation import CandleAggregator, resample
+from .dash_apps.data_store import CANDLE_COLUMNS, CandleBuffer, CandleStore, Candles, live_candles
+from .dash_apps.shared_store import SharedStorePublisher, attach_readers, shared_readers
+from .dash_apps import indicators, kernels
+from .management.commands import bench_indicators
+from .dash_apps.streaming_indicators import DEFAULT_INDICATORS, IndicatorEngine, RollingMean, RollingStd
+from .dash_apps.panel import build_panel
+from .dash_apps.indicator_pipeline import IndicatorPipeline
+from .dash_apps.indicator_cache import IndicatorCache, indicator_cache
+from .dash_apps.signal_engine import SignalEngine, rsi_ema_actions, rsi_ema_rule, signal_engine
+from .dash_apps.alert_engine import AlertEngine
+from .dash_apps.market_events import MarketWatcher
+from .dash_apps.screener import Screener, parse_query, screener
+from .dash_apps.backtest import ENTRIES, backtest, backtest_grid, parameter_grid, rule_positions, run_backtests
+from .dash_apps.history_store import HistoryStore, flush_stores, load_from_history
+from .tasks.kline_decoder import apply_kline, decode_kline, sample_frame
+from .tasks.exchange_simulator import REST_KLINES, WS_FRAME, ExchangeSimulator, FeedRecorder, read_log, simulated_symbols
+from .tasks.frame_queue import FrameQueue
+from .tasks.binance_listener import (
+    backoff_delay, health_report, new_stats, report_health, shard_backfill, shard_receivers, shard_stats,
+    shard_symbols, supervise,
+)
+from .tasks.ingest_health import read_health
+from .tasks.ingester_lock import IngesterLock
+from .tasks.fetch_initial_candles import RequestBudget, backfill_gaps, fetch_all_initial_candles, fetch_klines
+from .tasks.backfill_history import backfill_history
+from .tasks.alert_delivery import load_rules, refresh_alert_rules, refresh_rules
+from .api import AlertRuleSerializer
+from django.core.management import call_command
+from django.test import override_settings
 from django.utils import timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from io import StringIO
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import websockets
+import numpy as np
+import pandas as pd
 
 # Create your tests here.
 
@@ -54,3 +99,1314 @@ class WatchlistModelTest(TestCase):
         watch = Watchlist.objects.create(user=user, symbol="BTCUSDT")
         self.assertEqual(Watchlist.objects.count(), 1)
         self.assertEqual(watch.symbol, "BTCUSDT")
+
+
+class CandleStoreTest(SimpleTestCase):
+    def test_ring_buffer_keeps_latest_candles_in_order(self):
+        buffer = CandleBuffer(capacity=4)
+        for i in range(10):
+            buffer.append(i * 60000, i, i + 1, i - 1, i + 0.5, 10 * i)
+        view = buffer.view()
+        self.assertEqual(len(view), 4)
+        self.assertEqual(list(view.timestamp), [360000, 420000, 480000, 540000])
+        self.assertEqual(list(view["close"]), [6.5, 7.5, 8.5, 9.5])
+
+    def test_view_copies_only_once_wrapped(self):
+        buffer = CandleBuffer(capacity=3)
+        for i in range(3):
+            buffer.append(i, 1, 2, 0, i, 1)
+        self.assertTrue(np.shares_memory(buffer.view().close, buffer._values))
+        buffer.append(3, 1, 2, 0, 3, 1)
+        view = buffer.view()
+        self.assertFalse(np.shares_memory(view.close, buffer._values))
+        self.assertEqual(list(view.close), [1, 2, 3])
+        self.assertFalse(view.close.flags.writeable)
+        self.assertEqual(buffer.last_timestamp, 3)
+
+    def test_repeated_timestamp_replaces_last_candle(self):
+        buffer = CandleBuffer(capacity=3)
+        buffer.append(0, 1, 2, 0, 1, 1)
+        buffer.append(0, 1, 3, 0, 2, 5)
+        self.assertFalse(buffer.append(-60000, 1, 1, 1, 1, 1))
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.view().close[-1], 2)
+
+    def test_forming_candle_is_separate_and_throttled(self):
+        buffer = CandleBuffer(capacity=3, publish_interval=60)
+        buffer.append(0, 1, 1, 1, 1, 1)
+        self.assertIsNone(buffer.forming())
+        buffer.update_forming(60000, 1, 2, 1, 2, 5)
+        buffer.update_forming(60000, 1, 3, 1, 3, 6)
+        self.assertEqual(buffer.forming()["close"], 2)
+        self.assertEqual(len(buffer), 1)
+
+        buffer.publish_interval = 0
+        self.assertEqual(buffer.forming()["close"], 3)
+        buffer.append(60000, 1, 3, 1, 2.5, 7)
+        self.assertIsNone(buffer.forming())
+        self.assertFalse(buffer.update_forming(60000, 1, 1, 1, 1, 1))
+
+    def test_store_returns_dataframes(self):
+        store = CandleStore(capacity=5)
+        self.assertTrue(store["btcusdt"].empty)
+        store.append("btcusdt", 60000, 1, 2, 0.5, 1.5, 3)
+        df = store["btcusdt"]
+        self.assertEqual(list(df.columns), CANDLE_COLUMNS)
+        self.assertEqual(df["timestamp"].iloc[0], pd.Timestamp("1970-01-01 00:01:00"))
+        self.assertIsNone(store.get("ethusdt"))
+
+    def test_compact_store_halves_values_and_feeds_indicators(self):
+        candles = random_walk_candles(200)
+        values = np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]])
+        full, compact = CandleStore(capacity=200), CandleStore(capacity=200, dtype="float32")
+        full.load("btcusdt", candles.timestamp, values)
+        compact.load("btcusdt", candles.timestamp, values)
+
+        view = compact.view("btcusdt")
+        self.assertEqual(view.close.dtype, np.float32)
+        self.assertEqual(view.timestamp.dtype, np.int64)
+        self.assertEqual(compact.footprint()["bytes_per_symbol_per_1k"] / 1000, 8 + 5 * 4 + 96 / 200)
+        self.assertLess(compact.footprint()["bytes"], 0.6 * full.footprint()["bytes"])
+
+        rsi = indicators.compute_rsi(view)
+        self.assertTrue(rsi.index.equals(pd.to_datetime(candles.timestamp, unit="ms")))
+        np.testing.assert_allclose(rsi, indicators.compute_rsi(full.get("btcusdt")), rtol=1e-4)
+        with self.assertRaises(ValueError):
+            CandleBuffer(capacity=3, dtype="int8")
+
+
+class StandInKlinesHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Binance klines endpoint"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        symbol = query["symbol"][0]
+        if symbol == "BADUSDT":
+            self.send_response(500)
+            self.end_headers()
+            return
+        limit = int(query.get("limit", ["100"])[0])
+        start = int(query.get("startTime", ["0"])[0]) // 60000
+        end = int(query.get("endTime", [str(10 ** 15)])[0]) // 60000
+        stop = min(start + limit, self.server.kline_count, end + 1)
+        self.server.requests += 1
+        klines = [
+            [i * 60000, "1.0", "2.0", "0.5", str(i), "10.0", i * 60000 + 59999]
+            for i in range(start, stop)
+        ]
+        body = json.dumps(klines).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-MBX-USED-WEIGHT-1M", str(2 * self.server.requests))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInKlinesHandler)
+        cls.server.kline_count = 2500
+        cls.server.requests = 0
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+
+class BulkBootstrapTest(StandInServerMixin, SimpleTestCase):
+    def test_loads_all_symbols_and_reports_failures(self):
+        store = CandleStore()
+        report = fetch_all_initial_candles(
+            ["btcusdt", "ethusdt", "badusdt"], limit=20, max_workers=2,
+            base_url=self.base_url, store=store,
+        )
+        self.assertEqual(sorted(report["loaded"]), ["btcusdt", "ethusdt"])
+        self.assertIn("badusdt", report["failed"])
+        self.assertGreater(report["elapsed"], 0)
+        self.assertEqual(len(store.view("ethusdt")), 20)
+        self.assertEqual(store.view("btcusdt").close[-1], 19.0)
+
+    def test_backfill_fetches_only_the_gap(self):
+        store = CandleStore(capacity=3000)
+        store.load("btcusdt", np.arange(10) * 60000, np.ones((10, 5)))
+        gaps = backfill_gaps(["btcusdt", "badusdt"], max_workers=2, base_url=self.base_url, store=store)
+        self.assertEqual(gaps, {"btcusdt": 2490})
+        view = store.view("btcusdt")
+        self.assertEqual(len(view), 2500)
+        self.assertTrue((np.diff(view.timestamp) == 60000).all())
+
+
+class HistoryBackfillTest(StandInServerMixin, SimpleTestCase):
+    def test_pages_and_resumes_into_history(self):
+        with tempfile.TemporaryDirectory() as root:
+            history = HistoryStore(root)
+            report = backfill_history(["btcusdt", "ethusdt"], ["1m"], 0, 1299 * 60000, history,
+                                      max_workers=2, base_url=self.base_url)
+            self.assertEqual(report["written"], {("btcusdt", "1m"): 1300, ("ethusdt", "1m"): 1300})
+
+            """A second run only asks for what is missing"""
+            requests_before = self.server.requests
+            report = backfill_history(["btcusdt"], ["1m"], 0, 2499 * 60000, history, base_url=self.base_url)
+            self.assertEqual(report["written"], {("btcusdt", "1m"): 1200})
+            self.assertEqual(self.server.requests - requests_before, 2)
+            timestamps = history.read("btcusdt", "1m").timestamp
+            self.assertEqual(len(timestamps), 2500)
+            self.assertTrue((np.diff(timestamps) == 60000).all())
+
+    def test_fills_in_before_the_ingested_history(self):
+        with tempfile.TemporaryDirectory() as root:
+            history = HistoryStore(root)
+            history.append("btcusdt", "1m", np.arange(1000, 1100) * 60000, np.full((100, 5), -1.0))
+            report = backfill_history(["btcusdt"], ["1m"], 0, 1299 * 60000, history, base_url=self.base_url)
+            self.assertEqual(report["written"], {("btcusdt", "1m"): 1200})
+            candles = history.read("btcusdt", "1m")
+            self.assertEqual(list(candles.timestamp), list(np.arange(1300) * 60000))
+            self.assertEqual(candles.close[999], 999.0)
+            self.assertTrue((candles.close[1000:1100] == -1).all())
+            self.assertEqual(history.symbols("1m"), ["btcusdt"])
+
+    def test_budget_honors_used_weight_header(self):
+        class Response:
+            status_code = 200
+            headers = {"X-MBX-USED-WEIGHT-1M": "9"}
+
+        if time.time() % 60 > 58:
+            time.sleep(2)
+        budget = RequestBudget(limit=10)
+        now = time.time()
+        self.assertEqual(budget._reserve(2, now), 0)
+        budget.update(Response())
+        self.assertAlmostEqual(budget._reserve(2, now), 60 - now % 60)
+
+        Response.status_code = 429
+        Response.headers = {"Retry-After": "30"}
+        budget.update(Response())
+        self.assertEqual(budget.throttled, 1)
+        self.assertGreater(budget._reserve(2, time.time()), 29)
+
+
+class KlineDecoderTest(SimpleTestCase):
+    def test_decodes_combined_stream_frame(self):
+        kline = decode_kline(sample_frame("ETHUSDT", 120000, 2000.0, closed=False))
+        self.assertEqual(kline.symbol, "ethusdt")
+        self.assertEqual(kline.open_time, 120000)
+        self.assertEqual(kline.open, 2000.0)
+        self.assertAlmostEqual(kline.high, 2004.0)
+        self.assertFalse(kline.closed)
+
+    def test_stdlib_fallback_matches(self):
+        frame = sample_frame().encode()
+        self.assertEqual(decode_kline(frame), decode_kline(frame, json.loads))
+
+    def test_only_closed_klines_reach_the_store(self):
+        store = CandleStore()
+        apply_kline(decode_kline(sample_frame(open_time=0, closed=False)), store)
+        apply_kline(decode_kline(sample_frame(open_time=60000)), store)
+        self.assertEqual(list(store.view("btcusdt").timestamp), [60000])
+
+
+def random_walk_candles(n, start=0, seed=1):
+    """Chronological 1m candles as a Candles view"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open = np.r_[100, close[:-1]]
+    high = np.maximum(open, close) + rng.random(n)
+    low = np.minimum(open, close) - rng.random(n)
+    buffer = CandleBuffer(capacity=n)
+    buffer.load(start + np.arange(n) * 60000, np.column_stack([open, high, low, close, rng.random(n) * 10]))
+    return buffer.view()
+
+
+class AggregationTest(SimpleTestCase):
+    def test_resample_matches_pandas(self):
+        candles = random_walk_candles(95, start=120000)
+        frame = candles.to_frame().set_index("timestamp")
+        expected = frame.resample("15min").agg(
+            {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+        )
+        result = resample(candles, "15m").to_frame()
+        np.testing.assert_allclose(result[["open", "high", "low", "close", "volume"]], expected)
+
+    def test_incremental_matches_resample(self):
+        candles = random_walk_candles(100)
+        stores = {"5m": CandleStore(), "1h": CandleStore()}
+        aggregator = CandleAggregator(timeframes=["5m", "1h"], stores=stores)
+        for row in zip(*(candles[c] for c in CANDLE_COLUMNS)):
+            aggregator.add("btcusdt", int(row[0]), *row[1:])
+
+        expected = resample(candles, "5m")
+        committed = stores["5m"].view("btcusdt")
+        self.assertEqual(len(committed), 20)
+        np.testing.assert_allclose(committed.high, expected.high)
+        np.testing.assert_allclose(committed.volume, expected.volume)
+        self.assertEqual(len(stores["1h"].view("btcusdt")), 1)
+
+        stores["1h"].set_publish_interval(0)
+        self.assertEqual(stores["1h"].forming("btcusdt")["close"], candles.close[-1])
+
+    def test_repeated_kline_of_a_committed_bucket_is_ignored(self):
+        stores = {"5m": CandleStore()}
+        aggregator = CandleAggregator(timeframes=["5m"], stores=stores)
+        for minute, (open, low) in enumerate([(10, 1), (11, 2), (12, 3), (13, 4), (14, 5)]):
+            aggregator.add("btcusdt", minute * 60000, open, 20, low, open, 1)
+        aggregator.add("btcusdt", 4 * 60000, 14, 20, 5, 14, 1)
+        aggregator.add("btcusdt", 3 * 60000, 13, 30, 4, 13, 1)
+        committed = stores["5m"].view("btcusdt")
+        self.assertEqual(list(committed.timestamp), [0])
+        self.assertEqual((committed.open[0], committed.high[0], committed.low[0], committed.volume[0]), (10, 20, 1, 5))
+        self.assertIsNone(stores["5m"].forming("btcusdt"))
+
+        aggregator.add("btcusdt", 5 * 60000, 15, 20, 5, 15, 1)
+        self.assertEqual(stores["5m"].view("btcusdt").open[-1], 10)
+
+    def test_seed_keeps_open_bucket_provisional(self):
+        stores = {"5m": CandleStore()}
+        aggregator = CandleAggregator(timeframes=["5m"], stores=stores)
+        aggregator.seed("btcusdt", random_walk_candles(12, start=60000))
+        self.assertEqual(list(stores["5m"].view("btcusdt").timestamp), [300000])
+        aggregator.add("btcusdt", 780000, 1, 1, 1, 1, 1)
+        self.assertEqual(len(stores["5m"].view("btcusdt")), 1)
+        aggregator.add("btcusdt", 840000, 1, 1, 1, 1, 1)
+        self.assertEqual(list(stores["5m"].view("btcusdt").timestamp), [300000, 600000])
+
+
+class IndicatorKernelTest(SimpleTestCase):
+    def test_kernels_match_the_pandas_implementations(self):
+        df = random_walk_candles(400).to_frame()
+        df.loc[50, "close"] = np.nan
+        for name, legacy, current in bench_indicators.BENCHMARKS:
+            expected, result = legacy(df), current(df)
+            for e, r in zip(expected if isinstance(expected, tuple) else [expected],
+                            result if isinstance(result, tuple) else [result]):
+                np.testing.assert_allclose(r.to_numpy(), e.to_numpy(), rtol=1e-9, atol=1e-9, err_msg=name)
+
+        pandas_ema = df["close"].ewm(span=14, adjust=False).mean()
+        np.testing.assert_allclose(indicators.compute_ema(df), pandas_ema, rtol=1e-12)
+        pandas_vwap = ((df["high"] + df["low"] + df["close"]) / 3 * df["volume"]).cumsum() / df["volume"].cumsum()
+        np.testing.assert_allclose(indicators.compute_vwap(df), pandas_vwap, rtol=1e-12)
+
+    def test_rolling_sum_matches_pandas_across_blocks(self):
+        x = random_walk_candles(10000).close * 1000
+        x[70], x[6000] = np.nan, np.inf
+        for window in (1, 14, 500, 5000):
+            np.testing.assert_allclose(kernels.rolling_sum(x, window), pd.Series(x).rolling(window).sum(),
+                                       rtol=1e-9, err_msg=window)
+        np.testing.assert_array_equal(kernels.rolling_mean(np.zeros(50), 10)[9:], 0.0)
+
+    def test_two_dimensional_input_is_column_wise(self):
+        panel = np.column_stack([random_walk_candles(300, seed=s).close for s in range(4)])
+        panel[:20, 2] = np.nan
+        for kernel in (kernels.rolling_mean, kernels.rolling_std, kernels.rolling_min,
+                       kernels.rolling_mean_abs_dev, kernels.ewm_mean):
+            columns = np.column_stack([kernel(panel[:, j], 14) for j in range(panel.shape[1])])
+            np.testing.assert_allclose(kernel(panel, 14), columns, rtol=1e-12, err_msg=kernel.__name__)
+
+
+class IndicatorPipelineTest(SimpleTestCase):
+    def test_outputs_match_and_intermediates_are_shared(self):
+        df = random_walk_candles(300).to_frame()
+        pipeline = IndicatorPipeline({
+            "sma": ("sma", {"period": 20}),
+            "bollinger": ("bollinger", {"period": 20}),
+            "ema12": ("ema", {"period": 12}),
+            "macd": ("macd", {}),
+            "atr": ("atr", {}),
+            "adx": ("adx", {}),
+            "vwap": ("vwap", {}),
+            "cci": ("cci", {}),
+            "rsi": ("rsi", {}),
+            "stochastic": ("stochastic", {}),
+        })
+        results = pipeline.run(df)
+        expected = {
+            "sma": indicators.compute_sma(df, 20), "bollinger": indicators.compute_bollinger_bands(df, 20),
+            "ema12": indicators.compute_ema(df, 12), "macd": indicators.compute_macd(df),
+            "atr": indicators.compute_atr(df), "adx": indicators.compute_adx(df), "vwap": indicators.compute_vwap(df),
+            "cci": indicators.compute_cci(df), "rsi": indicators.compute_rsi(df),
+            "stochastic": indicators.compute_stochastic(df),
+        }
+        for label, value in expected.items():
+            for e, r in zip(value if isinstance(value, tuple) else [value],
+                            results[label] if isinstance(results[label], tuple) else [results[label]]):
+                np.testing.assert_allclose(r, e, err_msg=label)
+
+        explanation = pipeline.explain()
+        self.assertIn("rolling_mean(close, window=20) shared by sma, bollinger", explanation)
+        self.assertIn("ewm_mean(close, span=12) shared by ema12, macd", explanation)
+        self.assertIn("rolling_mean(true_range(high, low, close), window=14) shared by atr, adx", explanation)
+        self.assertIn("typical_price(high, low, close) shared by vwap, cci", explanation)
+
+    def test_runs_on_a_panel(self):
+        store = CandleStore(capacity=100)
+        for seed, symbol in enumerate(["btcusdt", "ethusdt"]):
+            candles = random_walk_candles(100, seed=seed)
+            store.load(symbol, candles.timestamp, np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]]))
+        results = IndicatorPipeline(["rsi", "macd"]).run(build_panel(store))
+        self.assertEqual(results["rsi"].shape, (100, 2))
+        self.assertAlmostEqual(results["macd"][0]["ethusdt"].iloc[-1],
+                               indicators.compute_macd(store.get("ethusdt"))[0].iloc[-1])
+
+
+def exact_bollinger_bands(df, period):
+    """Two-pass bands over every window, free of the drift of pandas' online rolling variance"""
+    windows = np.lib.stride_tricks.sliding_window_view(df["close"].to_numpy(), period)
+    mean = np.r_[np.full(period - 1, np.nan), windows.mean(axis=1)]
+    std = np.r_[np.full(period - 1, np.nan), windows.std(axis=1, ddof=1)]
+    return mean + 2 * std, mean - 2 * std
+
+
+class IndicatorSweepTest(SimpleTestCase):
+    def test_sweeps_match_one_call_per_period(self):
+        df = bench_indicators.random_walk_frame(9000)
+        df.loc[50, "close"] = np.nan
+        periods = [2, 5, 14, 20, 60]
+        for name, single, sweep in bench_indicators.SWEEPS:
+            if name == "bollinger":
+                single = exact_bollinger_bands
+            result = sweep(df, periods)
+            self.assertEqual(list((result[0] if isinstance(result, tuple) else result).columns), periods)
+            for period in periods:
+                expected = single(df, period)
+                for e, r in zip(expected if isinstance(expected, tuple) else [expected],
+                                result if isinstance(result, tuple) else [result]):
+                    np.testing.assert_allclose(r[period], e, rtol=1e-8, err_msg=f"{name} {period}")
+
+    def test_process_pool_gives_the_same_matrix(self):
+        df = bench_indicators.random_walk_frame(500)
+        upper, lower = indicators.sweep_bollinger_bands(df, [5, 10, 20], workers=2)
+        expected_upper, expected_lower = indicators.sweep_bollinger_bands(df, [5, 10, 20])
+        pd.testing.assert_frame_equal(upper, expected_upper)
+        pd.testing.assert_frame_equal(lower, expected_lower)
+
+    def test_rejects_panels_and_bad_periods(self):
+        with self.assertRaises(ValueError):
+            indicators.sweep_ema(bench_indicators.random_walk_frame(50), [0, 5])
+        store = CandleStore(capacity=50)
+        candles = random_walk_candles(50)
+        store.load("btcusdt", candles.timestamp, np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]]))
+        with self.assertRaises(ValueError):
+            indicators.sweep_rsi(build_panel(store), [14])
+
+
+class PanelTest(SimpleTestCase):
+    def test_panel_indicators_match_per_symbol(self):
+        store = CandleStore(capacity=200)
+        for seed, (symbol, start, n) in enumerate([("btcusdt", 0, 200), ("ethusdt", 40 * 60000, 160), ("solusdt", 0, 120)]):
+            candles = random_walk_candles(n, start=start, seed=seed)
+            store.load(symbol, candles.timestamp, np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]]))
+
+        panel = build_panel(store, ["btcusdt", "ethusdt", "solusdt", "xrpusdt"])
+        self.assertEqual(panel.shape, (200, 4))
+        self.assertTrue(np.isnan(panel["close"][:40, 1]).all())
+        self.assertTrue(np.isnan(panel["close"][:, 3]).all())
+
+        rsi = indicators.compute_rsi(panel)
+        upper, lower = indicators.compute_bollinger_bands(panel)
+        self.assertEqual(list(rsi.columns), panel.symbols)
+        for symbol in ("btcusdt", "ethusdt"):
+            df = store.get(symbol)
+            self.assertAlmostEqual(rsi[symbol].iloc[-1], indicators.compute_rsi(df).iloc[-1])
+            self.assertAlmostEqual(upper[symbol].iloc[-1], indicators.compute_bollinger_bands(df)[0].iloc[-1])
+        """solusdt stopped 80 candles ago, so its last row is empty"""
+        self.assertTrue(np.isnan(rsi["solusdt"].iloc[-1]))
+        self.assertEqual(len(build_panel(store, limit=50)), 50)
+
+
+class IndicatorCacheTest(SimpleTestCase):
+    def test_recomputes_only_when_a_candle_is_committed(self):
+        store = CandleStore(capacity=100, publish_interval=0)
+        candles = random_walk_candles(60)
+        store.load("btcusdt", candles.timestamp, np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]]))
+        cache = IndicatorCache()
+        calls = []
+
+        def rsi(df, period=14):
+            calls.append(period)
+            return indicators.compute_rsi(df, period)
+
+        first = cache.indicator(store, "btcusdt", "1m", rsi)
+        self.assertIs(cache.indicator(store, "btcusdt", "1m", rsi), first)
+        store.update_forming("btcusdt", 60 * 60000, 1, 1, 1, 1, 1)
+        self.assertIs(cache.indicator(store, "btcusdt", "1m", rsi), first)
+        cache.indicator(store, "btcusdt", "1m", rsi, period=7)
+        self.assertEqual(calls, [14, 7])
+
+        store.append("btcusdt", 60 * 60000, 1, 1, 1, 1, 1)
+        self.assertEqual(len(cache.indicator(store, "btcusdt", "1m", rsi)), 61)
+        self.assertEqual(calls, [14, 7, 14])
+        self.assertIsNone(cache.indicator(store, "ethusdt", "1m", rsi))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 7))
+
+    def test_stores_are_keyed_by_name(self):
+        candles = random_walk_candles(30)
+        first, second = CandleStore(), CandleStore()
+        for store, scale in ((first, 1), (second, 2)):
+            store.load("btcusdt", candles.timestamp,
+                       scale * np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]]))
+        self.assertNotEqual(first.name, second.name)
+        cache = IndicatorCache()
+        self.assertEqual(cache.frame(second, "btcusdt")["close"].iloc[-1],
+                         2 * cache.frame(first, "btcusdt")["close"].iloc[-1])
+        self.assertEqual({key[0] for key in cache._entries}, {first.name, second.name})
+
+    def test_evicts_least_recently_used(self):
+        store = CandleStore()
+        cache = IndicatorCache(max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            cache.cached(key, store.version(key), lambda: key)
+        self.assertEqual(list(cache._entries), ["a", "c"])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_stats_endpoint(self):
+        response = self.client.get("/crypto/api/indicator-cache/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["max_entries"], indicator_cache.max_entries)
+
+
+class SignalEngineTest(SimpleTestCase):
+    def trending_store(self, n=60):
+        store = CandleStore(capacity=200)
+        for i in range(n):
+            store.append("btcusdt", i * 60000, 100 + i, 101 + i, 99 + i, 100 + i, 1)
+        return store
+
+    def test_rsi_ema_rule_keeps_the_dashboard_recommendations(self):
+        cases = [(20, 110, 100, "STRONG BUY"), (20, 90, 100, "BUY"), (80, 90, 100, "STRONG SELL"),
+                 (80, 110, 100, "SELL"), (50, 100, 100, "HOLD")]
+        for rsi, close, ema, expected in cases:
+            self.assertEqual(rsi_ema_rule({"rsi": rsi, "close": close, "ema": ema})["action"], expected)
+        self.assertIsNone(rsi_ema_rule({"rsi": float("nan"), "close": 1, "ema": 1}))
+
+    def test_sync_evaluates_once_per_closed_candle_and_emits_changes(self):
+        store = self.trending_store()
+        engine = SignalEngine()
+        calls, events = [], []
+        engine.add_rule("count", lambda values: calls.append(values["close"]))
+        engine.subscribe(events.append)
+
+        engine.sync(store)
+        engine.sync(store)
+        store.update_forming("btcusdt", 60 * 60000, 159, 160, 150, 151, 1)
+        engine.sync(store)
+        self.assertEqual(calls, [159.0])
+        self.assertEqual(engine.latest("btcusdt")["signals"]["rsi_ema"]["action"], "SELL")
+        self.assertEqual(events, [])
+
+        for i in range(60, 80):
+            store.append("btcusdt", i * 60000, 219 - 3 * i, 220 - 3 * i, 218 - 3 * i, 219 - 3 * i, 1)
+        engine.sync(store)
+        self.assertEqual(len(calls), 2)
+        rsi_events = [e for e in events if e["rule"] == "rsi_ema"]
+        self.assertEqual([(e["previous"], e["action"]) for e in rsi_events], [("SELL", "BUY")])
+        self.assertEqual(rsi_events[0]["timestamp"], 79 * 60000)
+        self.assertEqual(list(engine.events), events)
+
+    def test_streaming_values_give_the_same_signals(self):
+        store = self.trending_store()
+        synced, streamed = SignalEngine(), SignalEngine()
+        synced.sync(store)
+        view = store.view("btcusdt")
+        values = IndicatorEngine().rebuild("btcusdt", view)
+        streamed.evaluate("btcusdt", view.timestamp[-1], dict(values, close=float(view.close[-1])))
+        self.assertEqual(synced.latest("btcusdt"), streamed.latest("btcusdt"))
+
+    @override_settings(CANDLE_SHARED_MEMORY_PREFIX="")
+    def test_dashboard_only_evaluates_the_displayed_symbol(self):
+        from .dash_apps.main_indicators import update_main_dashboard
+        shown, hidden = "dashshownusdt", "dashhiddenusdt"
+        try:
+            for i in range(60):
+                live_candles.append(shown, i * 60000, 100 + i, 101 + i, 99 + i, 100 + i, 1)
+                live_candles.append(hidden, i * 60000, 100 + i, 101 + i, 99 + i, 100 + i, 1)
+            update_main_dashboard(0, None, shown, "1m")
+            self.assertIsNotNone(signal_engine.latest(shown))
+            self.assertIsNone(signal_engine.latest(hidden))
+        finally:
+            del live_candles[shown]
+            del live_candles[hidden]
+
+    def test_signals_endpoint(self):
+        signal_engine.evaluate("testusdt", 60000, {"close": 110.0, "ema": 100.0, "rsi": 20.0})
+        response = self.client.get("/crypto/api/signals/testusdt/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["signals"]["rsi_ema"]["action"], "STRONG BUY")
+        self.assertIn("testusdt", [state["symbol"] for state in self.client.get("/crypto/api/signals/").json()])
+        self.assertEqual(self.client.get("/crypto/api/signals/nousdt/").status_code, 404)
+        self.assertEqual(self.client.get("/crypto/api/signals/events/").status_code, 200)
+        for limit in ["-1", "0", "x"]:
+            self.assertEqual(self.client.get(f"/crypto/api/signals/events/?limit={limit}").status_code, 400)
+
+
+class MarketWatcherTest(SimpleTestCase):
+    def test_one_event_per_close_or_forming_change(self):
+        store = CandleStore(capacity=10, publish_interval=0)
+        store.append("btcusdt", 0, 1, 2, 0, 1.5, 10)
+        watcher = MarketWatcher()
+        self.assertEqual(watcher.poll(store, ["btcusdt", "ethusdt"]), [])
+        self.assertEqual(watcher.poll(store, ["btcusdt"]), [])
+
+        store.update_forming("btcusdt", 60000, 1.5, 2, 1, 1.8, 3)
+        store.update_forming("btcusdt", 60000, 1.5, 2, 1, 1.9, 4)
+        events = watcher.poll(store, ["btcusdt"])
+        self.assertEqual([(e["closed"], e["close"], e["timestamp"]) for e in events], [(False, 1.9, 60000)])
+        self.assertEqual(watcher.poll(store, ["btcusdt"]), [])
+
+        store.append("btcusdt", 60000, 1.5, 2, 1, 1.7, 5)
+        events = watcher.poll(store, ["btcusdt"])
+        self.assertEqual([(e["closed"], e["close"], e["forming"]) for e in events], [(True, 1.7, None)])
+
+
+
+@override_settings(CANDLE_SHARED_MEMORY_PREFIX="", CANDLE_PUSH_INTERVAL=0.01)
+class MarketConsumerTest(SimpleTestCase):
+    SYMBOL = "xtzusdt"
+
+    def tearDown(self):
+        if self.SYMBOL in live_candles:
+            del live_candles[self.SYMBOL]
+
+    def test_subscribed_socket_receives_closed_candles(self):
+        from channels.testing import WebsocketCommunicator
+        from crypto_main.asgi import application
+        from . import consumers
+
+        async def run():
+            socket = WebsocketCommunicator(application, "/ws/market/", headers=[(b"origin", b"http://testserver")])
+            connected, _ = await socket.connect()
+            self.assertTrue(connected)
+
+            await socket.send_json_to({"action": "subscribe", "symbol": "nosuchcoin"})
+            self.assertEqual((await socket.receive_json_from())["type"], "error")
+            await socket.send_json_to({"action": "subscribe", "symbol": self.SYMBOL.upper()})
+            self.assertEqual(await socket.receive_json_from(), {"type": "subscriptions", "symbols": [self.SYMBOL]})
+
+            """Let the first poll set the baseline, then close a candle"""
+            await asyncio.sleep(0.1)
+            live_candles.append(self.SYMBOL, 60000, 1, 2, 0.5, 1.5, 10)
+            event = await socket.receive_json_from(timeout=2)
+            self.assertEqual((event["type"], event["symbol"], event["closed"]), ("candle", self.SYMBOL, True))
+            self.assertEqual((event["timestamp"], event["close"]), (60000, 1.5))
+
+            await socket.disconnect()
+            self.assertFalse(consumers.subscribers.get(self.SYMBOL))
+
+        asyncio.run(run())
+
+class ScreenerTest(SimpleTestCase):
+    def store(self, rows=300):
+        store = CandleStore(capacity=200)
+        for seed, symbol in enumerate(["btcusdt", "ethusdt", "solusdt"]):
+            frame = bench_indicators.random_walk_frame(rows, seed=seed)
+            store.load_frame(symbol, frame)
+        return store
+
+    def test_rows_match_the_indicator_functions_after_incremental_closes(self):
+        store = self.store()
+        screener = Screener()
+        screener.sync(store)
+        for i in range(3):
+            store.append("ethusdt", store.view("ethusdt").timestamp[-1] + 60000, 100, 101, 99, 100.5 + i, 3)
+        screener.sync(store)
+
+        frame = store["ethusdt"]
+        row = {r["symbol"]: r for r in screener.query()}["ethusdt"]
+        self.assertAlmostEqual(row["rsi"], indicators.compute_rsi(frame).iloc[-1])
+        self.assertAlmostEqual(row["ema"], indicators.compute_ema(frame).iloc[-1])
+        self.assertAlmostEqual(row["atr"], indicators.compute_atr(frame).iloc[-1])
+        self.assertAlmostEqual(row["change"], (102.5 / frame["close"].iloc[-61] - 1) * 100)
+        self.assertAlmostEqual(row["volume"], frame["volume"].iloc[-60:].sum())
+        self.assertAlmostEqual(row["ema_distance"], (102.5 / row["ema"] - 1) * 100)
+
+    def test_query_filters_and_sorts(self):
+        screener = Screener()
+        screener.sync(self.store())
+        rows = screener.query()
+        by_change = sorted(rows, key=lambda r: r["change"], reverse=True)
+        self.assertEqual(screener.query(order_by="-change"), by_change)
+        self.assertEqual(screener.query(order_by="-change", limit=1), by_change[:1])
+
+        expected = [r["symbol"] for r in rows if r["rsi"] < 50 and r["price"] > r["ema"] or r["change"] > 1]
+        self.assertEqual([r["symbol"] for r in screener.query("RSI < 50 and price > ema or change > 1")], expected)
+        self.assertEqual(screener.query("volume < -1"), [])
+
+    ENDPOINT_SYMBOLS = ["scrnausdt", "scrnbusdt", "scrncusdt"]
+
+    def tearDown(self):
+        for symbol in self.ENDPOINT_SYMBOLS:
+            if symbol in live_candles:
+                del live_candles[symbol]
+            screener.forget(symbol)
+
+    @override_settings(CANDLE_SHARED_MEMORY_PREFIX="")
+    def test_screener_endpoint(self):
+        for seed, symbol in enumerate(self.ENDPOINT_SYMBOLS):
+            live_candles.load_frame(symbol, bench_indicators.random_walk_frame(300, seed=seed))
+        response = self.client.get("/crypto/api/screener/", {"order": "-change", "limit": "2"})
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual(len(rows), 2)
+        self.assertGreaterEqual(rows[0]["change"], rows[1]["change"])
+
+        symbols = [r["symbol"] for r in self.client.get("/crypto/api/screener/", {"where": "price > 0"}).json()]
+        self.assertTrue(set(self.ENDPOINT_SYMBOLS) <= set(symbols))
+        for params in [{"where": "rsi <"}, {"order": "name"}, {"limit": "-1"}, {"limit": "0"}, {"limit": "two"}]:
+            self.assertEqual(self.client.get("/crypto/api/screener/", params).status_code, 400, params)
+
+    def test_query_errors(self):
+        self.assertEqual(parse_query("rsi <= 30.5"), ((("rsi", "<=", 30.5),),))
+        for text in ["rsi", "rsi < 30 and", "foo > 1", "rsi < 30 xor price > 1", "rsi < 30; drop"]:
+            with self.assertRaises(ValueError, msg=text):
+                parse_query(text)
+        with self.assertRaises(ValueError):
+            Screener().query(order_by="name")
+
+    def test_forget_drops_the_row(self):
+        store, screener, fresh = self.store(), Screener(), Screener()
+        screener.sync(store)
+        screener.forget("btcusdt")
+        fresh.sync(store, ["ethusdt", "solusdt"])
+        self.assertEqual(screener.query(order_by="price"), fresh.query(order_by="price"))
+
+
+class BacktestTest(SimpleTestCase):
+    def test_replay_charges_costs_on_every_trade(self):
+        result = backtest([100, 110, 121, 110], np.array([1.0, 1.0, 0.0, 0.0]), fee=0.001, slippage=0.0005)
+        self.assertAlmostEqual(result["pnl"], 0.9985 * 1.1 * 1.1 * 0.9985 - 1)
+        self.assertEqual((result["trades"], result["hit_rate"], result["max_drawdown"]), (1, 1.0, 0.0))
+
+        result = backtest([100, 90, 99, 80], np.array([0.0, 1.0, 1.0, 1.0]), fee=0, slippage=0)
+        self.assertAlmostEqual(result["pnl"], 80 / 90 - 1)
+        self.assertAlmostEqual(result["max_drawdown"], 80 / 99 - 1)
+        self.assertEqual((result["trades"], result["hit_rate"]), (1, 0.0))
+
+    def test_positions_follow_the_recommendation_rule(self):
+        actions = np.array([0, 2, 0, 1, -1, 0, 1, 2, -2])
+        np.testing.assert_array_equal(rule_positions(actions), [0, 1, 1, 1, 0, 0, 0, 1, 0])
+        np.testing.assert_array_equal(rule_positions(actions, ENTRIES["BUY"]), [0, 1, 1, 1, 0, 0, 1, 1, 0])
+
+    def test_grid_matches_the_indicator_functions(self):
+        df = bench_indicators.random_walk_frame(3000)
+        grid = parameter_grid((7, 14), (9, 21), (30,), (70,), ("STRONG BUY", "BUY"))
+        for params, result in zip(grid, backtest_grid(df["close"], grid)):
+            actions = rsi_ema_actions(df["close"], indicators.compute_ema(df, params["ema_period"]),
+                                      indicators.compute_rsi(df, params["rsi_period"]))
+            expected = backtest(df["close"], rule_positions(actions, ENTRIES[params["entry"]]))
+            for key, value in expected.items():
+                np.testing.assert_allclose(result[key], value, err_msg=f"{params} {key}")
+
+    def test_history_grid_over_processes_and_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = HistoryStore(directory)
+            for seed, symbol in enumerate(["btcusdt", "ethusdt"]):
+                frame = bench_indicators.random_walk_frame(2000, seed=seed)
+                history.append(symbol, "1m", frame["timestamp"], frame[CANDLE_COLUMNS[1:]].to_numpy())
+            grid = parameter_grid((7, 14), (9,), (30,), (70,))
+            report = run_backtests(directory, ["btcusdt", "ethusdt", "xrpusdt"], "1m", grid, workers=2)
+            self.assertEqual(len(report["results"]), 4)
+            self.assertEqual({r["symbol"] for r in report["results"]}, {"btcusdt", "ethusdt"})
+
+            out = StringIO()
+            with override_settings(CANDLE_HISTORY_DIR=directory):
+                call_command("backtest_signals", "--rsi-periods", "7,14", "--ema-periods", "9",
+                             "--oversold", "30", "--overbought", "70", "--workers", "1", stdout=out)
+            self.assertIn("2 parameter sets on 2 symbols", out.getvalue())
+
+
+class AlertEngineTest(SimpleTestCase):
+    def test_price_rules_fire_once_when_crossed(self):
+        engine = AlertEngine(store=None)
+        engine.load([(1, 7, "BTCUSDT", "price_above", 100.0, None, 60),
+                     (2, 7, "btcusdt", "price_above", 105.0, None, 60),
+                     (3, 8, "btcusdt", "price_below", 95.0, None, 60)])
+        engine.on_price("btcusdt", 101.0, 0)
+        self.assertEqual(engine.drain(), [])
+
+        engine.on_price("btcusdt", 105.0, 1)
+        engine.on_price("btcusdt", 104.0, 2)
+        engine.on_price("btcusdt", 90.0, 3)
+        alerts = engine.drain()
+        self.assertEqual([(a["rule"], a["user"], a["value"]) for a in alerts], [(2, 7, 105.0), (3, 8, 90.0)])
+        self.assertEqual(alerts[0]["kind"], "price_above")
+
+        engine.on_price("btcusdt", 100.0, 4)
+        self.assertEqual([a["rule"] for a in engine.drain()], [1])
+
+    def test_rules_rearm_only_after_moving_back_past_the_margin(self):
+        engine = AlertEngine(store=None)
+        engine.load([(1, 1, "btcusdt", "price_above", 100.0, None, 60),
+                     (2, 1, "btcusdt", "rsi_below", 30.0, None, 60)])
+        for price in [99.0, 100.1, 99.9, 100.2, 99.6, 100.3]:
+            engine.on_price("btcusdt", price, 0)
+        self.assertEqual([a["value"] for a in engine.drain()], [100.1])
+
+        engine.on_price("btcusdt", 99.4, 1)
+        engine.on_price("btcusdt", 100.0, 2)
+        self.assertEqual([a["value"] for a in engine.drain()], [100.0])
+
+        for rsi in [35.0, 29.0, 31.0, 29.5, 32.5, 28.0]:
+            engine.on_close("btcusdt", rsi, 0)
+        self.assertEqual([a["value"] for a in engine.drain()], [29.0, 28.0])
+
+    def test_rsi_band_and_percent_change(self):
+        store = CandleStore(capacity=10)
+        for i, close in enumerate([100, 100, 100, 100, 100]):
+            store.append("ethusdt", i * 60000, close, close, close, close, 1)
+        engine = AlertEngine(store)
+        engine.load([(1, 1, "ethusdt", "rsi_outside", 30.0, 70.0, 60),
+                     (2, 1, "ethusdt", "change_above", 2.0, None, 5),
+                     (3, 1, "ethusdt", "change_below", -1.0, None, 3)])
+        engine.on_close("ethusdt", 50.0, 0)
+        engine.on_close("ethusdt", 75.0, 1)
+        engine.on_close("ethusdt", 25.0, 2)
+        self.assertEqual([(a["rule"], a["level"]) for a in engine.drain()], [(1, 70.0), (1, 30.0)])
+
+        engine.on_price("ethusdt", 100.5, 3)
+        engine.on_price("ethusdt", 103.0, 4)
+        engine.on_price("ethusdt", 98.0, 5)
+        alerts = engine.drain()
+        self.assertEqual([a["rule"] for a in alerts], [2, 3])
+        self.assertAlmostEqual(alerts[0]["value"], 3.0)
+
+    def test_upsert_and_remove(self):
+        engine = AlertEngine(store=None)
+        engine.load([(1, 1, "btcusdt", "price_above", 100.0, None, 60),
+                     (2, 1, "btcusdt", "rsi_outside", 30.0, 70.0, 60)])
+        engine.upsert([(1, 1, "btcusdt", "price_above", 200.0, None, 60)])
+        engine.remove([2])
+        self.assertEqual(engine.stats()["rules"], 1)
+        self.assertEqual(engine.stats()["levels"], 1)
+        engine.on_price("btcusdt", 90.0, 0)
+        engine.on_price("btcusdt", 150.0, 1)
+        engine.on_close("btcusdt", 50.0, 0)
+        engine.on_close("btcusdt", 80.0, 1)
+        self.assertEqual(engine.drain(), [])
+        engine.on_price("btcusdt", 250.0, 2)
+        self.assertEqual([a["rule"] for a in engine.drain()], [1])
+
+
+class AlertRuleLoadTest(TestCase):
+    def test_endpoint_only_exposes_the_users_own_rules(self):
+        owner = User.objects.create_user(username="owner", email="owner@example.com", password="testpass")
+        other = User.objects.create_user(username="other", email="other@example.com", password="testpass")
+        watch = Watchlist.objects.create(user=owner, symbol="BTCUSDT")
+        rule = AlertRule.objects.create(watchlist=watch, kind="price_above", threshold=100)
+        self.assertEqual(self.client.get("/crypto/api/alerts/").status_code, 403)
+
+        self.client.force_login(other)
+        self.assertEqual(self.client.get("/crypto/api/alerts/").json(), [])
+        self.assertEqual(self.client.get(f"/crypto/api/alerts/{rule.id}/").status_code, 404)
+        self.assertEqual(self.client.patch(f"/crypto/api/alerts/{rule.id}/", {"threshold": 1},
+                                           content_type="application/json").status_code, 404)
+        response = self.client.post("/crypto/api/alerts/", {"watchlist": watch.id, "kind": "price_below",
+                                                            "threshold": 50})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_login(owner)
+        self.assertEqual([r["id"] for r in self.client.get("/crypto/api/alerts/").json()], [rule.id])
+        response = self.client.post("/crypto/api/alerts/", {"watchlist": watch.id, "kind": "price_below",
+                                                            "threshold": 50})
+        self.assertEqual(response.status_code, 201)
+
+    def test_window_must_cover_a_candle(self):
+        user = User.objects.create_user(username="winuser", email="win@example.com", password="testpass")
+        watch = Watchlist.objects.create(user=user, symbol="BTCUSDT")
+        data = {"watchlist": watch.id, "kind": "change_above", "threshold": 2}
+        self.assertFalse(AlertRuleSerializer(data=dict(data, window=0)).is_valid())
+        self.assertTrue(AlertRuleSerializer(data=dict(data, window=1)).is_valid())
+
+    def test_rules_load_and_refresh_from_watchlists(self):
+        user = User.objects.create_user(username="alertuser", email="alert@example.com", password="testpass")
+        watch = Watchlist.objects.create(user=user, symbol="BTCUSDT")
+        rule = AlertRule.objects.create(watchlist=watch, kind="price_above", threshold=100)
+        AlertRule.objects.create(watchlist=watch, kind="price_below", threshold=50, is_active=False)
+
+        engine = AlertEngine(store=None)
+        since = load_rules(engine)
+        self.assertEqual(engine.rule_count, 1)
+
+        rule.threshold = 200
+        rule.save()
+        AlertRule.objects.create(watchlist=watch, kind="rsi_outside", threshold=30, upper=70)
+        since = refresh_rules(engine, since)
+        self.assertEqual(engine.stats()["levels"], 3)
+
+        AlertRule.objects.filter(kind="rsi_outside").delete()
+        refresh_rules(engine, since)
+        self.assertEqual(engine.rule_count, 1)
+        engine.on_price("btcusdt", 150.0, 0)
+        engine.on_price("btcusdt", 210.0, 1)
+        self.assertEqual([(a["rule"], a["user"]) for a in engine.drain()], [(rule.id, user.id)])
+
+
+
+class FlakyAlertEngine(AlertEngine):
+    """Fails its first load like a database that is not up yet"""
+
+    def __init__(self):
+        super().__init__(store=None)
+        self.failed = False
+
+    def load(self, rows):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("database is starting up")
+        super().load(rows)
+
+
+class AlertRuleRefreshTest(TransactionTestCase):
+    def test_first_load_failure_is_retried(self):
+        user = User.objects.create_user(username="retryuser", email="retry@example.com", password="testpass")
+        watch = Watchlist.objects.create(user=user, symbol="BTCUSDT")
+        AlertRule.objects.create(watchlist=watch, kind="price_above", threshold=100)
+        engine = FlakyAlertEngine()
+
+        async def run():
+            task = asyncio.create_task(refresh_alert_rules(engine, period=0.01))
+            for _ in range(500):
+                await asyncio.sleep(0.01)
+                if engine.rule_count:
+                    break
+            self.assertFalse(task.done())
+            task.cancel()
+
+        output = StringIO()
+        with contextlib.redirect_stdout(output):
+            asyncio.run(run())
+        self.assertTrue(engine.failed)
+        self.assertEqual(engine.rule_count, 1)
+        self.assertIn("Failed to refresh alert rules", output.getvalue())
+
+class StreamingIndicatorTest(SimpleTestCase):
+    def test_streaming_matches_batch(self):
+        candles = random_walk_candles(600)
+        df = candles.to_frame()
+        batch = {
+            "ema": [indicators.compute_ema(df)], "sma": [indicators.compute_sma(df)],
+            "rsi": [indicators.compute_rsi(df)], "macd": indicators.compute_macd(df),
+            "bollinger": indicators.compute_bollinger_bands(df), "atr": [indicators.compute_atr(df)],
+            "vwap": [indicators.compute_vwap(df)], "stochastic": indicators.compute_stochastic(df),
+            "cci": [indicators.compute_cci(df)], "adx": [indicators.compute_adx(df)],
+        }
+        for name, factory in DEFAULT_INDICATORS.items():
+            indicator = factory()
+            rows = [indicator.update(*row) for row in zip(*(df[c] for c in ("open", "high", "low", "close", "volume")))]
+            streamed = np.array([row if isinstance(row, tuple) else (row,) for row in rows])
+            for i, expected in enumerate(batch[name]):
+                np.testing.assert_allclose(streamed[:, i], np.asarray(expected, dtype=float), rtol=1e-9, atol=1e-9,
+                                           err_msg=name)
+
+    def test_rolling_windows_recover_after_nan_and_inf(self):
+        values = pd.Series([1.0, 2.0, np.nan, 4.0, 5.0, 6.0, np.inf, 8.0, 9.0, 10.0, 12.0, 11.0])
+        mean, std = RollingMean(3), RollingStd(3)
+        streamed = np.array([(mean.update(x), std.update(x)) for x in values])
+        np.testing.assert_allclose(streamed[:, 0], values.rolling(3).mean(), rtol=1e-12)
+        np.testing.assert_allclose(streamed[:, 1], values.rolling(3).std(), rtol=1e-12)
+
+    def test_engine_rebuilds_then_updates(self):
+        candles = random_walk_candles(300)
+        engine = IndicatorEngine()
+        engine.rebuild("btcusdt", Candles(*(candles[c][:299] for c in CANDLE_COLUMNS)))
+        last = [candles[c][299] for c in CANDLE_COLUMNS]
+        values = engine.update("btcusdt", *last)
+        self.assertIs(engine.update("btcusdt", *last), values)
+
+        expected = indicators.compute_rsi(candles.to_frame()).iloc[-1]
+        self.assertAlmostEqual(engine.latest("btcusdt")["rsi"], expected)
+        self.assertEqual(engine.latest("ethusdt"), {})
+
+
+class HistoryStoreTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = HistoryStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_only_and_time_range_reads(self):
+        candles = random_walk_candles(100)
+        values = np.column_stack([candles[c] for c in CANDLE_COLUMNS[1:]])
+        self.assertEqual(self.history.append("btcusdt", "1m", candles.timestamp[:60], values[:60]), 60)
+        self.assertEqual(self.history.append("btcusdt", "1m", candles.timestamp, values), 40)
+
+        sliced = self.history.read("btcusdt", "1m", start=10 * 60000, end=20 * 60000)
+        self.assertIsInstance(sliced.close, np.memmap)
+        self.assertEqual(list(sliced.timestamp), list(candles.timestamp[10:20]))
+        np.testing.assert_array_equal(sliced.close, candles.close[10:20])
+        self.assertEqual(self.history.last_timestamp("btcusdt", "1m"), 99 * 60000)
+
+    def test_torn_append_is_ignored(self):
+        self.history.append("btcusdt", "1m", [0, 60000], np.ones((2, 5)))
+        with open(os.path.join(self.directory.name, "1m", "btcusdt", "close.bin"), "ab") as f:
+            f.write(b"\x00" * 12)
+        self.assertEqual(self.history.count("btcusdt", "1m"), 2)
+        self.history.append("btcusdt", "1m", [120000], np.full((1, 5), 2.0))
+        self.assertEqual(list(self.history.read("btcusdt", "1m").close), [1.0, 1.0, 2.0])
+
+    def test_merge_inserts_older_candles_and_keeps_stored_ones(self):
+        self.history.append("btcusdt", "1m", [120000, 240000], np.ones((2, 5)))
+        mapped = self.history.read("btcusdt", "1m")
+        self.assertEqual(self.history.merge("btcusdt", "1m", [0, 120000, 180000, 60000, 0],
+                                            np.full((5, 5), 2.0)), 3)
+        candles = self.history.read("btcusdt", "1m")
+        self.assertEqual(list(candles.timestamp), [0, 60000, 120000, 180000, 240000])
+        self.assertEqual(list(candles.close), [2.0, 2.0, 1.0, 2.0, 1.0])
+        self.assertEqual(list(mapped.timestamp), [120000, 240000])
+        self.assertEqual(self.history.merge("btcusdt", "1m", [300000], np.ones((1, 5))), 1)
+        self.assertEqual(self.history.first_timestamp("btcusdt", "1m"), 0)
+
+    def test_flush_and_warm_start(self):
+        live = CandleStore(capacity=50)
+        live.load("btcusdt", np.arange(80) * 60000, np.ones((80, 5)))
+        self.assertEqual(flush_stores(self.history, {"1m": live}), 50)
+        live.append("btcusdt", 80 * 60000, 2, 2, 2, 2, 2)
+        self.assertEqual(flush_stores(self.history, {"1m": live}), 1)
+
+        restarted = CandleStore(capacity=10)
+        self.assertEqual(load_from_history(["btcusdt", "ethusdt"], self.history, {"1m": restarted}), ["btcusdt"])
+        self.assertEqual(restarted.buffer("btcusdt").last_timestamp, 80 * 60000)
+        self.assertEqual(len(restarted.view("btcusdt")), 10)
+
+
+class SharedStoreTest(SimpleTestCase):
+    def test_readers_see_published_candles_without_copying(self):
+        store = CandleStore(capacity=8, publish_interval=0)
+        prefix = f"groot_test_{os.getpid()}"
+        publisher = SharedStorePublisher(prefix, {"1m": store}, ["btcusdt", "ethusdt"])
+        try:
+            for i in range(12):
+                store.append("btcusdt", i * 60000, i, i, i, i, i)
+            store.update_forming("btcusdt", 12 * 60000, 1, 2, 0, 1.5, 3)
+            publisher.publish_all()
+
+            reader = attach_readers(prefix, ["1m"])["1m"]
+            candles, seq = reader.segment.view("btcusdt")
+            self.assertEqual(list(candles.close), list(range(4, 12)))
+            self.assertTrue(np.shares_memory(candles.close, np.ndarray(
+                reader.segment.shm.size, dtype=np.uint8, buffer=reader.segment.shm.buf)))
+            self.assertEqual(reader.forming("btcusdt")["close"], 1.5)
+            self.assertEqual(reader.version("btcusdt"), store.version("btcusdt"))
+            self.assertNotIn("ethusdt", reader)
+            self.assertTrue(reader["ethusdt"].empty)
+
+            self.assertEqual(seq % 2, 0)
+            self.assertTrue(reader.segment.is_current("btcusdt", seq))
+            copy = reader.view("btcusdt")
+            self.assertFalse(np.shares_memory(copy.close, candles.close))
+
+            store.append("btcusdt", 12 * 60000, 1, 1, 1, 1, 1)
+            publisher.publish("btcusdt")
+            self.assertFalse(reader.segment.is_current("btcusdt", seq))
+            self.assertEqual(reader.get("btcusdt")["close"].iloc[-1], 1)
+            self.assertEqual(list(copy.close), list(range(4, 12)))
+
+            """A reader that starts while a publish is under way must retry"""
+            reader.segment._control[0, 0] += 1
+            _, seq = reader.segment.view("btcusdt")
+            self.assertFalse(reader.segment.is_current("btcusdt", seq))
+            reader.segment._control[0, 0] += 1
+            reader.segment.close()
+        finally:
+            publisher.close()
+
+    def test_readers_follow_a_restarted_ingester(self):
+        prefix = f"groot_restart_{os.getpid()}"
+        self.assertEqual(shared_readers(prefix, ["1m"]), {})
+
+        store = CandleStore(capacity=4, publish_interval=0)
+        store.append("btcusdt", 0, 1, 1, 1, 1, 1)
+        first = SharedStorePublisher(prefix, {"1m": store}, ["btcusdt"])
+        first.publish_all()
+        reader = shared_readers(prefix, ["1m"])["1m"]
+        self.assertEqual(len(reader["btcusdt"]), 1)
+
+        first.close()
+        store.append("btcusdt", 60000, 2, 2, 2, 2, 2)
+        second = SharedStorePublisher(prefix, {"1m": store}, ["btcusdt"])
+        try:
+            second.publish_all()
+            self.assertTrue(reader.segment.retired)
+            self.assertEqual(len(shared_readers(prefix, ["1m"])["1m"]["btcusdt"]), 2)
+        finally:
+            second.close()
+
+    def test_restarted_ingester_versions_do_not_hit_stale_state(self):
+        prefix = f"groot_generation_{os.getpid()}"
+        cache = IndicatorCache()
+        screen = Screener()
+        old = CandleStore(capacity=4, publish_interval=0)
+        old.append("btcusdt", 0, 1, 1, 1, 1, 1)
+        first = SharedStorePublisher(prefix, {"1m": old}, ["btcusdt"])
+        first.publish_all()
+        reader = shared_readers(prefix, ["1m"])["1m"]
+        self.assertEqual(cache.frame(reader, "btcusdt")["close"].tolist(), [1])
+        screen.sync(reader)
+        first.close()
+
+        """A new ingester whose candles differ but whose version restarted at the same number"""
+        new = CandleStore(capacity=4, publish_interval=0)
+        new.append("btcusdt", 0, 5, 5, 5, 5, 5)
+        second = SharedStorePublisher(prefix, {"1m": new}, ["btcusdt"])
+        try:
+            second.publish_all()
+            restarted = shared_readers(prefix, ["1m"])["1m"]
+            self.assertEqual(restarted.name, reader.name)
+            self.assertEqual(restarted.version("btcusdt"), 1)
+            self.assertNotEqual(restarted.generation, reader.generation)
+            self.assertEqual(cache.frame(restarted, "btcusdt")["close"].tolist(), [5])
+            screen.sync(restarted)
+            self.assertEqual([row["price"] for row in screen.query()], [5])
+        finally:
+            second.close()
+
+
+class IngesterLockTest(SimpleTestCase):
+    def test_only_one_process_holds_the_lock(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "ingester.lock")
+            lock = IngesterLock(path)
+            self.assertTrue(lock.acquire())
+            self.assertEqual(lock.holder(), os.getpid())
+
+            code = ("import sys; sys.path.insert(0, sys.argv[2]);"
+                    "from crypto_app.tasks.ingester_lock import IngesterLock;"
+                    "sys.exit(0 if IngesterLock(sys.argv[1]).acquire() else 3)")
+            backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            self.assertEqual(subprocess.call([sys.executable, "-c", code, path, backend]), 3)
+
+            lock.release()
+            self.assertEqual(subprocess.call([sys.executable, "-c", code, path, backend]), 0)
+
+
+class FrameQueueTest(SimpleTestCase):
+    def test_coalesces_open_klines_but_keeps_closed_ones(self):
+        queue = FrameQueue(maxsize=10, policy="coalesce")
+        queue.put_nowait(0, sample_frame("BTCUSDT", 0, 100, closed=False))
+        queue.put_nowait(0, sample_frame("ETHUSDT", 0, 50, closed=False))
+        queue.put_nowait(0, sample_frame("BTCUSDT", 0, 101, closed=False))
+        queue.put_nowait(0, sample_frame("BTCUSDT", 0, 102, closed=True))
+        queue.put_nowait(0, sample_frame("BTCUSDT", 60000, 103, closed=False))
+
+        klines = [decode_kline(msg) for _, msg in queue.get_batch()]
+        self.assertEqual([(k.symbol, k.open, k.closed) for k in klines], [
+            ("btcusdt", 101, False), ("ethusdt", 50, False), ("btcusdt", 102, True), ("btcusdt", 103, False),
+        ])
+        self.assertEqual(queue.stats["queue_coalesced"], 1)
+        self.assertEqual(queue.stats["queue_depth"], 0)
+        self.assertEqual(queue.stats["queue_max_depth"], 4)
+
+    def test_coalesce_drops_open_klines_before_closed_ones_when_full(self):
+        queue = FrameQueue(maxsize=3, policy="coalesce")
+        queue.put_nowait(0, sample_frame("BTCUSDT", 0, 100, closed=True))
+        queue.put_nowait(0, sample_frame("ETHUSDT", 0, 50, closed=False))
+        queue.put_nowait(0, sample_frame("XRPUSDT", 0, 1, closed=True))
+        queue.put_nowait(0, sample_frame("SOLUSDT", 0, 20, closed=True))
+        klines = [decode_kline(m) for _, m in queue.get_batch()]
+        self.assertEqual([(k.symbol, k.closed) for k in klines], [
+            ("btcusdt", True), ("xrpusdt", True), ("solusdt", True),
+        ])
+        self.assertEqual((queue.stats["queue_dropped"], queue.stats["queue_dropped_closed"]), (1, 0))
+
+        for i in range(4):
+            queue.put_nowait(0, sample_frame("BTCUSDT", i * 60000, 100 + i, closed=True))
+        self.assertEqual([decode_kline(m).open for _, m in queue.get_batch()], [101, 102, 103])
+        self.assertEqual(queue.stats["queue_dropped_closed"], 1)
+
+    def test_drop_oldest_when_full(self):
+        queue = FrameQueue(maxsize=3, policy="drop_oldest")
+        for i in range(5):
+            queue.put_nowait(0, sample_frame("BTCUSDT", i * 60000, 100 + i, closed=False))
+        self.assertEqual([decode_kline(m).open for _, m in queue.get_batch(limit=2)], [102, 103])
+        self.assertEqual(queue.stats["queue_dropped"], 2)
+        self.assertEqual(len(queue), 1)
+
+    def test_drop_oldest_counts_dropped_closed_klines(self):
+        queue = FrameQueue(maxsize=2, policy="drop_oldest")
+        for i in range(4):
+            queue.put_nowait(0, sample_frame("BTCUSDT", i * 60000, 100 + i, closed=i % 2 == 0))
+        self.assertEqual((queue.stats["queue_dropped"], queue.stats["queue_dropped_closed"]), (2, 1))
+        self.assertEqual([decode_kline(m).open for _, m in queue.get_batch()], [102, 103])
+
+    def test_sustained_overflow_stays_bounded(self):
+        queue = FrameQueue(maxsize=50, policy="coalesce")
+        for i in range(5000):
+            queue.put_nowait(0, sample_frame(f"S{i % 200}USDT", 0, i, closed=i % 7 == 0))
+        self.assertEqual(len(queue), 50)
+        self.assertLessEqual(len(queue._items), 101)
+        self.assertLessEqual(len(queue._open), 50)
+        batch = [decode_kline(m) for _, m in queue.get_batch(limit=1000)]
+        self.assertEqual(len(batch), 50)
+        self.assertLessEqual(sum(not k.closed for k in batch), 1)
+        self.assertEqual(queue.stats["queue_dropped"] + queue.stats["queue_coalesced"], 5000 - 50)
+        self.assertEqual((len(queue._items), len(queue._open), len(queue)), (0, 0, 0))
+
+
+class SupervisorTest(StandInServerMixin, SimpleTestCase):
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(12):
+            delays = [backoff_delay(attempt, base=0.5, cap=10.0) for _ in range(50)]
+            self.assertTrue(all(0 <= d <= min(10.0, 0.5 * 2 ** attempt) for d in delays), attempt)
+        self.assertGreater(max(backoff_delay(20, base=0.5, cap=10.0) for _ in range(50)), 1.0)
+
+    def test_reconnects_and_fills_the_gap_before_reading(self):
+        store = CandleStore(capacity=3000)
+        store.load("btcusdt", np.arange(10) * 60000, np.ones((10, 5)))
+        stats, events, seeded = new_stats(), [], []
+        backfill = shard_backfill(["btcusdt"], "1m", stats, 2, self.base_url, store=store, seed=seeded.extend)
+
+        async def on_connect():
+            await backfill()
+            events.append(("connect", len(store.view("btcusdt"))))
+
+        async def stream(websocket):
+            """The first connection drops after one frame, the next ones go quiet"""
+            await websocket.send(sample_frame())
+            if stats["connects"] > 1:
+                await websocket.wait_closed()
+
+        async def run():
+            async with websockets.serve(stream, "127.0.0.1", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                task = asyncio.create_task(supervise(
+                    f"ws://127.0.0.1:{port}", lambda msg: events.append(("message", msg)), on_connect, stats,
+                    stale_after=0.2, backoff_base=0.01, backoff_cap=0.05))
+                for _ in range(100):
+                    if stats["stale_timeouts"]:
+                        break
+                    await asyncio.sleep(0.05)
+                task.cancel()
+
+        asyncio.run(run())
+        self.assertGreaterEqual(stats["connects"], 2)
+        self.assertEqual(stats["reconnects"], stats["connects"] - 1)
+        self.assertGreaterEqual(stats["disconnects"], 1)
+        self.assertGreaterEqual(stats["stale_timeouts"], 1)
+        self.assertEqual(events[:4], [("connect", 2500), ("message", sample_frame())] * 2)
+        self.assertEqual((stats["gaps_backfilled"], stats["candles_backfilled"], stats["max_gap"]), (1, 2490, 2490))
+        self.assertEqual(seeded, ["btcusdt"])
+
+    def test_health_report_is_logged_and_written(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "health.json")
+            output = StringIO()
+
+            async def run():
+                task = asyncio.create_task(report_health(path, period=0.01))
+                await asyncio.sleep(0.1)
+                task.cancel()
+
+            with contextlib.redirect_stdout(output):
+                asyncio.run(run())
+            report = read_health(path)
+            self.assertEqual(report["pid"], os.getpid())
+            self.assertIn("reconnects", report["summary"])
+            self.assertIn("queue_dropped_closed", report["summary"])
+            self.assertLess(report["age"], 5)
+            self.assertIn("reconnects", output.getvalue())
+
+            with override_settings(CANDLE_INGEST_HEALTH_FILE=path):
+                self.assertEqual(self.client.get("/crypto/api/ingest-health/").json()["pid"], os.getpid())
+            with override_settings(CANDLE_INGEST_HEALTH_FILE=os.path.join(root, "missing.json")):
+                self.assertEqual(self.client.get("/crypto/api/ingest-health/").status_code, 503)
+
+
+class ShardingTest(SimpleTestCase):
+    def tearDown(self):
+        shard_stats.clear()
+
+    def test_symbols_are_split_in_order(self):
+        symbols = [f"s{i}usdt" for i in range(60)]
+        shards = shard_symbols(symbols, 25)
+        self.assertEqual([len(shard) for shard in shards], [25, 25, 10])
+        self.assertEqual(sum(shards, []), symbols)
+        self.assertEqual(shard_symbols(symbols[:3], 25), [symbols[:3]])
+
+    def test_every_shard_feeds_the_queue_with_its_own_streams(self):
+        simulator = ExchangeSimulator(symbols=5, speed=600, history=10, tick=1, seed=1)
+        symbols = simulated_symbols(5)
+        queue = FrameQueue(maxsize=1000, policy="drop_oldest")
+
+        async def run():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.create_task(simulator.serve(ready=ready.set_result))
+            port = await ready
+            receivers = [asyncio.create_task(r) for r in shard_receivers(
+                symbols, "1m", 2, queue, f"ws://127.0.0.1:{port}", stale_after=5)]
+            seen = set()
+            for _ in range(200):
+                seen.update((shard, decode_kline(msg).symbol) for shard, msg in queue.get_batch())
+                if {symbol for _, symbol in seen} == set(symbols):
+                    break
+                await asyncio.sleep(0.02)
+            for task in receivers + [server]:
+                task.cancel()
+            return seen
+
+        seen = asyncio.run(run())
+        shards = shard_symbols(symbols, 2)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual({symbol for _, symbol in seen}, set(symbols))
+        self.assertTrue(all(symbol in shards[shard] for shard, symbol in seen), seen)
+        report = health_report()
+        self.assertEqual([(s["shard"], s["symbols"], s["connects"]) for s in report["shards"]],
+                         [(0, 2, 1), (1, 2, 1), (2, 1, 1)])
+        self.assertEqual(report["summary"]["symbols"], 5)
+
+
+class ExchangeSimulatorTest(SimpleTestCase):
+    def serve(self, simulator, client):
+        async def run():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.create_task(simulator.serve(ready=ready.set_result))
+            try:
+                return await client(await ready)
+            finally:
+                server.cancel()
+        return asyncio.run(run())
+
+    def test_synthetic_rest_and_stream(self):
+        simulator = ExchangeSimulator(symbols=3, speed=600, history=50, tick=5, seed=1)
+
+        async def client(port):
+            loop = asyncio.get_running_loop()
+            timestamps, values = await loop.run_in_executor(
+                None, lambda: fetch_klines("ETHUSDT", limit=20, base_url=f"http://127.0.0.1:{port}"))
+            async with websockets.connect(f"ws://127.0.0.1:{port}/stream?streams=ethusdt@kline_1m") as ws:
+                return timestamps, values, [decode_kline(await ws.recv()) for _ in range(3)]
+
+        timestamps, values, klines = self.serve(simulator, client)
+        self.assertEqual(len(timestamps), 20)
+        self.assertTrue((np.diff(timestamps) == 60000).all())
+        self.assertEqual({k.symbol for k in klines}, {"ethusdt"})
+        self.assertGreaterEqual(klines[0].open_time, timestamps[-1] + 60000)
+
+    def test_replays_recorded_feed(self):
+        frames = [sample_frame("BTCUSDT", i * 60000, 100 + i) for i in range(5)]
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "feed.gz")
+            with FeedRecorder(path) as recorder:
+                recorder.write(REST_KLINES, json.dumps({"symbol": "BTCUSDT", "interval": "1m", "klines": [
+                    [0, "1", "1", "1", "1", "1", 59999]]}))
+                for frame in frames:
+                    recorder.write(WS_FRAME, frame)
+            self.assertEqual([p.decode() for k, _, p in read_log(path) if k == WS_FRAME], frames)
+
+            simulator = ExchangeSimulator(speed=1000, replay=path)
+
+            async def client(port):
+                async with websockets.connect(f"ws://127.0.0.1:{port}/stream?streams=btcusdt@kline_1m") as ws:
+                    return [await ws.recv() for _ in frames]
+
+            self.assertEqual(self.serve(simulator, client), frames)
@@ -37,6 +37,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -88,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "crypto_main.wsgi.application"
+ASGI_APPLICATION = "crypto_main.asgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -174,18 +176,49 @@ PLOTLY_DASH = {
 
 
 # Channel layers configuration
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"  # Simplified for development
-        # Use Redis for production:
-        # "BACKEND": "channels_redis.core.RedisChannelLayer",
-        # "CONFIG": {
-        #     "hosts": [("127.0.0.1", 6379)],
-        # },
-    },
-}
+# The ingester runs in its own process, so alerts only reach browsers through a shared (Redis) layer
+CHANNEL_REDIS_URL = os.getenv("CHANNEL_REDIS_URL")  # e.g. redis://127.0.0.1:6379/0
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"  # Single process, for development
+        },
+    }
+
 
 
+# Market data ingestion
+BINANCE_REST_URL = os.getenv("BINANCE_REST_URL", "https://api.binance.com")
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+CANDLE_ALERT_DELIVERY_INTERVAL = float(os.getenv("CANDLE_ALERT_DELIVERY_INTERVAL", 0.25))
+CANDLE_ALERT_REFRESH_INTERVAL = float(os.getenv("CANDLE_ALERT_REFRESH_INTERVAL", 10))  # 0 disables alerts
+CANDLE_BACKFILL_WEIGHT_BUDGET = int(os.getenv("CANDLE_BACKFILL_WEIGHT_BUDGET", 4800))
+CANDLE_BOOTSTRAP_WORKERS = int(os.getenv("CANDLE_BOOTSTRAP_WORKERS", 10))
+CANDLE_CAPACITY = int(os.getenv("CANDLE_CAPACITY", 500))
+CANDLE_FORMING_PUBLISH_INTERVAL = float(os.getenv("CANDLE_FORMING_PUBLISH_INTERVAL", 1))
+CANDLE_HISTORY_DIR = os.getenv("CANDLE_HISTORY_DIR", os.path.join(BASE_DIR, "candle_history"))
+CANDLE_HISTORY_FLUSH_INTERVAL = float(os.getenv("CANDLE_HISTORY_FLUSH_INTERVAL", 60))
+CANDLE_PUSH_INTERVAL = float(os.getenv("CANDLE_PUSH_INTERVAL", 1))
+CANDLE_SHARED_MEMORY_PREFIX = os.getenv("CANDLE_SHARED_MEMORY_PREFIX", "crypto_groot")
+CANDLE_INGEST_HEALTH_FILE = os.getenv("CANDLE_INGEST_HEALTH_FILE", os.path.join(BASE_DIR, "ingester_health.json"))
+CANDLE_INGEST_HEALTH_INTERVAL = float(os.getenv("CANDLE_INGEST_HEALTH_INTERVAL", 30))
+CANDLE_INGEST_LOCK_FILE = os.getenv("CANDLE_INGEST_LOCK_FILE", os.path.join(BASE_DIR, "ingester.lock"))
+CANDLE_INGEST_QUEUE_SIZE = int(os.getenv("CANDLE_INGEST_QUEUE_SIZE", 10000))
+CANDLE_INGEST_OVERFLOW = os.getenv("CANDLE_INGEST_OVERFLOW", "coalesce")  # or "drop_oldest"
+CANDLE_STREAM_SHARD_SIZE = int(os.getenv("CANDLE_STREAM_SHARD_SIZE", 25))
+CANDLE_STREAM_STALE_AFTER = float(os.getenv("CANDLE_STREAM_STALE_AFTER", 30))
+CANDLE_VALUE_DTYPE = os.getenv("CANDLE_VALUE_DTYPE", "float64")  # or "float32", for in-process ring buffers only
+CANDLE_RECONNECT_BACKOFF_BASE = float(os.getenv("CANDLE_RECONNECT_BACKOFF_BASE", 1))
+CANDLE_RECONNECT_BACKOFF_CAP = float(os.getenv("CANDLE_RECONNECT_BACKOFF_CAP", 60))
 
 
 # REST_AUTH = {